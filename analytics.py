@@ -0,0 +1,350 @@
+import argparse
+import glob
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from game_models import LLMType
+from log_sink import read_jsonl
+
+def _read_log(path: str) -> Iterable[dict]:
+    """Records of a JSONL log, or of a JSON array log written by earlier versions."""
+    if path.endswith(".jsonl"):
+        return read_jsonl(path)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+class RoundTable:
+    """Detailed-log rounds as columnar NumPy arrays.
+
+    Players, categories and words are int codes into `players`, `categories`
+    and `words`. Per-round player columns have one slot per player code and
+    hold -1 where the player didn't take part or didn't vote.
+    """
+
+    def __init__(self, players: List[str], categories: List[str], words: List[str],
+                 columns: Dict[str, np.ndarray], sources: List[str]):
+        self.players = players
+        self.categories = categories
+        self.words = words
+        self.sources = sources
+        self.source = columns["source"]  # Index into sources
+        self.category = columns["category"]
+        self.word = columns["word"]
+        self.chameleon = columns["chameleon"]
+        self.chameleon_seat = columns["chameleon_seat"]  # Position in the hint order
+        self.seat = columns["seat"]  # (rounds, players): seat of each player, -1 if absent
+        self.vote = columns["vote"]  # (rounds, players): player voted for
+        self.tie_break_vote = columns["tie_break_vote"]
+        self.caught = columns["caught"]
+        self.guessed = columns["guessed"]
+        self.chameleon_won = columns["chameleon_won"]
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+    @classmethod
+    def load(cls, paths: Iterable[str]) -> "RoundTable":
+        """Load the valid rounds of any number of detailed logs (.jsonl or legacy .json) into one table."""
+        players = {t.player_name: i for i, t in enumerate(LLMType)}
+        categories, words = {}, {}
+        sources = []
+        rows = {name: [] for name in ("source", "category", "word", "chameleon", "chameleon_seat",
+                                      "caught", "guessed", "chameleon_won")}
+        seat_rows, vote_rows, tie_rows = [], [], []
+
+        def code(table: dict, key: str) -> int:
+            return table.setdefault(key, len(table))
+
+        for source, path in enumerate(paths):
+            sources.append(path)
+            for record in _read_log(path):
+                if record.get("invalid"):
+                    continue  # Not scored, as in the stats file
+                order = [name for hint in record["player_hints"] for name in hint]
+                chameleon = code(players, record["chameleon"])
+                rows["source"].append(source)
+                rows["category"].append(code(categories, record["category"]))
+                rows["word"].append(code(words, record["word"]))
+                rows["chameleon"].append(chameleon)
+                rows["chameleon_seat"].append(order.index(record["chameleon"]))
+                rows["caught"].append(bool(record["was_chameleon_caught"]))
+                rows["guessed"].append(bool(record["did_chameleon_guess_correctly"]))
+                rows["chameleon_won"].append(record.get("winner") == record["chameleon"])
+                seat_rows.append({code(players, name): i for i, name in enumerate(order)})
+                vote_rows.append({code(players, voter): code(players, voted)
+                                  for voter, voted in record["initial_votes"].items()})
+                tie_rows.append({code(players, voter): code(players, voted)
+                                 for voter, voted in (record.get("tie_break_votes") or {}).items()})
+
+        n, p = len(rows["category"]), len(players)
+
+        def matrix(dicts: List[dict]) -> np.ndarray:
+            out = np.full((n, p), -1, dtype=np.int8)
+            if n:
+                r = np.fromiter((i for i, d in enumerate(dicts) for _ in d), dtype=np.int64)
+                c = np.fromiter((k for d in dicts for k in d), dtype=np.int64)
+                v = np.fromiter((v for d in dicts for v in d.values()), dtype=np.int8)
+                out[r, c] = v
+            return out
+
+        columns = {
+            "source": np.array(rows["source"], dtype=np.int32),
+            "category": np.array(rows["category"], dtype=np.int16),
+            "word": np.array(rows["word"], dtype=np.int32),
+            "chameleon": np.array(rows["chameleon"], dtype=np.int8),
+            "chameleon_seat": np.array(rows["chameleon_seat"], dtype=np.int8),
+            "caught": np.array(rows["caught"], dtype=bool),
+            "guessed": np.array(rows["guessed"], dtype=bool),
+            "chameleon_won": np.array(rows["chameleon_won"], dtype=bool),
+            "seat": matrix(seat_rows),
+            "vote": matrix(vote_rows),
+            "tie_break_vote": matrix(tie_rows),
+        }
+        return cls(list(players), list(categories), list(words), columns, sources)
+
+    def to_parquet(self, path: str):
+        """Write one row per round, with names decoded (requires pyarrow)."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+
+        def names(codes: np.ndarray, table: List[str]):
+            return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), pa.array(table))
+
+        columns = {
+            "source": names(self.source, self.sources),
+            "category": names(self.category, self.categories),
+            "word": names(self.word, self.words),
+            "chameleon": names(self.chameleon, self.players),
+            "chameleon_seat": self.chameleon_seat,
+            "caught": self.caught,
+            "guessed": self.guessed,
+            "chameleon_won": self.chameleon_won,
+        }
+        for i, player in enumerate(self.players):
+            columns[f"seat_{player}"] = pa.array(self.seat[:, i], mask=self.seat[:, i] < 0)
+            columns[f"vote_{player}"] = names(self.vote[:, i], self.players)
+            columns[f"tie_break_vote_{player}"] = names(self.tie_break_vote[:, i], self.players)
+        pq.write_table(pa.table(columns), path)
+
+# Per-player statistics are ratios of per-round sums. Each round contributes one
+# row of `_features`; a statistic takes per-round weights of shape (rounds,) or
+# (resamples, rounds), which is how bootstrap() resamples without copying.
+
+def _weights(table: RoundTable, weights: Optional[np.ndarray]) -> np.ndarray:
+    return np.ones(len(table)) if weights is None else weights
+
+def _rate(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1e-12), np.nan)
+
+FEATURES = ("chameleon_rounds", "chameleon_wins", "player_rounds", "player_wins",
+            "votes_cast", "votes_correct", "pair_wins")
+
+def _features(table: RoundTable) -> np.ndarray:
+    """(rounds, 6 * players + players ** 2) float32 matrix of per-round contributions, built once."""
+    cached = getattr(table, "_feature_matrix", None)
+    if cached is not None:
+        return cached
+    n, p = len(table), len(table.players)
+    players = np.arange(p)
+    chameleon = table.chameleon[:, None] == players
+    won = table.chameleon_won[:, None]
+    detective = (table.seat >= 0) & ~chameleon
+    voting = (table.vote >= 0) & ~chameleon
+    # Bradley-Terry matches: the Chameleon against every other player in the round
+    rows, others = np.nonzero(detective)
+    chameleons = table.chameleon[rows].astype(np.int64)
+    winners = np.where(table.chameleon_won[rows], chameleons, others)
+    losers = np.where(table.chameleon_won[rows], others, chameleons)
+    pair_wins = np.zeros((n, p * p), dtype=np.float32)
+    np.add.at(pair_wins, (rows, winners * p + losers), 1)
+    table._feature_matrix = np.hstack([
+        chameleon, chameleon & won, detective, detective & ~won,
+        voting, voting & (table.vote == table.chameleon[:, None]), pair_wins,
+    ]).astype(np.float32)
+    return table._feature_matrix
+
+def _sums(table: RoundTable, weights: Optional[np.ndarray], feature: str) -> np.ndarray:
+    """Weighted sums of one feature block, shape (..., players) or (..., players ** 2)."""
+    p = len(table.players)
+    index = FEATURES.index(feature)
+    start = index * p
+    stop = start + (p * p if feature == "pair_wins" else p)
+    block = _features(table)[:, start:stop]
+    return block.sum(axis=0, dtype=np.float64) if weights is None else weights @ block
+
+def chameleon_win_rate(table: RoundTable, weights: np.ndarray = None) -> np.ndarray:
+    """Per player: share of their Chameleon rounds they won."""
+    return _rate(_sums(table, weights, "chameleon_wins"), _sums(table, weights, "chameleon_rounds"))
+
+def player_win_rate(table: RoundTable, weights: np.ndarray = None) -> np.ndarray:
+    """Per player: share of their non-Chameleon rounds the Chameleon lost."""
+    return _rate(_sums(table, weights, "player_wins"), _sums(table, weights, "player_rounds"))
+
+def vote_accuracy(table: RoundTable, weights: np.ndarray = None) -> np.ndarray:
+    """Per player: share of their first-round votes (as a non-Chameleon) that hit the Chameleon."""
+    return _rate(_sums(table, weights, "votes_correct"), _sums(table, weights, "votes_cast"))
+
+def bradley_terry(table: RoundTable, weights: np.ndarray = None, iterations: int = 500,
+                  prior: float = 0.5) -> np.ndarray:
+    """Bradley–Terry ratings on the Elo scale (mean 1500).
+
+    Every round counts as the Chameleon beating, or losing to, each other
+    player in it. Fitted with the MM algorithm, for all resamples at once;
+    `prior` adds that many pseudo-wins each way to every pair that met, so
+    unbeaten players stay finite.
+    """
+    p = len(table.players)
+    wins = _sums(table, weights, "pair_wins").reshape(-1, p, p)
+    games = wins + wins.transpose(0, 2, 1)
+    wins = wins + prior * (games > 0)
+    games = wins + wins.transpose(0, 2, 1)
+    total_wins = wins.sum(axis=2)
+    strength = np.ones(total_wins.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(iterations):
+            denominator = (games / (strength[:, :, None] + strength[:, None, :])).sum(axis=2)
+            updated = np.where(denominator > 0, total_wins / denominator, np.nan)
+            updated /= np.exp(np.nanmean(np.log(updated), axis=1, keepdims=True))
+            converged = np.allclose(updated, strength, rtol=1e-9, atol=0, equal_nan=True)
+            strength = updated
+            if converged:
+                break
+        ratings = 1500 + 400 * np.log10(strength)
+    return ratings[0] if weights is None or weights.ndim == 1 else ratings
+
+def confusion_matrix(table: RoundTable, weights: np.ndarray = None, tie_break: bool = False) -> np.ndarray:
+    """(voter, suspect) vote counts."""
+    w = _weights(table, weights)
+    votes = table.tie_break_vote if tie_break else table.vote
+    p = len(table.players)
+    rows, voters = np.nonzero(votes >= 0)
+    index = voters * p + votes[rows, voters]
+    return np.bincount(index, weights=w[rows], minlength=p * p).reshape(p, p)
+
+def chameleon_suspicion(table: RoundTable, weights: np.ndarray = None) -> np.ndarray:
+    """(voter, suspect) share of votes each voter cast against each suspect while that suspect was the Chameleon."""
+    w = _weights(table, weights)
+    p = len(table.players)
+    rows, voters = np.nonzero(table.vote >= 0)
+    suspects = table.vote[rows, voters]
+    hit = suspects == table.chameleon[rows]
+    index = voters * p + table.chameleon[rows]
+    hits = np.bincount(index, weights=w[rows] * hit, minlength=p * p)
+    return _rate(hits, np.bincount(index, weights=w[rows], minlength=p * p)).reshape(p, p)
+
+def breakdown(table: RoundTable, by: np.ndarray, size: int, weights: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """Rounds, Chameleon win, caught and correct-guess rates grouped by an int code per round."""
+    w = _weights(table, weights)
+    rounds = np.bincount(by, weights=w, minlength=size)
+    return {
+        "rounds": rounds,
+        "chameleon_win_rate": _rate(np.bincount(by, weights=w * table.chameleon_won, minlength=size), rounds),
+        "caught_rate": _rate(np.bincount(by, weights=w * table.caught, minlength=size), rounds),
+        "guess_rate": _rate(np.bincount(by, weights=w * table.guessed, minlength=size), rounds),
+    }
+
+def by_category(table: RoundTable, weights: np.ndarray = None) -> Dict[str, np.ndarray]:
+    return breakdown(table, table.category, len(table.categories), weights)
+
+def by_chameleon_seat(table: RoundTable, weights: np.ndarray = None) -> Dict[str, np.ndarray]:
+    return breakdown(table, table.chameleon_seat, table.seat.shape[1], weights)
+
+def bootstrap(table: RoundTable, statistics: Dict[str, Callable[..., np.ndarray]], resamples: int = 1000,
+              confidence: float = 0.95, seed: int = 0, chunk: int = 32) -> Dict[str, Dict[str, np.ndarray]]:
+    """Point estimate and percentile confidence interval of each statistic(table, weights).
+
+    Each resample draws len(table) rounds with replacement, expressed as
+    per-round counts. All statistics share the resamples, and `chunk`
+    resamples are evaluated together.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(table)
+    samples = {name: [] for name in statistics}
+    for first in range(0, resamples, chunk):
+        weights = np.stack([
+            np.bincount(rng.integers(0, n, n), minlength=n)
+            for _ in range(min(chunk, resamples - first))
+        ]).astype(np.float32)
+        for name, statistic in statistics.items():
+            samples[name].append(statistic(table, weights))
+    alpha = (1 - confidence) / 2
+    results = {}
+    for name, statistic in statistics.items():
+        values = np.concatenate(samples[name])
+        results[name] = {
+            "estimate": statistic(table, None),
+            "low": np.nanquantile(values, alpha, axis=0),
+            "high": np.nanquantile(values, 1 - alpha, axis=0),
+        }
+    return results
+
+def report(table: RoundTable, resamples: int = 1000, seed: int = 0) -> dict:
+    """Everything above, keyed by player/category/seat names, ready for JSON."""
+    def number(value):
+        return None if np.isnan(value) else round(float(value), 4)
+
+    def named(values, names):
+        return {name: number(value) for name, value in zip(names, values)}
+
+    def with_ci(result, names):
+        return {
+            name: {"estimate": number(result["estimate"][i]),
+                   "ci": [number(result["low"][i]), number(result["high"][i])]}
+            for i, name in enumerate(names)
+        }
+
+    players = table.players
+    seats = [f"seat_{i + 1}" for i in range(table.seat.shape[1])]
+    per_player = bootstrap(table, {
+        "chameleon_win_rate": chameleon_win_rate,
+        "player_win_rate": player_win_rate,
+        "vote_accuracy": vote_accuracy,
+        "bradley_terry_elo": bradley_terry,
+    }, resamples, seed=seed)
+    return {
+        "rounds": len(table),
+        **{name: with_ci(result, players) for name, result in per_player.items()},
+        "vote_confusion": {voter: named(row, players)
+                           for voter, row in zip(players, confusion_matrix(table))},
+        "chameleon_suspicion": {voter: named(row, players)
+                                for voter, row in zip(players, chameleon_suspicion(table))},
+        "by_category": {key: named(values, table.categories) for key, values in by_category(table).items()},
+        "by_chameleon_seat": {key: named(values, seats) for key, values in by_chameleon_seat(table).items()},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse Chameleon detailed logs")
+    parser.add_argument("logs", nargs="*",
+                        help="Detailed logs (.jsonl or .json); default: every chameleon_detailed_log_* here")
+    parser.add_argument("--resamples", type=int, default=1000, help="Bootstrap resamples for the CIs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this file")
+    parser.add_argument("--parquet", default=None, help="Also export the rounds to this Parquet file")
+    args = parser.parse_args()
+
+    paths = args.logs or sorted(glob.glob("chameleon_detailed_log_*.json*"))
+    if not paths:
+        parser.error("no detailed logs given or found")
+    table = RoundTable.load(paths)
+    print(f"Loaded {len(table)} rounds from {len(paths)} log(s)")
+    result = report(table, args.resamples, args.seed)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+    if args.parquet:
+        table.to_parquet(args.parquet)
+        print(f"Wrote {args.parquet}")
@@ -0,0 +1,272 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Outcomes recorded by the resolver, in the order they are tried
+EXACT = "exact"
+TOKEN = "token"
+FUZZY = "fuzzy"
+AMBIGUOUS = "ambiguous"  # Several candidates matched - needs the LLM extractor (guesses: no guess)
+NO_MATCH = "no_match"    # Nothing matched - needs the LLM extractor (guesses: no guess)
+
+# Words models like to put around a one-word hint ("My hint is: Ocean")
+HINT_FILLER_WORDS = {
+    "my", "hint", "clue", "is", "the", "one", "word", "one-word", "answer",
+    "final", "i", "will", "say", "give", "would", "go", "with", "here", "s",
+    "sure", "okay", "ok", "alright", "well", "hmm",
+}
+
+_WORD_RE = re.compile(r"[\w'&-]+")
+
+ARTICLES = {"the", "a", "an"}
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+
+def edit_distance(a: str, b: str, limit: int = 3) -> int:
+    """Levenshtein distance between a and b, giving up early once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _fuzzy_limit(word: str) -> int:
+    return 1 if len(word) <= 5 else 2
+
+
+def _clean(text: str) -> str:
+    """Lowercase and strip quotes, markdown and surrounding punctuation."""
+    text = text.strip().lower().replace("*", "").replace("`", "")
+    return text.strip(" \t\n\"'.,;:!?()[]{}")
+
+
+def _tokens(text: str) -> List[str]:
+    return [token.strip("'-") for token in _WORD_RE.findall(text.lower()) if token.strip("'-")]
+
+
+def normalize(text: str) -> List[str]:
+    """Tokens of text without case, diacritics, punctuation or articles.
+
+    "The Pokémon!" and "pokemon" both give ["pokemon"]; apostrophes are
+    dropped ("Schindler's" -> "schindlers") and other punctuation splits words.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _NON_WORD_RE.sub(" ", text.replace("&", " and ").replace("'", "").replace("\u2019", ""))
+    return [token for token in text.split() if token not in ARTICLES]
+
+def _deletions(text: str, depth: int) -> Set[str]:
+    """text with every choice of up to depth characters removed."""
+    variants = level = {text}
+    for _ in range(depth):
+        level = {variant[:i] + variant[i + 1:] for variant in level for i in range(len(variant))}
+        variants = variants | level
+    return variants
+
+class CardIndex:
+    """Normalized forms and a fuzzy lookup for every card word, built once per deck.
+
+    `resolve` maps a free-form guess to a single card word of the category, or
+    None. It tries, in order: the whole normalized reply, card words appearing
+    as whole words in it ("I think it's Jaws"), and card words within edit
+    distance 1 (up to 5 letters) or 2 of the reply, one of its words or a run
+    of its words. Fuzzy candidates come from precomputed deletion variants, so
+    nothing is compared against every card at lookup time.
+    """
+
+    def __init__(self, cards: Dict[str, List[str]]):
+        self.cards = cards
+        self._forms: Dict[str, Dict[str, str]] = {}  # category -> normalized form -> card word
+        self._phrases: Dict[str, Dict[str, list]] = {}  # category -> first token -> [(tokens, card word)]
+        self._deletions: Dict[str, Dict[str, Set[str]]] = {}  # category -> deletion variant -> card words
+        self._compact: Dict[str, Dict[str, str]] = {}  # category -> card word -> form without spaces
+        self._max_tokens: Dict[str, int] = {}
+        self._lengths: Dict[str, Set[int]] = {}  # category -> lengths a fuzzy match can have
+        for category, words in cards.items():
+            forms, phrases, deletions, compact = {}, defaultdict(list), defaultdict(set), {}
+            for word in words:
+                tokens = normalize(word) or word.lower().split()  # A card that is only an article
+                forms[" ".join(tokens)] = word
+                forms["".join(tokens)] = word
+                phrases[tokens[0]].append((tuple(tokens), word))
+                compact[word] = "".join(tokens)
+                for variant in _deletions(compact[word], _fuzzy_limit(compact[word])):
+                    deletions[variant].add(word)
+            self._forms[category] = forms
+            self._phrases[category] = dict(phrases)
+            self._deletions[category] = dict(deletions)
+            self._compact[category] = compact
+            self._lengths[category] = {len(form) + d for form in compact.values()
+                                       for d in range(-_fuzzy_limit(form), _fuzzy_limit(form) + 1)}
+            self._max_tokens[category] = max(len(tokens) for tokens, _ in
+                                             (p for entries in phrases.values() for p in entries))
+
+    def resolve(self, text: str, category: str) -> Tuple[Optional[str], str]:
+        """(card word, path), with path one of EXACT, TOKEN, FUZZY, AMBIGUOUS or NO_MATCH."""
+        tokens = normalize(text)
+        if not tokens:
+            return None, NO_MATCH
+        forms = self._forms[category]
+        word = forms.get(" ".join(tokens)) or forms.get("".join(tokens))
+        if word:
+            return word, EXACT
+
+        # Card words appearing as whole words, keeping only the longest of nested matches
+        found = {}
+        phrases = self._phrases[category]
+        for i, token in enumerate(tokens):
+            for phrase, word in phrases.get(token, ()):
+                if tuple(tokens[i:i + len(phrase)]) == phrase:
+                    found[word] = (i, i + len(phrase))
+        found = [w for w, (a, b) in found.items()
+                 if not any(w != other and c <= a and b <= d and (c, d) != (a, b)
+                            for other, (c, d) in found.items())]
+        if len(found) == 1:
+            return found[0], TOKEN
+        if len(found) > 1:
+            return None, AMBIGUOUS
+
+        # Fuzzy: the whole reply, and every run of up to max_tokens of its words, without spaces
+        pieces = {"".join(tokens)}
+        for size in range(1, self._max_tokens[category] + 1):
+            pieces.update("".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+        deletions = self._deletions[category]
+        compact = self._compact[category]
+        lengths = self._lengths[category]
+        best: Dict[str, int] = {}
+        for piece in pieces:
+            if len(piece) not in lengths:
+                continue
+            for variant in _deletions(piece, 2):
+                for word in deletions.get(variant, ()):
+                    limit = _fuzzy_limit(compact[word])
+                    distance = edit_distance(piece, compact[word], limit)
+                    if distance <= limit and distance < best.get(word, limit + 1):
+                        best[word] = distance
+        if not best:
+            return None, NO_MATCH
+        closest = min(best.values())
+        winners = [w for w, d in best.items() if d == closest]
+        if len(winners) == 1:
+            return winners[0], FUZZY
+        return None, AMBIGUOUS
+
+class AnswerResolver:
+    """Resolves free-form model replies to a player name, hint or card word locally.
+
+    Matching is tried exact, then token-level, then fuzzy (edit distance). Only
+    replies that stay ambiguous need the LLM extractor. Every outcome is counted
+    in `counters` as "<kind>.<path>", e.g. "vote.exact" or "guess.llm".
+    """
+
+    def __init__(self, player_names: List[str], cards: Dict[str, List[str]]):
+        self.player_names = list(player_names)
+        self.cards = cards
+        self.card_index = CardIndex(cards)
+        self.counters = Counter()
+
+    def count(self, kind: str, path: str):
+        self.counters[f"{kind}.{path}"] += 1
+
+    def _match(self, text: str, candidates: List[str]) -> Tuple[Optional[str], str]:
+        by_clean = {_clean(c): c for c in candidates}
+        cleaned = _clean(text)
+        if cleaned in by_clean:
+            return by_clean[cleaned], EXACT
+
+        # Token level: candidates (possibly several words long) appearing as whole words
+        tokens = _tokens(text)
+        joined = f" {' '.join(tokens)} "
+        found = {c for key, c in by_clean.items() if f" {' '.join(_tokens(key))} " in joined}
+        # Drop candidates that are contained in a longer match ("Horn" inside "French Horn")
+        found = {c for c in found
+                 if not any(c != other and _clean(c) in _clean(other) for other in found)}
+        if len(found) == 1:
+            return found.pop(), TOKEN
+        if len(found) > 1:
+            return None, AMBIGUOUS
+
+        # Fuzzy: closest candidate by edit distance, against the whole reply and each token
+        best = {}
+        for key, candidate in by_clean.items():
+            limit = _fuzzy_limit(key)
+            distances = [edit_distance(cleaned, key, limit)]
+            distances += [edit_distance(token, key, limit) for token in tokens]
+            distance = min(distances)
+            if distance <= limit:
+                best[candidate] = distance
+        if best:
+            closest = min(best.values())
+            winners = [c for c, d in best.items() if d == closest]
+            if len(winners) == 1:
+                return winners[0], FUZZY
+            return None, AMBIGUOUS
+        return None, NO_MATCH
+
+    def resolve_name(self, text: str, candidates: List[str] = None,
+                     kind: str = "vote") -> Optional[str]:
+        """Return the single player name in text, or None if the LLM extractor is needed."""
+        name, path = self._match(text, candidates or self.player_names)
+        self.count(kind, path)
+        return name
+
+    def resolve_guess(self, text: str, category: str) -> Optional[str]:
+        """Return the card word the Chameleon guessed, or None if it names no single card."""
+        word, path = self.card_index.resolve(text, category)
+        self.count("guess", path)
+        return word
+
+    def match_card(self, text: str, category: str) -> Optional[str]:
+        """Like resolve_guess, but without touching the counters."""
+        return self.card_index.resolve(text, category)[0]
+
+    def match_name(self, text: str, candidates: List[str] = None) -> Optional[str]:
+        """Like resolve_name, but without touching the counters."""
+        return self._match(text, candidates or self.player_names)[0]
+
+    def _hint(self, text: str) -> Tuple[Optional[str], str]:
+        cleaned = _clean(text)
+        if cleaned and len(cleaned.split()) == 1:
+            return text.strip().strip(" \t\n\"'.,;:!?()[]{}*`"), EXACT
+        content = [t for t in _tokens(text) if t not in HINT_FILLER_WORDS]
+        if len(content) != 1:
+            return None, AMBIGUOUS if content else NO_MATCH
+        # Keep the model's own capitalisation
+        return next(word for word in _WORD_RE.findall(text) if word.lower().strip("'-") == content[0]), TOKEN
+
+    def match_hint(self, text: str) -> Optional[str]:
+        """The one-word hint in text, or None; doesn't check the secret word or touch the counters."""
+        return self._hint(text)[0]
+
+    def resolve_hint(self, text: str, secret_word: str = None) -> Optional[str]:
+        """Return the one-word hint in text, or None if the LLM extractor is needed.
+
+        A hint that is the secret word itself becomes "invalid", like `_sanitize_hint`.
+        """
+        hint, path = self._hint(text)
+        self.count("hint", path)
+        if hint is None:
+            return None
+        if secret_word and normalize(hint) == normalize(secret_word):
+            return "invalid"
+        return hint
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Counters grouped by kind: {"vote": {"exact": 12, "llm": 1}, ...}"""
+        grouped = {}
+        for key, count in sorted(self.counters.items()):
+            kind, path = key.split(".", 1)
+            grouped.setdefault(kind, {})[path] = count
+        return grouped
@@ -0,0 +1,199 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from game_models import LLMType
+from prompts import flatten
+from providers import AnthropicAdapter, Completion, OpenAIAdapter
+
+@dataclass
+class BatchRequest:
+    model: LLMType
+    model_name: str
+    system: str
+    messages: List[dict]
+    params: dict
+    phase: str
+    context: dict
+
+class BatchError(Exception):
+    """A batch job, or one request in it, that did not produce a reply."""
+
+class BatchEndpoint:
+    """Runs a list of requests as one provider batch job.
+
+    `run` returns one Completion or exception per request, in order.
+    """
+
+    async def run(self, requests: List[BatchRequest]) -> List[Union[Completion, Exception]]:
+        raise NotImplementedError
+
+class OpenAIBatchEndpoint(BatchEndpoint):
+    """Uploads a JSONL file of chat completions and polls the Batch API until it finishes."""
+
+    def __init__(self, adapter: OpenAIAdapter, poll_interval: float = 30.0):
+        self.adapter = adapter
+        self.poll_interval = poll_interval
+
+    async def run(self, requests: List[BatchRequest]) -> List[Union[Completion, Exception]]:
+        import openai
+        client = self.adapter.client
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self.adapter.request_body(r.model_name, r.system, r.messages, r.params),
+            })
+            for i, r in enumerate(requests)
+        ]
+        batch_file = await client.files.create(file=("wave.jsonl", "\n".join(lines).encode("utf-8")),
+                                               purpose="batch")
+        batch = await client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
+                                            completion_window="24h")
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+        if not batch.output_file_id:
+            raise BatchError(f"OpenAI batch {batch.id} ended as {batch.status} without output")
+
+        results: List[Union[Completion, Exception]] = [
+            BatchError(f"No result in OpenAI batch {batch.id}") for _ in requests
+        ]
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            index = int(item["custom_id"])
+            if response.get("status_code") != 200:
+                results[index] = BatchError(f"OpenAI batch request failed: {item.get('error') or response}")
+                continue
+            completion = openai.types.chat.ChatCompletion.model_validate(response["body"])
+            results[index] = OpenAIAdapter.with_usage(completion.choices[0].message.content.strip(), completion)
+        return results
+
+class AnthropicBatchEndpoint(BatchEndpoint):
+    """Submits a Message Batch and polls until processing has ended."""
+
+    def __init__(self, adapter: AnthropicAdapter, poll_interval: float = 30.0):
+        self.adapter = adapter
+        self.poll_interval = poll_interval
+
+    async def run(self, requests: List[BatchRequest]) -> List[Union[Completion, Exception]]:
+        client = self.adapter.client
+        batch = await client.messages.batches.create(requests=[
+            {"custom_id": str(i),
+             "params": self.adapter.request_body(r.model_name, r.system, r.messages, r.params)}
+            for i, r in enumerate(requests)
+        ])
+        while batch.processing_status != "ended":
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        results: List[Union[Completion, Exception]] = [
+            BatchError(f"No result in Anthropic batch {batch.id}") for _ in requests
+        ]
+        async for item in await client.messages.batches.results(batch.id):
+            index = int(item.custom_id)
+            if item.result.type == "succeeded":
+                results[index] = AnthropicAdapter.with_usage(item.result.message)
+            else:
+                results[index] = BatchError(f"Anthropic batch request {item.result.type}")
+        return results
+
+class LocalBatchEndpoint(BatchEndpoint):
+    """Stand-in batch endpoint for the local bots, so the wave scheduler can run offline.
+
+    `turnaround` is a fixed delay per job, like a provider's queueing time.
+    """
+
+    def __init__(self, local_provider, turnaround: float = 0.0):
+        self.local_provider = local_provider
+        self.turnaround = turnaround
+        self.jobs: List[int] = []  # Size of each job submitted
+
+    async def run(self, requests: List[BatchRequest]) -> List[Union[Completion, Exception]]:
+        self.jobs.append(len(requests))
+        if self.turnaround > 0:
+            await asyncio.sleep(self.turnaround)
+        replies = await asyncio.gather(*(
+            self.local_provider.complete(r.model, r.model_name, flatten(r.messages), r.phase, r.context)
+            for r in requests
+        ), return_exceptions=True)
+        return [reply if isinstance(reply, Exception) else Completion(reply.strip()) for reply in replies]
+
+class WaveBatcher:
+    """Collects the calls a wave of lockstep rounds makes and sends them per provider as one job.
+
+    A job is submitted once no new request for that provider has arrived for
+    `quiet_ticks` turns of the event loop, i.e. when every round in the wave
+    is waiting on it, or as soon as `max_batch_size` requests are queued.
+    """
+
+    def __init__(self, endpoints: Dict[str, BatchEndpoint], quiet_ticks: int = 5,
+                 max_batch_size: int = 10_000):
+        self.endpoints = endpoints
+        self.quiet_ticks = quiet_ticks
+        self.max_batch_size = max_batch_size
+        self.pending: Dict[str, list] = {provider: [] for provider in endpoints}
+        self._flushers: Dict[str, Optional[asyncio.Task]] = {provider: None for provider in endpoints}
+        self.jobs = {provider: 0 for provider in endpoints}
+        self.requests = {provider: 0 for provider in endpoints}
+
+    def handles(self, provider: str) -> bool:
+        return provider in self.endpoints
+
+    async def submit(self, provider: str, request: BatchRequest) -> Completion:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[provider].append((request, future))
+        if len(self.pending[provider]) >= self.max_batch_size:
+            self._start_job(provider)
+        elif self._flushers[provider] is None:
+            self._flushers[provider] = asyncio.ensure_future(self._flush_when_quiet(provider))
+        return await future
+
+    async def _flush_when_quiet(self, provider: str):
+        seen = -1
+        while len(self.pending[provider]) != seen:
+            seen = len(self.pending[provider])
+            for _ in range(self.quiet_ticks):
+                await asyncio.sleep(0)
+        self._flushers[provider] = None
+        if self.pending[provider]:
+            await self._run_job(provider, self._take(provider))
+
+    def _take(self, provider: str) -> list:
+        batch, self.pending[provider] = self.pending[provider], []
+        return batch
+
+    def _start_job(self, provider: str):
+        flusher = self._flushers[provider]
+        if flusher is not None:
+            flusher.cancel()
+            self._flushers[provider] = None
+        asyncio.ensure_future(self._run_job(provider, self._take(provider)))
+
+    async def _run_job(self, provider: str, batch: list):
+        self.jobs[provider] += 1
+        self.requests[provider] += len(batch)
+        try:
+            results = await self.endpoints[provider].run([request for request, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # The round was cancelled
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                result.batched = True
+                future.set_result(result)
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            provider: {"jobs": self.jobs[provider], "requests": self.requests[provider]}
+            for provider in self.endpoints if self.jobs[provider]
+        }
@@ -0,0 +1,395 @@
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import gc
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from game_controller import ChameleonGame
+from game_data import cards
+from game_models import LLMType
+from instrumentation import percentile
+from llm_handler import LLMHandler
+from log_sink import JsonlLogSink
+from prompts import flatten
+from providers import Completion
+
+HISTORY_FILE = os.path.join("results", "benchmarks.jsonl")
+
+class StubOverloadedError(Exception):
+    """Simulated provider failure; retryable like a real overload."""
+
+class LatencyModel:
+    """Per-call latency in milliseconds: "const:MS", "uniform:LO:HI", "exp:MEAN" or "lognormal:MEDIAN:SIGMA"."""
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        counts = {"const": 1, "uniform": 2, "exp": 1, "lognormal": 2}
+        if counts.get(kind) != len(values):
+            raise ValueError(f"Bad latency spec {spec!r}; expected const:MS, uniform:LO:HI, "
+                             "exp:MEAN or lognormal:MEDIAN:SIGMA")
+        self.spec = spec
+        self.kind = kind
+        self.params = values
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds for one call."""
+        if self.kind == "const":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "exp":
+            ms = rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        else:
+            median, sigma = self.params
+            ms = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return ms / 1000
+
+class RoundTrace:
+    """Simulated provider seconds per (phase, player) in one round, retries included."""
+
+    def __init__(self):
+        self.latency: Dict[tuple, float] = defaultdict(float)
+
+    def critical_path(self) -> float:
+        """Hints run one after another; votes and the guess together; then the tie-break."""
+        hints = sum(s for (phase, _), s in self.latency.items() if phase == "hint")
+        answers = max((s for (phase, _), s in self.latency.items() if phase in ("vote", "guess")), default=0.0)
+        tie_break = max((s for (phase, _), s in self.latency.items() if phase == "tie_break"), default=0.0)
+        return hints + answers + tie_break
+
+_trace: contextvars.ContextVar = contextvars.ContextVar("round_trace", default=None)
+
+class StubLLMHandler(LLMHandler):
+    """LLMHandler whose provider calls sleep for a sampled latency and return canned, valid replies.
+
+    Prompt building, answer resolution, rate limiting, retries and
+    instrumentation all run as usual; only the network is replaced. Calls
+    fail at `error_rate` with a retryable error.
+    """
+
+    HINTS = ["bright", "round", "quick", "ancient", "sharp", "loud", "soft", "green", "tall", "wild"]
+
+    def __init__(self, cards: Dict[str, List[str]], latency: LatencyModel, error_rate: float = 0.0,
+                 seed: Optional[int] = None, **kwargs):
+        super().__init__(cards, local_only=True, **kwargs)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed or 0
+        self.rng = random.Random(seed)
+        self.stub_calls = 0
+        self.stub_errors = 0
+
+    async def _call_provider(self, model: LLMType, messages: List[dict],
+                             phase: str, context: dict) -> Completion:
+        self.stub_calls += 1
+        delay = self.latency.sample(self.rng)
+        trace = _trace.get()
+        if trace is not None:
+            trace.latency[(phase, model)] += delay
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)  # Still yield, like a real network call
+        if self.rng.random() < self.error_rate:
+            self.stub_errors += 1
+            raise StubOverloadedError(f"Simulated overload for {model.player_name}")
+        # Like a real model, the reply depends only on the prompt
+        prompt = flatten(messages)
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")) ^ self.seed)
+        if phase == "hint":
+            text = rng.choice(self.HINTS)
+        elif phase == "guess":
+            text = rng.choice(self.cards[context["category"]])
+        else:
+            candidates = [p for p in context["candidates"] if p != model] or context["candidates"]
+            text = rng.choice(candidates).player_name
+        return Completion(text, input_tokens=len(prompt) // 4, output_tokens=len(text) // 4 + 1)
+
+class BenchmarkGame(ChameleonGame):
+    """ChameleonGame that times every round and traces its simulated provider latency."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_seconds: List[float] = []
+        self.critical_seconds: List[float] = []
+
+    async def play_round(self, *args, **kwargs):
+        trace = RoundTrace()
+        _trace.set(trace)  # Each round runs in its own task, so this stays per round
+        started = time.perf_counter()
+        round = await super().play_round(*args, **kwargs)
+        self.round_seconds.append(time.perf_counter() - started)
+        self.critical_seconds.append(trace.critical_path())
+        return round
+
+# name -> (latency spec, error rate, concurrent rounds, wave size)
+SCENARIOS = {
+    "overhead": ("const:0", 0.0, 64, None),  # Engine cost alone
+    "api": ("lognormal:20:0.5", 0.02, 32, None),  # Realistic spread, scaled down to milliseconds
+    "waves": ("lognormal:20:0.5", 0.02, None, 50),  # Lockstep waves, as used with --batch
+}
+
+MEMORY_WARM_UP_ROUNDS = 1300  # Enough for every model's hint and vote latency samples to fill
+
+def _rounds_per_category(rounds: int) -> int:
+    return max(1, math.ceil(rounds / len(cards)))
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+async def _play(game: ChameleonGame, rounds: int, concurrency: Optional[int], wave_size: Optional[int],
+                log_file: str):
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        await game.play_tournament_async(_rounds_per_category(rounds), max_concurrent_rounds=concurrency,
+                                         log_file=log_file, wave_size=wave_size)
+
+def run_scenario(latency: str, error_rate: float, concurrency: Optional[int], wave_size: Optional[int],
+                 rounds: int, seed: int, workdir: str) -> dict:
+    """Play a tournament against the stub and report throughput and per-round critical path."""
+    handler = StubLLMHandler(cards, LatencyModel(latency), error_rate, seed=seed)
+    game = BenchmarkGame(cards, max_concurrent_rounds=concurrency or 4, seed=seed, llm_handler=handler)
+    started = time.perf_counter()
+    asyncio.run(_play(game, rounds, concurrency, wave_size, os.path.join(workdir, "scenario.jsonl")))
+    elapsed = time.perf_counter() - started
+
+    played = len(game.round_seconds)
+    round_seconds = sorted(game.round_seconds)
+    overhead = sorted(r - c for r, c in zip(game.round_seconds, game.critical_seconds))
+    return {
+        "rounds": played,
+        "seconds": round(elapsed, 3),
+        "rounds_per_second": round(played / elapsed, 2),
+        "round_p50_ms": _ms(percentile(round_seconds, 50)),
+        "round_p95_ms": _ms(percentile(round_seconds, 95)),
+        "critical_path_p50_ms": _ms(percentile(sorted(game.critical_seconds), 50)),
+        # Round time the simulated provider latency doesn't explain: engine work and event-loop queueing
+        "overhead_p50_ms": _ms(percentile(overhead, 50)),
+        "overhead_p95_ms": _ms(percentile(overhead, 95)),
+        "calls": handler.stub_calls,
+        "errors": handler.stub_errors,
+        "retries": handler.rate_limiter.report().get("local", {}).get("retries", 0),
+    }
+
+def _retained(rounds: int, seed: int, workdir: str):
+    """Bytes a tournament leaves allocated (and its peak), on a handler warmed up beforehand."""
+    handler = StubLLMHandler(cards, LatencyModel("const:0"), seed=seed)
+    warm_up = BenchmarkGame(cards, max_concurrent_rounds=64, seed=seed, llm_handler=handler)
+    asyncio.run(_play(warm_up, MEMORY_WARM_UP_ROUNDS, 64, None, os.path.join(workdir, "memory_warm_up.jsonl")))
+    del warm_up
+    game = BenchmarkGame(cards, max_concurrent_rounds=64, seed=seed, llm_handler=handler)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        asyncio.run(_play(game, rounds, 64, None, os.path.join(workdir, "memory.jsonl")))
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current - baseline, peak - baseline, game
+
+def measure_memory(rounds: int, seed: int, workdir: str) -> dict:
+    """Memory a zero-latency tournament keeps hold of per round, scaled to 10k rounds.
+
+    Each measurement starts on a handler that has already played a warm-up
+    tournament, so its bounded caches and latency samples are full. The rate
+    is the slope between a run of half the rounds and a full one, which
+    leaves out whatever fixed cost remains.
+    """
+    small, _, small_game = _retained(rounds // 2, seed, workdir)
+    retained, peak, game = _retained(rounds, seed, workdir)
+    played = len(game.game_log)
+    extra = played - len(small_game.game_log)
+    return {
+        "rounds": played,
+        "retained_kb_per_10k_rounds": round((retained - small) / 1024 * 10_000 / extra, 1) if extra else None,
+        "peak_kb": round(peak / 1024, 1),
+        "game_log_bytes_per_round": game.game_log.record_size,
+        "call_records": game.llm_handler.instrumentation.overall.calls,
+    }
+
+def measure_commit_path(rounds: int, seed: int, workdir: str) -> dict:
+    """Microseconds per round for each step of committing a finished round."""
+    handler = StubLLMHandler(cards, LatencyModel("const:0"), seed=seed)
+    game = BenchmarkGame(cards, max_concurrent_rounds=64, seed=seed, llm_handler=handler)
+    asyncio.run(_play(game, rounds, 64, None, os.path.join(workdir, "commit.jsonl")))
+    played = list(game.game_log)
+    codes = list(game.game_log.iter_codes())
+    n = len(played)
+
+    def per_round(seconds: float) -> float:
+        return round(seconds / n * 1e6, 2)
+
+    started = time.perf_counter()
+    for c in codes:
+        game._update_stats(c)
+    update_stats = time.perf_counter() - started
+
+    started = time.perf_counter()
+    records = [game._create_detailed_log(r).to_dict() for r in played]
+    detailed_log = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for r in played:
+        game.game_log.append(r)
+    store_append = time.perf_counter() - started
+
+    # The game loop only serializes and queues; the writer thread does the disk work
+    started = time.perf_counter()
+    sink = JsonlLogSink(os.path.join(workdir, "write.jsonl"))
+    for record in records:
+        sink.write(record)
+    queued = time.perf_counter() - started
+    sink.close()
+    written = time.perf_counter() - started
+    return {
+        "rounds": n,
+        "update_stats_us": per_round(update_stats),
+        "detailed_log_us": per_round(detailed_log),
+        "round_store_append_us": per_round(store_append),
+        "log_write_loop_us": per_round(queued),
+        "log_write_total_us": per_round(written),
+        "log_bytes_per_round": round(os.path.getsize(os.path.join(workdir, "write.jsonl")) / n, 1),
+    }
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(path: str, entry: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+# Metric -> True if higher is better
+TRACKED = {
+    "rounds_per_second": True,
+    "overhead_p50_ms": False,
+    "retained_kb_per_10k_rounds": False,
+    "update_stats_us": False,
+    "detailed_log_us": False,
+    "log_write_total_us": False,
+}
+
+def _flatten_results(results: dict) -> Dict[str, float]:
+    flat = {}
+    for section, values in results.items():
+        for key, value in values.items():
+            if key in TRACKED and value is not None:
+                flat[f"{section}.{key}"] = value
+    return flat
+
+def compare(previous: dict, current: dict, tolerance: float) -> List[str]:
+    """Lines describing tracked metrics that got worse by more than tolerance (a fraction)."""
+    before = _flatten_results(previous["results"])
+    regressions = []
+    for name, value in _flatten_results(current["results"]).items():
+        old = before.get(name)
+        if not old:
+            continue
+        change = (value - old) / old
+        higher_is_better = TRACKED[name.split(".", 1)[1]]
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{name}: {old} -> {value} ({change:+.1%})")
+    return regressions
+
+def print_history(history: List[dict]):
+    names = sorted({name for entry in history for name in _flatten_results(entry["results"])})
+    for entry in history:
+        label = f"{entry['commit'] or '?'}{'+' if entry.get('dirty') else ''}"
+        print(f"\n{label}  {entry['timestamp']}")
+        flat = _flatten_results(entry["results"])
+        for name in names:
+            if name in flat:
+                print(f"  {name}: {flat[name]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game engine against a stub LLM backend")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--rounds", type=int, default=1000, help="Rounds per scenario (default: 1000)")
+    parser.add_argument("--latency", default=None,
+                        help="Override the scenarios' latency, e.g. const:50, uniform:10:90, exp:40, lognormal:30:0.6 (ms)")
+    parser.add_argument("--error-rate", type=float, default=None, help="Override the scenarios' error rate")
+    parser.add_argument("--concurrency", type=int, default=None, help="Override concurrent rounds")
+    parser.add_argument("--memory-rounds", type=int, default=2000,
+                        help="Rounds for the memory measurement (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"Results history (default: {HISTORY_FILE})")
+    parser.add_argument("--no-record", action="store_true", help="Don't append this run to the history")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Flag tracked metrics that got worse by more than this fraction (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any tracked metric regressed")
+    parser.add_argument("--show-history", action="store_true", help="Print the recorded history and exit")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    if args.show_history:
+        print_history(history)
+        return
+
+    results = {}
+    config = {"rounds": args.rounds, "seed": args.seed, "scenarios": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.scenario or list(SCENARIOS):
+            latency, error_rate, concurrency, wave_size = SCENARIOS[name]
+            latency = args.latency or latency
+            error_rate = error_rate if args.error_rate is None else args.error_rate
+            if args.concurrency is not None and wave_size is None:
+                concurrency = args.concurrency
+            config["scenarios"][name] = {"latency": latency, "error_rate": error_rate,
+                                         "concurrency": concurrency, "wave_size": wave_size}
+            results[name] = run_scenario(latency, error_rate, concurrency, wave_size,
+                                         args.rounds, args.seed, workdir)
+            print(f"{name}: {json.dumps(results[name])}")
+        results["commit_path"] = measure_commit_path(args.rounds, args.seed, workdir)
+        print(f"commit_path: {json.dumps(results['commit_path'])}")
+        if args.memory_rounds:
+            results["memory"] = measure_memory(args.memory_rounds, args.seed, workdir)
+            print(f"memory: {json.dumps(results['memory'])}")
+
+    entry = {"timestamp": datetime.now().isoformat(timespec="seconds"), **git_revision(),
+             "python": sys.version.split()[0], "config": config, "results": results}
+    # Compare against the last run with the same settings
+    previous = next((e for e in reversed(history) if e.get("config") == config), None)
+    regressions = compare(previous, entry, args.tolerance) if previous else []
+    if previous:
+        print(f"\nCompared with {previous['commit'] or '?'} ({previous['timestamp']}):")
+        print("\n".join(f"  REGRESSION {line}" for line in regressions) or "  no regressions")
+    if not args.no_record:
+        append_history(args.history, entry)
+        print(f"Recorded in {args.history}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
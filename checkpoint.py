@@ -0,0 +1,55 @@
+import glob
+import json
+import os
+from typing import Optional
+
+CHECKPOINT_VERSION = 1
+
+def save_checkpoint(path: str, state: dict):
+    """Atomically replace the checkpoint at path, so a crash never leaves half a file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CHECKPOINT_VERSION, **state}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}: {state.get('version')}")
+    return state
+
+def latest_checkpoint(directory: str = "results") -> Optional[str]:
+    """Most recently written checkpoint in directory, or None."""
+    paths = glob.glob(os.path.join(directory, "chameleon_checkpoint_*.json"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+def truncate_log(path: str, rounds: int):
+    """Keep only the first `rounds` lines of a JSONL log.
+
+    The log can run ahead of the last checkpoint (or end in a torn line after a
+    crash); those rounds are played again on resume.
+    """
+    if not os.path.exists(path):
+        if rounds:
+            raise FileNotFoundError(f"Detailed log {path} is missing, cannot resume after round {rounds}")
+        return
+    kept = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if len(kept) == rounds:
+                break
+            if not line.endswith("\n"):
+                break  # Torn final line
+            kept.append(line)
+    if len(kept) < rounds:
+        raise ValueError(f"Detailed log {path} has only {len(kept)} rounds, checkpoint expects {rounds}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+    os.replace(tmp_path, path)
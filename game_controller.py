@@ -1,44 +1,316 @@
+import asyncio
 import random
+from collections import Counter
+from dataclasses import asdict
 from typing import Dict, List, Tuple
 from datetime import datetime
-import json
 from game_models import LLMType, GameRound, GameTurn, PlayerStats, DetailedGameLog
-from llm_handler import LLMHandler
+from llm_handler import InvalidStep, LLMHandler
+from response_cache import ResponseCache
+from log_sink import JsonlLogSink
+from checkpoint import save_checkpoint, truncate_log
+from round_store import NONE, RoundCodes, RoundStore
+from scheduler import AdaptiveScheduler, balanced_schedule
+
+class RoundTally:
+    """Stores rounds and counts them in the stats, without an LLM handler to play them.
+
+    ChameleonGame builds on it; on its own it rebuilds stats from logged rounds
+    (see work_queue.aggregate).
+    """
 
-class ChameleonGame:
     def __init__(self, cards: Dict[str, List[str]]):
         self.cards = cards
-        self.llm_handler = LLMHandler(cards)
         self.players = list(LLMType)
         self.stats = {model: PlayerStats() for model in LLMType}
-        self.game_log = []
-        self.detailed_logs = []  # List[DetailedGameLog]
+        self.game_log = RoundStore(self.players, list(cards))  # Compact record of every round played
+        self.rounds_logged = 0
+        self.invalid_rounds = 0  # Logged but left out of the stats
+
+    def _record_round(self, round: GameRound):
+        """Store a round and count it in the stats, unless it is invalid."""
+        index = self.game_log.append(round)
+        if round.invalid:
+            self.invalid_rounds += 1
+        else:
+            self._update_stats(self.game_log.codes(index))
+
+    def get_final_stats(self) -> Dict[LLMType, PlayerStats]:
+        return self.stats
+
+    @staticmethod
+    def stats_summary(stats: Dict[LLMType, PlayerStats]) -> Dict[str, dict]:
+        """Final stats as written to the stats file, keyed by model name."""
+        return {model.model_name: asdict(stat) for model, stat in stats.items()}
+
+    def print_game_log(self):
+        store = self.game_log
+        names = [player.player_name for player in store.players]
+        for c in store.iter_codes():
+            print(f"\nCard: {store.categories[c.category]}")
+            print(f"Secret word: {store.strings[c.word]}")
+            print(f"Chameleon: {names[c.chameleon]}")
+            for seat, (player, hint) in enumerate(zip(c.order, c.hints)):
+                if player != NONE:
+                    print(f"{names[player]}: Turn: {seat} "
+                          f"Hint: {store.strings[hint]} Chameleon: {player == c.chameleon}")
+            print(f"Voting Results: {[(names[voter], names[vote]) for voter, vote in enumerate(c.votes) if vote != NONE]}")
+            if store.strings[c.guess]:
+                print(f"Chameleon guess: {store.strings[c.guess]}")
+            print(f"Winner: {names[c.winner] if c.winner != NONE else 'No winner'}")
+
+    def _update_stats(self, round: RoundCodes):
+        players = self.game_log.players
+        chameleon = players[round.chameleon]
+        
+        # Update chameleon stats
+        self.stats[chameleon].times_as_chameleon += 1
+        
+        # Count votes for each player
+        vote_counts = [0] * len(players)
+        for vote in round.votes:
+            if vote != NONE:
+                vote_counts[vote] += 1
+        
+        # Check if chameleon was identified
+        if vote_counts[round.chameleon] > len(self.players) / 2:  # Majority voted correctly
+            self.stats[chameleon].times_identified += 1
+        
+        # Track correct guesses regardless of whether chameleon was identified
+        if round.guessed_correctly:
+            self.stats[chameleon].correct_guesses += 1
+        
+        # Update voting stats and track false accusations
+        for voter, vote in enumerate(round.votes):
+            if vote == NONE:
+                continue
+            if vote == round.chameleon:
+                self.stats[players[voter]].correct_votes += 1
+            elif vote_counts[vote] > len(self.players) / 2:
+                # If a non-chameleon got majority votes, increment their false accusation counter
+                self.stats[players[vote]].times_falsely_accused += 1
+
+class ChameleonGame(RoundTally):
+    def __init__(self, cards: Dict[str, List[str]], max_concurrent_rounds: int = 4,
+                 seed: int = None, cache: ResponseCache = None, llm_handler: LLMHandler = None):
+        super().__init__(cards)
+        self.llm_handler = llm_handler or LLMHandler(cards, cache=cache)
+        self.seed = seed
+        self.rng = random.Random(seed)  # Unseeded unless a seed is given
+        self.max_concurrent_rounds = max_concurrent_rounds
+
+    def play_tournament(self, rounds_per_category: int = 2, max_concurrent_rounds: int = None,
+                        log_file: str = None, log_fsync_every: int = 50,
+                        checkpoint_file: str = None, checkpoint_every: int = 1,
+                        metadata: dict = None, wave_size: int = None, shard: Tuple[int, int] = None):
+        asyncio.run(self.play_tournament_async(rounds_per_category, max_concurrent_rounds,
+                                               log_file, log_fsync_every,
+                                               checkpoint_file, checkpoint_every, metadata,
+                                               wave_size, shard))
+
+    async def play_tournament_async(self, rounds_per_category: int = 2, 
+                                    max_concurrent_rounds: int = None,
+                                    log_file: str = None, log_fsync_every: int = 50,
+                                    checkpoint_file: str = None, checkpoint_every: int = 1,
+                                    metadata: dict = None, wave_size: int = None,
+                                    shard: Tuple[int, int] = None):
+        """Play every round of every category, overlapping up to max_concurrent_rounds rounds.
+
+        Each round still runs in order internally. Finished rounds are committed
+        (stats, game log, detailed log) strictly in schedule order, so the output
+        is the same no matter which round's API calls return first. The detailed
+        log is streamed to a JSONL file, one line per round.
 
-    def play_tournament(self, rounds_per_category: int = 2):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        detailed_log_file = f"chameleon_detailed_log_{timestamp}.json"
+        With a checkpoint_file, a checkpoint is written every checkpoint_every
+        committed rounds (once those rounds are safely in the log). After
+        restore_checkpoint(), the tournament picks up at the first round the
+        checkpoint doesn't cover. metadata is stored in the checkpoint as-is.
+
+        With wave_size, rounds instead run in lockstep waves of wave_size rounds:
+        all of a wave's turn-k hints are in flight together, then all its votes,
+        so an LLMHandler with a batcher can send each step as one batch job.
+
+        With shard=(first, end), only rounds first..end-1 of the full schedule
+        are played; a shard's rounds, stats and log are exactly that slice of
+        the whole tournament's (see sharding.py).
+        """
+        if log_file is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            log_file = f"chameleon_detailed_log_{timestamp}.jsonl"
+        
+        await self.llm_handler.warm_up()
         
-        for category, words in self.cards.items():
-            print(f"\nPlaying category: {category}")
-            for round_num in range(rounds_per_category):
-                print(f"\nRound {round_num + 1}")
-                word = random.choice(words)
-                chameleon = random.choice(self.players)
-                player_order = self.players.copy()
-                shift = len(self.detailed_logs) % len(player_order)
-                player_order = player_order[shift:] + player_order[:shift]
-                random.shuffle(player_order)
-                
-                round = self.play_round(category, word, chameleon, player_order)
-                self.game_log.append(round)
-                self._update_stats(round)
-                
-                # Create detailed log
-                detailed_log = self._create_detailed_log(round)
-                self.detailed_logs.append(detailed_log)
-                
-                # Save logs after each round
-                self._save_detailed_logs(detailed_log_file)
+        # The schedule is rebuilt from the same RNG state on resume
+        schedule_rng_state = self.rng.getstate()
+        schedule = self._build_schedule(rounds_per_category)
+        if shard:
+            schedule = schedule[shard[0]:shard[1]]
+        start = self.rounds_logged
+        truncate_log(log_file, start)  # Drop rounds logged after the last checkpoint
+        
+        def on_commit(log_sink: JsonlLogSink):
+            done = self.rounds_logged
+            if not checkpoint_file or (done % checkpoint_every and done != len(schedule)):
+                return
+            state = self._checkpoint_state(schedule, schedule_rng_state, rounds_per_category, log_file)
+            state["metadata"] = metadata or {}
+            log_sink.call_when_written(lambda: save_checkpoint(checkpoint_file, state))
+
+        with JsonlLogSink(log_file, fsync_every=log_fsync_every) as log_sink:
+            await self._play_schedule(schedule, start, max_concurrent_rounds, log_sink, on_commit,
+                                      wave_size)
+
+    async def _play_schedule(self, schedule: list, start: int, max_concurrent_rounds: int, 
+                             log_sink: JsonlLogSink, on_commit=None, wave_size: int = None):
+        """Play schedule[start:], committing rounds in schedule order.
+
+        With wave_size, each wave of rounds starts together and finishes before the next.
+        """
+        limit = wave_size or max_concurrent_rounds or self.max_concurrent_rounds
+        semaphore = asyncio.Semaphore(max(1, limit))
+        finished = {}  # schedule index -> GameRound, waiting for earlier rounds
+        next_to_commit = start
+
+        async def run_round(index: int, category: str, round_num: int, word: str,
+                            chameleon: LLMType, player_order: List[LLMType], round_seed: int):
+            nonlocal next_to_commit
+            async with semaphore:
+                print(f"\n{category} - Round {round_num + 1}")
+                finished[index] = await self.play_round(
+                    category, word, chameleon, player_order, random.Random(round_seed)
+                )
+            
+            # Commit every round that is now at the head of the schedule
+            while next_to_commit in finished:
+                self._commit_round(finished.pop(next_to_commit), log_sink)
+                next_to_commit += 1
+                if on_commit:
+                    on_commit(log_sink)
+
+        if wave_size:
+            waves = [range(first, min(first + wave_size, len(schedule)))
+                     for first in range(start, len(schedule), wave_size)]
+        else:
+            waves = [range(start, len(schedule))]
+        for wave in waves:
+            tasks = [asyncio.ensure_future(run_round(index, *schedule[index])) for index in wave]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # A round failed for good: stop the others so nothing commits after it
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+    def play_adaptive(self, scheduler: AdaptiveScheduler, max_concurrent_rounds: int = None,
+                      log_file: str = None, log_fsync_every: int = 50):
+        asyncio.run(self.play_adaptive_async(scheduler, max_concurrent_rounds, log_file, log_fsync_every))
+
+    async def play_adaptive_async(self, scheduler: AdaptiveScheduler, max_concurrent_rounds: int = None,
+                                  log_file: str = None, log_fsync_every: int = 50):
+        """Play rounds picked one at a time by scheduler until it says stop.
+
+        Up to max_concurrent_rounds rounds are in flight, and the scheduler
+        sees each round's result as it is committed (in the order the rounds
+        were started). A seeded run is reproducible with max_concurrent_rounds=1;
+        with more, which results are in when a round is picked depends on timing.
+        Adaptive tournaments are not checkpointed.
+        """
+        if log_file is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            log_file = f"chameleon_detailed_log_{timestamp}.jsonl"
+
+        await self.llm_handler.warm_up()
+
+        limit = max(1, max_concurrent_rounds or self.max_concurrent_rounds)
+        finished = {}  # Start index -> GameRound, waiting for earlier rounds
+        next_to_commit = 0
+
+        async def run_round(index: int, category: str, round_num: int, word: str,
+                            chameleon: LLMType, player_order: List[LLMType], round_seed: int):
+            nonlocal next_to_commit
+            print(f"\n{category} - Round {round_num + 1}")
+            finished[index] = await self.play_round(
+                category, word, chameleon, player_order, random.Random(round_seed)
+            )
+            while next_to_commit in finished:
+                round = finished.pop(next_to_commit)
+                self._commit_round(round, log_sink)
+                if round.invalid:
+                    scheduler.discard(round.chameleon)
+                else:
+                    scheduler.observe(round.chameleon, round.winner == round.chameleon)
+                next_to_commit += 1
+
+        with JsonlLogSink(log_file, fsync_every=log_fsync_every) as log_sink:
+            tasks = set()
+            started = 0
+            try:
+                while True:
+                    while len(tasks) < limit:
+                        entry = scheduler.next_round()
+                        if entry is None:
+                            break
+                        tasks.add(asyncio.ensure_future(run_round(started, *entry)))
+                        started += 1
+                    if not tasks:
+                        break
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()  # Re-raise a round that failed for good
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+    def _checkpoint_state(self, schedule: list, schedule_rng_state: tuple,
+                          rounds_per_category: int, log_file: str) -> dict:
+        """Snapshot of everything needed to resume after the rounds committed so far."""
+        done = self.rounds_logged
+        state = {
+            "saved_at": datetime.now().isoformat(),
+            "rounds_per_category": rounds_per_category,
+            "total_rounds": len(schedule),
+            "rounds_completed": done,
+            "invalid_rounds": self.invalid_rounds,
+            "complete": done == len(schedule),
+            "rng_state": [schedule_rng_state[0], list(schedule_rng_state[1]), schedule_rng_state[2]],
+            "log_file": log_file,
+            "stats": {model.player_name: asdict(stat) for model, stat in self.stats.items()},
+        }
+        if done < len(schedule):
+            category, round_num = schedule[done][:2]
+            state["next_category"] = category
+            state["next_round_in_category"] = round_num
+        return state
+
+    def restore_checkpoint(self, state: dict):
+        """Load stats, RNG state and progress from a checkpoint written by play_tournament."""
+        version, internal, gauss_next = state["rng_state"]
+        self.rng.setstate((version, tuple(internal), gauss_next))
+        by_name = {model.player_name: model for model in self.players}
+        for name, stat in state["stats"].items():
+            self.stats[by_name[name]] = PlayerStats(**stat)
+        self.rounds_logged = state["rounds_completed"]
+        self.invalid_rounds = state.get("invalid_rounds", 0)
+
+    def _build_schedule(self, rounds_per_category: int) -> List[Tuple[str, int, str, LLMType, List[LLMType], int]]:
+        """Draw word, Chameleon, player order and a per-round seed for every round up front.
+
+        Chameleons and seats follow a balanced design (see balanced_schedule),
+        and everything random is drawn from self.rng here, so a seeded
+        tournament gets the same schedule however its rounds interleave later.
+        """
+        return balanced_schedule(self.cards, self.players, rounds_per_category, self.rng)
+
+    def _commit_round(self, round: GameRound, log_sink: JsonlLogSink):
+        self._record_round(round)
+        
+        # Append the round's detailed log (written on the sink's background thread)
+        log_sink.write(self._create_detailed_log(round).to_dict())
+        self.rounds_logged += 1
 
     def _create_detailed_log(self, round: GameRound) -> DetailedGameLog:
         # Convert initial votes to player names
@@ -58,10 +330,7 @@ class ChameleonGame:
         was_caught = votes_for_chameleon > len(self.players) / 2
         
         # Check if chameleon guessed correctly
-        guessed_correctly = (
-            round.chameleon_guess and 
-            round.chameleon_guess.lower() == round.word.lower()
-        )
+        guessed_correctly = round.chameleon_guess == round.word  # Both are card words
         
         return DetailedGameLog(
             timestamp=datetime.now(),
@@ -70,56 +339,53 @@ class ChameleonGame:
             chameleon=round.chameleon.player_name,
             player_hints=player_hints,
             initial_votes=initial_votes,
-            tie_break_votes=None,  # TODO: Add tie break votes if they occurred
-            final_suspect=max(
-                initial_votes.values(),
-                key=lambda x: list(initial_votes.values()).count(x)
-            ),
+            tie_break_votes={
+                voter.player_name: vote.player_name for voter, vote in round.tie_break_votes.items()
+            } if round.tie_break_votes else None,
+            final_suspect=Counter(initial_votes.values()).most_common(1)[0][0] if initial_votes else None,
             chameleon_guess=round.chameleon_guess,
             winner=round.winner.player_name if round.winner else None,
             was_chameleon_caught=was_caught,
-            did_chameleon_guess_correctly=guessed_correctly
+            did_chameleon_guess_correctly=guessed_correctly,
+            invalid=round.invalid
         )
 
-    def _save_detailed_logs(self, filename: str):
-        # Convert DetailedGameLog objects to dictionaries
-        log_dicts = []
-        for log in self.detailed_logs:
-            log_dict = {
-                'timestamp': log.timestamp.isoformat(),
-                'category': log.category,
-                'word': log.word,
-                'chameleon': log.chameleon,
-                'player_hints': log.player_hints,
-                'initial_votes': log.initial_votes,
-                'tie_break_votes': log.tie_break_votes,
-                'final_suspect': log.final_suspect,
-                'chameleon_guess': log.chameleon_guess,
-                'winner': log.winner,
-                'was_chameleon_caught': log.was_chameleon_caught,
-                'did_chameleon_guess_correctly': log.did_chameleon_guess_correctly
-            }
-            log_dicts.append(log_dict)
-        
-        # Save to file with pretty printing
-        with open(filename, 'w') as f:
-            json.dump(log_dicts, f, indent=2)
+    @staticmethod
+    def _abandoned_round(category: str, word: str, chameleon: LLMType, turns: List[GameTurn],
+                         error: InvalidStep, votes: Dict[LLMType, LLMType] = None) -> GameRound:
+        """The part of a round played before a step failed for good, marked invalid."""
+        print(f"Round abandoned: {error}")
+        return GameRound(category=category, word=word, chameleon=chameleon, turns=turns,
+                         votes=votes or {}, invalid=str(error))
 
-    def play_round(self, category: str, word: str, 
-                   chameleon: LLMType, player_order: List[LLMType]) -> GameRound:
+    async def play_round(self, category: str, word: str, 
+                         chameleon: LLMType, player_order: List[LLMType],
+                         rng: random.Random = None) -> GameRound:
+        """Play one round. Steps that stay unusable after their retries make it invalid.
+
+        A hint that can't be used, or any step whose provider calls keep
+        failing, ends the round there; unresolved votes and guesses are filled
+        in as before. Either way the round is returned with `invalid` set, to
+        be logged but kept out of the stats. Only a provider outage (its
+        circuit breaker open) raises ProviderError and stops the tournament.
+        """
         print(f"Secret word: {word}")
         print(f"Chameleon: {chameleon.player_name}")
 
         
         turns = []
         previous_hints = []
+        problems = []  # Steps still unusable after their retries
         
         # Get hints from all players
         for turn_num, player in enumerate(player_order):
             is_chameleon = (player == chameleon)
-            hint = self.llm_handler.get_hint(
-                player, category, word, previous_hints, is_chameleon
-            )
+            try:
+                hint = await self.llm_handler.get_hint(
+                    player, category, word, previous_hints, is_chameleon
+                )
+            except InvalidStep as e:
+                return self._abandoned_round(category, word, chameleon, turns, e)
             
             turn = GameTurn(player=player, turn_number=turn_num, 
                           hint=hint, is_chameleon=is_chameleon)
@@ -127,16 +393,33 @@ class ChameleonGame:
             previous_hints.append((player, hint))
             print(f"{player.player_name} hint: {hint}")
 
-        # Initial voting phase
-        votes = {}
-        for player in player_order:
-            vote = self.llm_handler.get_vote(
-                player, 
-                category, 
-                [(t.player, t.hint) for t in turns], 
-                word if player != chameleon else None
-            )
-            votes[player] = vote
+        all_hints = [(t.player, t.hint) for t in turns]
+
+        conversations = self.llm_handler.new_conversations(player_order)
+        try:
+            if conversations is None:
+                # Votes and the Chameleon's guess only depend on the finished hint list,
+                # so they are all sent at once
+                results = await asyncio.gather(
+                    self.llm_handler.get_votes(player_order, category, all_hints, word, chameleon, rng,
+                                               problems=problems),
+                    self.llm_handler.get_chameleon_guess(chameleon, category, all_hints, problems=problems),
+                    return_exceptions=True  # Let both finish before a failure ends the round
+                )
+                for result in results:
+                    if isinstance(result, BaseException):
+                        raise result
+                votes, chameleon_guess = results
+            else:
+                # The guess continues the Chameleon's conversation, so it waits for the votes
+                votes = await self.llm_handler.get_votes(player_order, category, all_hints, word,
+                                                         chameleon, rng, conversations, problems)
+                chameleon_guess = await self.llm_handler.get_chameleon_guess(
+                    chameleon, category, all_hints, conversations[chameleon], problems
+                )
+        except InvalidStep as e:
+            return self._abandoned_round(category, word, chameleon, turns, e)
+        for player, vote in votes.items():
             print(f"{player.player_name} votes for: {vote.player_name}")
 
         # Count votes and handle ties
@@ -154,21 +437,18 @@ class ChameleonGame:
         most_voted = [player for player, count in vote_counts.items() if count == max_votes]
         
         # If there's a tie, do a second round of voting between tied players
+        tie_break_votes = None
         if len(most_voted) > 1:
             print("\nTie detected! Second round of voting between:", 
                   ", ".join(p.player_name for p in most_voted))
             
-            tie_break_votes = {}
-            for player in player_order:
-                vote = self.llm_handler.get_tie_break_vote(
-                    player, 
-                    category, 
-                    [(t.player, t.hint) for t in turns],
-                    word, 
-                    most_voted,
-                    is_chameleon=(player == chameleon)
+            try:
+                tie_break_votes = await self.llm_handler.get_tie_break_votes(
+                    player_order, category, all_hints, word, most_voted, chameleon, rng, conversations, problems
                 )
-                tie_break_votes[player] = vote
+            except InvalidStep as e:
+                return self._abandoned_round(category, word, chameleon, turns, e, votes)
+            for player, vote in tie_break_votes.items():
                 print(f"{player.player_name} votes for: {vote.player_name}")
             
             # Count tie-break votes
@@ -185,16 +465,13 @@ class ChameleonGame:
         
         final_suspect = most_voted[0]
         
-        # Always let the Chameleon guess
-        chameleon_guess = self.llm_handler.get_chameleon_guess(
-            chameleon, category, [(t.player, t.hint) for t in turns]
-        )
-        print(f"Chameleon guesses: {chameleon_guess}")
+        # The Chameleon always guesses (requested alongside the votes above)
+        print(f"Chameleon guesses: {chameleon_guess or 'none'}")
         
         # Determine winner
         if final_suspect == chameleon:
             print("Chameleon was caught!")
-            if chameleon_guess.lower() == word.lower():
+            if chameleon_guess == word:
                 winner = chameleon
                 print("Chameleon guessed correctly and wins!")
             else:
@@ -211,51 +488,11 @@ class ChameleonGame:
             turns=turns,
             votes=votes,
             winner=winner,
-            chameleon_guess=chameleon_guess  # Always include the guess
+            chameleon_guess=chameleon_guess,  # The card word guessed, or None
+            tie_break_votes=tie_break_votes,
+            invalid="; ".join(problems) or None
         )
 
-    def get_final_stats(self) -> Dict[LLMType, PlayerStats]:
-        return self.stats
-
-    def print_game_log(self):
-        for round in self.game_log:
-            print(f"\nCard: {round.category}")
-            print(f"Secret word: {round.word}")
-            print(f"Chameleon: {round.chameleon.player_name}")
-            for turn in round.turns:
-                print(f"{turn.player.player_name}: Turn: {turn.turn_number} "
-                      f"Hint: {turn.hint} Chameleon: {turn.is_chameleon}")
-            print(f"Voting Results: {[(k.player_name, v.player_name) for k,v in round.votes.items()]}")
-            if round.chameleon_guess:
-                print(f"Chameleon guess: {round.chameleon_guess}")
-            print(f"Winner: {round.winner.player_name if round.winner else 'No winner'}")
-
-    def _update_stats(self, round: GameRound):
-        # Update chameleon stats
-        self.stats[round.chameleon].times_as_chameleon += 1
-        
-        # Count votes for each player
-        vote_counts = {}
-        for voted_player in round.votes.values():
-            vote_counts[voted_player] = vote_counts.get(voted_player, 0) + 1
-        
-        # Check if chameleon was identified
-        votes_for_chameleon = vote_counts.get(round.chameleon, 0)
-        if votes_for_chameleon > len(self.players) / 2:  # Majority voted correctly
-            self.stats[round.chameleon].times_identified += 1
-        
-        # Track correct guesses regardless of whether chameleon was identified
-        if round.chameleon_guess and round.chameleon_guess.lower() == round.word.lower():
-            self.stats[round.chameleon].correct_guesses += 1
-        
-        # Update voting stats and track false accusations
-        for voter, vote in round.votes.items():
-            if vote == round.chameleon:
-                self.stats[voter].correct_votes += 1
-            elif vote != round.chameleon and vote_counts.get(vote, 0) > len(self.players) / 2:
-                # If a non-chameleon got majority votes, increment their false accusation counter
-                self.stats[vote].times_falsely_accused += 1
-
     def _tally_votes(self, votes: Dict[LLMType, LLMType]):
         vote_counts = {}
         for voted_player in votes.values():
@@ -1,13 +1,18 @@
+import sys
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 from enum import Enum
 from datetime import datetime
 
-@dataclass
+# Slotted dataclasses (Python 3.10+) use less memory per instance
+SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**SLOTS)
 class ModelConfig:
-    provider: str  # 'openai', 'anthropic', or 'google'
-    model_name: str  # The actual model identifier used in API calls
+    provider: str  # 'openai', 'anthropic', 'google', 'openai_compatible', or 'local' (offline bots, see local_bots.py)
+    model_name: str  # The actual model identifier used in API calls (bot name for 'local')
     player_name: str  # The human-readable name in the game (Alice, Bob, etc.)
+    base_url: Optional[str] = None  # Server for 'openai_compatible', e.g. "http://gpu-box:8000/v1"
 
 class LLMType(Enum):
     # OpenAI Models
@@ -21,6 +26,9 @@ class LLMType(Enum):
     # Google Models
     GEMINI_FLASH = ModelConfig("google", "gemini-1.5-flash", "Eve")
 
+    # Self-hosted models behind an OpenAI-compatible server (llama.cpp, vLLM, ...), e.g.
+    # LLAMA_8B = ModelConfig("openai_compatible", "llama-3.1-8b-instruct", "Frank", "http://gpu-box:8000/v1")
+
     @property
     def provider(self) -> str:
         return self.value.provider
@@ -33,14 +41,18 @@ class LLMType(Enum):
     def player_name(self) -> str:
         return self.value.player_name
 
-@dataclass
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.value.base_url
+
+@dataclass(**SLOTS)
 class GameTurn:
     player: LLMType
     turn_number: int
     hint: str
     is_chameleon: bool
 
-@dataclass
+@dataclass(**SLOTS)
 class GameRound:
     category: str
     word: str
@@ -49,8 +61,10 @@ class GameRound:
     votes: Dict[LLMType, LLMType]  # voter -> suspected_chameleon
     winner: Optional[LLMType] = None
     chameleon_guess: Optional[str] = None
+    tie_break_votes: Optional[Dict[LLMType, LLMType]] = None  # Only when the first vote tied
+    invalid: Optional[str] = None  # Why the round can't be scored (a step stayed unusable); kept out of the stats
 
-@dataclass
+@dataclass(**SLOTS)
 class PlayerStats:
     times_as_chameleon: int = 0
     times_identified: int = 0
@@ -58,7 +72,7 @@ class PlayerStats:
     correct_votes: int = 0
     times_falsely_accused: int = 0  # Times incorrectly voted as Chameleon
 
-@dataclass
+@dataclass(**SLOTS)
 class DetailedGameLog:
     timestamp: datetime
     category: str
@@ -66,9 +80,27 @@ class DetailedGameLog:
     chameleon: str  # player_name
     player_hints: List[Dict[str, str]]  # [{player_name: hint}, ...]
     initial_votes: Dict[str, str]  # voter_name -> voted_name
-    final_suspect: str  # player_name
+    final_suspect: Optional[str]  # player_name; None if the round ended before the vote
     was_chameleon_caught: bool
     did_chameleon_guess_correctly: bool
     tie_break_votes: Optional[Dict[str, str]] = None  # voter_name -> voted_name
     chameleon_guess: Optional[str] = None
-    winner: Optional[str] = None  # player_name
\ No newline at end of file
+    winner: Optional[str] = None  # player_name
+    invalid: Optional[str] = None  # Why the round isn't counted in the stats
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamp': self.timestamp.isoformat(),
+            'category': self.category,
+            'word': self.word,
+            'chameleon': self.chameleon,
+            'player_hints': self.player_hints,
+            'initial_votes': self.initial_votes,
+            'tie_break_votes': self.tie_break_votes,
+            'final_suspect': self.final_suspect,
+            'chameleon_guess': self.chameleon_guess,
+            'winner': self.winner,
+            'was_chameleon_caught': self.was_chameleon_caught,
+            'did_chameleon_guess_correctly': self.did_chameleon_guess_correctly,
+            'invalid': self.invalid
+        }
\ No newline at end of file
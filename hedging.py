@@ -0,0 +1,122 @@
+import asyncio
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from instrumentation import CallHook, CallRecord, percentile
+from providers import Completion
+
+# Largest share of each provider's calls that may get a duplicate request.
+# Adjust to how many extra tokens the lower tail latency is worth.
+DEFAULT_HEDGE_BUDGETS = {
+    "openai": 0.05,
+    "anthropic": 0.05,
+    "google": 0.05,
+    "local": 0.05,
+    "openai_compatible": 0.0,  # A duplicate would take one of the server's own slots
+}
+
+class LatencyWindow:
+    """The most recent call latencies of one model and phase."""
+
+    def __init__(self, size: int):
+        self.values = deque(maxlen=size)
+        self._sorted = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, seconds: float):
+        self.values.append(seconds)
+        self._sorted = None
+
+    def percentile(self, p: float) -> Optional[float]:
+        if self._sorted is None:
+            self._sorted = sorted(self.values)
+        return percentile(self._sorted, p)
+
+class HedgePolicy(CallHook):
+    """Decides when a slow call gets a duplicate request.
+
+    A call that has taken longer than its model's rolling `percentile`
+    latency for the phase gets one duplicate; whichever returns a usable
+    reply first wins and the other is cancelled. Hedges stop once a
+    provider's duplicates reach `budgets[provider]` of its calls, and no
+    call is hedged before its model and phase have `min_samples` latencies.
+
+    Registered as a hook on the handler's instrumentation, so the windows
+    fill from the same CallRecords as the latency summary.
+    """
+
+    def __init__(self, budgets: Dict[str, float] = None, percentile: float = 95,
+                 window: int = 200, min_samples: int = 20):
+        self.budgets = {**DEFAULT_HEDGE_BUDGETS, **(budgets or {})}
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.windows: Dict[Tuple[str, str], LatencyWindow] = defaultdict(lambda: LatencyWindow(window))
+        self.calls = defaultdict(int)
+        self.hedges = defaultdict(int)
+        self.hedges_won = defaultdict(int)
+
+    def call_finished(self, record: CallRecord):
+        # Cancelled originals still took at least their recorded time; failures and duplicates say nothing
+        if record.error is None and not record.hedge and not record.batched:
+            self.windows[(record.model, record.phase)].add(record.wall_seconds)
+
+    def delay(self, provider: str, model_name: str, phase: str) -> Optional[float]:
+        """Seconds to wait before hedging a call that is starting now, or None to never hedge it."""
+        self.calls[provider] += 1
+        if self.budgets.get(provider, 0.0) <= 0:
+            return None
+        window = self.windows[(model_name, phase)]
+        if len(window) < self.min_samples:
+            return None
+        return window.percentile(self.percentile)
+
+    def spend(self, provider: str) -> bool:
+        """Take one hedge from the provider's budget, if there is one left."""
+        if self.hedges[provider] + 1 > self.budgets.get(provider, 0.0) * self.calls[provider]:
+            return False
+        self.hedges[provider] += 1
+        return True
+
+    async def run(self, provider: str, model_name: str, phase: str,
+                  send: Callable[[bool], Awaitable[Completion]]) -> Completion:
+        """Run send(hedge=False), racing it against send(hedge=True) once it is slow.
+
+        A reply counts once it has text; if neither request gives one, the
+        original's result or error is returned.
+        """
+        wait = self.delay(provider, model_name, phase)
+        if wait is None:
+            return await send(False)
+        original = asyncio.ensure_future(send(False))
+        duplicate = None
+        try:
+            done, _ = await asyncio.wait({original}, timeout=wait)
+            if done or not self.spend(provider):
+                return await original
+            duplicate = asyncio.ensure_future(send(True))
+            pending = {original, duplicate}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t is duplicate):
+                    if task.exception() is None and task.result().text:
+                        if task is duplicate:
+                            self.hedges_won[provider] += 1
+                        return task.result()
+            return original.result()
+        finally:
+            for task in (original, duplicate):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            provider: {
+                "calls": calls,
+                "hedges": self.hedges[provider],
+                "hedges_won": self.hedges_won[provider],
+                "budget": self.budgets.get(provider, 0.0),
+            }
+            for provider, calls in self.calls.items()
+        }
@@ -0,0 +1,285 @@
+import json
+import math
+import os
+import random
+import time
+from array import array
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+# USD per million tokens: (input, cached input, output). Update from the providers' price pages.
+# Anthropic bills cache writes at 1.25x input; those are counted as plain input here.
+# Calls served by batch jobs cost BATCH_DISCOUNT times as much.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "o1-mini": (1.10, 0.55, 4.40),
+    "claude-3-5-sonnet-latest": (3.00, 0.30, 15.00),
+    "claude-3-5-haiku-latest": (0.80, 0.08, 4.00),
+    "gemini-1.5-flash": (0.075, 0.01875, 0.30),
+}
+BATCH_DISCOUNT = 0.5
+UNBILLED_PROVIDERS = {"local", "openai_compatible"}  # Our own machines, whatever the model name
+
+def estimate_cost(model_name: str, input_tokens: int, cached_tokens: int, output_tokens: int,
+                  batched: bool = False) -> float:
+    """Estimated USD for one call; 0 for models without a price (such as the local bots)."""
+    prices = MODEL_PRICES.get(model_name)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cost = ((input_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + output_tokens * output_price) / 1_000_000
+    return cost * BATCH_DISCOUNT if batched else cost
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+@dataclass
+class CallRecord:
+    provider: str
+    model: str
+    player: Optional[str]  # None for extractor calls
+    phase: str  # hint, vote, tie_break, guess or sanitize
+    wall_seconds: float  # Including rate-limit waits and retries
+    ttft_seconds: Optional[float]  # From the start of the final attempt to the first token
+    decision_seconds: Optional[float] = None  # Streamed calls: from the final attempt to a recognized answer
+    completion_seconds: Optional[float] = None  # From the final attempt to the end of the reply (or the cut)
+    cut_off: bool = False  # The stream was cancelled once the answer was recognized
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    cost: float = 0.0
+    batched: bool = False
+    hedge: bool = False  # A duplicate request sent because the original was slow
+    cancelled: bool = False  # Lost a hedge race; tokens are the estimated prompt if it had been sent
+    error: Optional[str] = None
+
+class CallHook:
+    """Base class for profiler hooks; override either method.
+
+    `call_started` runs just before a call enters the rate limiter and
+    `call_finished` right after it returns or fails for good.
+    """
+
+    def call_started(self, timer: "CallTimer"):
+        pass
+
+    def call_finished(self, record: CallRecord):
+        pass
+
+class CallTimer:
+    """Times one logical call across all of its attempts."""
+
+    def __init__(self, instrumentation: "Instrumentation", provider: str, model: str,
+                 phase: str, player: Optional[str] = None, hedge: bool = False, prompt_tokens: int = 0):
+        self.instrumentation = instrumentation
+        self.provider = provider
+        self.model = model
+        self.phase = phase
+        self.player = player
+        self.hedge = hedge
+        self.prompt_tokens = prompt_tokens  # Estimated input, charged if the call is cancelled in flight
+        self.attempts = 0
+        self.started = time.perf_counter()
+        self.attempt_started = None
+
+    def wrap(self, call):
+        """Wrap the per-attempt callable handed to the rate limiter, counting attempts."""
+        async def attempt():
+            self.attempts += 1
+            self.attempt_started = time.perf_counter()
+            return await call()
+        return attempt
+
+    def finish(self, completion=None, error: Exception = None, cancelled: bool = False) -> CallRecord:
+        now = time.perf_counter()
+        input_tokens = getattr(completion, "input_tokens", None) or 0
+        if cancelled and self.attempt_started is not None:
+            input_tokens = self.prompt_tokens
+        output_tokens = getattr(completion, "output_tokens", None) or 0
+        cached_tokens = getattr(completion, "cached_tokens", None) or 0
+        batched = getattr(completion, "batched", False)
+        attempt_seconds = None
+        if completion is not None and self.attempt_started is not None:
+            attempt_seconds = now - self.attempt_started
+        # Without streaming the first token arrives with the whole response
+        ttft = getattr(completion, "first_token_seconds", None)
+        if ttft is None:
+            ttft = attempt_seconds
+        record = CallRecord(
+            provider=self.provider,
+            model=self.model,
+            player=self.player,
+            phase=self.phase,
+            wall_seconds=now - self.started,
+            ttft_seconds=ttft,
+            decision_seconds=getattr(completion, "decision_seconds", None),
+            completion_seconds=attempt_seconds,
+            cut_off=getattr(completion, "cut_off", False),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            retries=max(0, self.attempts - 1),
+            cost=0.0 if self.provider in UNBILLED_PROVIDERS else
+                 estimate_cost(self.model, input_tokens, cached_tokens, output_tokens, batched),
+            batched=batched,
+            hedge=self.hedge,
+            cancelled=cancelled,
+            error=None if error is None else f"{type(error).__name__}: {error}",
+        )
+        self.instrumentation.add(record)
+        return record
+
+class Reservoir:
+    """A uniform sample of at most `size` values from a stream, for percentiles in bounded memory.
+
+    Exact until `size` values have been seen.
+    """
+
+    def __init__(self, size: int = 1024, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self.values = array("d")  # Replacing a sample allocates nothing
+        self.rng = random.Random(seed)
+
+    def add(self, value: float):
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.size:
+                self.values[slot] = value
+
+    def percentile(self, p: float) -> Optional[float]:
+        return percentile(sorted(self.values), p)
+
+class CallStats:
+    """Running totals and latency samples for a group of calls."""
+
+    LATENCIES = ("wall", "ttft", "decision", "full_completion")
+
+    def __init__(self):
+        self.calls = self.batched = self.cut_off = self.hedges = self.cancelled = 0
+        self.errors = self.retries = 0
+        self.input_tokens = self.cached_tokens = self.output_tokens = 0
+        self.cost = self.hedge_cost = 0.0
+        self.latencies = {name: Reservoir() for name in self.LATENCIES}
+
+    def add(self, record: CallRecord):
+        self.calls += 1
+        self.batched += record.batched
+        self.cut_off += record.cut_off
+        self.hedges += record.hedge
+        self.cancelled += record.cancelled
+        self.errors += record.error is not None
+        self.retries += record.retries
+        self.input_tokens += record.input_tokens
+        self.cached_tokens += record.cached_tokens
+        self.output_tokens += record.output_tokens
+        self.cost += record.cost
+        if record.hedge:
+            self.hedge_cost += record.cost
+        self.latencies["wall"].add(record.wall_seconds)
+        if record.ttft_seconds is not None:
+            self.latencies["ttft"].add(record.ttft_seconds)
+        if record.decision_seconds is not None:
+            self.latencies["decision"].add(record.decision_seconds)
+            # Streamed calls read to the end show how much sooner the answer was known
+            if not record.cut_off and record.completion_seconds is not None:
+                self.latencies["full_completion"].add(record.completion_seconds)
+
+    def entry(self) -> dict:
+        entry = {
+            "calls": self.calls,
+            "batched": self.batched,
+            "cut_off": self.cut_off,
+            "hedges": self.hedges,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "retries": self.retries,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost, 6),
+            "hedge_cost_usd": round(self.hedge_cost, 6),
+        }
+        for name, reservoir in self.latencies.items():
+            for p in (50, 95, 99):
+                value = reservoir.percentile(p)
+                entry[f"{name}_p{p}_ms"] = None if value is None else round(value * 1000, 1)
+        return entry
+
+class Instrumentation:
+    """Keeps running per-model, per-phase totals of every provider call (cache hits never reach a provider).
+
+    Records aren't kept: with `stream_to` each one is written out as a JSON
+    line as it arrives, so memory stays flat however long the tournament runs.
+    """
+
+    def __init__(self):
+        self.groups: Dict[Tuple[str, str], CallStats] = defaultdict(CallStats)
+        self.overall = CallStats()
+        self.hooks: List[CallHook] = []
+        self._calls_file = None
+
+    def add_hook(self, hook: CallHook):
+        self.hooks.append(hook)
+
+    def stream_to(self, path: str):
+        """Append every call from now on to `path` as one JSON line, for digging past the summary."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.close()
+        self._calls_file = open(path, "a", encoding="utf-8")
+
+    def close(self):
+        if self._calls_file is not None:
+            self._calls_file.close()
+            self._calls_file = None
+
+    def start(self, provider: str, model: str, phase: str, player: Optional[str] = None,
+              hedge: bool = False, prompt_tokens: int = 0) -> CallTimer:
+        timer = CallTimer(self, provider, model, phase, player, hedge, prompt_tokens)
+        for hook in self.hooks:
+            hook.call_started(timer)
+        return timer
+
+    def add(self, record: CallRecord):
+        self.groups[(record.model, record.phase)].add(record)
+        self.overall.add(record)
+        if self._calls_file is not None:
+            self._calls_file.write(json.dumps(asdict(record)) + "\n")
+        for hook in self.hooks:
+            hook.call_finished(record)
+
+    @property
+    def total_cost(self) -> float:
+        return self.overall.cost
+
+    @property
+    def hedge_cost(self) -> float:
+        """Spent on duplicate requests, won or lost."""
+        return self.overall.hedge_cost
+
+    def summary(self) -> Dict[str, Dict[str, dict]]:
+        """{model: {phase: counts, token and cost totals, and p50/p95/p99 latencies in ms}}"""
+        summary = defaultdict(dict)
+        for (model, phase), stats in sorted(self.groups.items()):
+            summary[model][phase] = stats.entry()
+        return dict(summary)
+
+    def write_summary(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"total_cost_usd": round(self.total_cost, 6), "hedge_cost_usd": round(self.hedge_cost, 6),
+                       "models": self.summary()}, f, indent=4)
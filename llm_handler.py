@@ -1,9 +1,18 @@
-import os
-from typing import List, Tuple, Dict
-import anthropic
-from openai import OpenAI
-import google.generativeai as genai
+import asyncio
+import re
+from collections import Counter
+from typing import List, Tuple, Dict, Optional, Union
 from game_models import LLMType
+from answer_resolver import HINT_FILLER_WORDS, AnswerResolver, normalize
+from response_cache import ResponseCache, CacheMissError
+from local_bots import LocalProvider
+from provider_limits import ProviderError, RateLimiter
+from providers import Completion, Decide, EndpointLimits, OpenAIAdapter, ProviderRegistry
+from instrumentation import Instrumentation
+from hedging import HedgePolicy
+from batching import (AnthropicBatchEndpoint, BatchRequest, LocalBatchEndpoint,
+                      OpenAIBatchEndpoint, WaveBatcher)
+from prompts import Conversation, Prompt, PromptBuilder, PromptTokenReport, correction, flatten, retry_prompt
 import random
 from pydantic import BaseModel
 
@@ -12,220 +21,608 @@ SYSTEM_PROMPT = """You're an AI player in a game of Chameleon. A secret word wil
 class Hint(BaseModel):
     hint: str
 
-class Vote(BaseModel):
-    player_name: str
+class ExtractedAnswers(BaseModel):
+    answers: List[str]  # One entry per numbered reply, in order
+
+# Where a streamed answer can end: the end of a sentence, clause or line
+ANSWER_END = re.compile(r"[.!?,;\n]")
+# "Not Alice, ..." names a player without choosing them, so such a reply is read to the end
+NEGATION = re.compile(r"\b(?:not|no|never)\b|n't", re.IGNORECASE)
+# Replies that are an error message passed through instead of an answer
+ERROR_REPLY = re.compile(r"^\W*(?:error|exception|traceback)\b\s*[:(\[-]|\b(?:error|status) code\b"
+                         r"|\b(?:rate limit exceeded|internal server error|service unavailable)\b", re.IGNORECASE)
+
+class InvalidStep(Exception):
+    """A step that is still unusable or failing after its retries, so the round can't be scored."""
 
 class LLMHandler:
-    def __init__(self, cards: Dict[str, List[str]]):
-        self.openai_client = OpenAI()
-        self.anthropic_client = anthropic.Anthropic()
-        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-        self.gemini_model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+    def __init__(self, cards: Dict[str, List[str]], cache: Optional[ResponseCache] = None,
+                 local_only: bool = False, local_provider: Optional[LocalProvider] = None,
+                 rate_limiter: Optional[RateLimiter] = None, conversations: bool = False,
+                 batch: bool = False, stream: bool = False, stream_cutoff: bool = True,
+                 hedging: Optional[HedgePolicy] = None, step_retries: int = 2,
+                 endpoint: Optional[str] = None, endpoint_limits: Optional[EndpointLimits] = None):
+        # local_only plays every roster entry with the offline heuristic bot
+        self.local_only = local_only
+        # endpoint sends every roster entry to this OpenAI-compatible server instead
+        self.endpoint = endpoint
+        self.local_provider = local_provider or LocalProvider(cards)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # SDKs are imported and clients built only for providers the roster uses
+        self.providers = ProviderRegistry(
+            self.local_provider, endpoints={endpoint: endpoint_limits} if endpoint and endpoint_limits else None
+        )
         self.cards = cards
+        self.prompts = PromptBuilder(cards, list(LLMType))
+        self.prompt_tokens = PromptTokenReport()
+        self.instrumentation = Instrumentation()  # Latency, tokens and cost of every provider call
+        # Send game calls as provider batch jobs (use with play_tournament's wave_size)
+        self.batcher = WaveBatcher(self._batch_endpoints()) if batch else None
+        # Continue each player's vote, tie-break and guess as one conversation per round
+        self.conversations = conversations
+        # Stream game calls and (with stream_cutoff) stop reading once the answer is recognized
+        self.stream = stream
+        self.stream_cutoff = stream_cutoff
+        # Send a duplicate of calls that pass their model's tail latency; the first reply wins
+        self.hedging = hedging
+        if hedging is not None:
+            self.instrumentation.add_hook(hedging)
+        # Each hint, vote, tie-break and guess is checked as it comes in and asked again when unusable
+        self.step_retries = step_retries
+        self.retried_steps = Counter()  # phase -> replies asked again
+        self.failed_steps = Counter()  # phase -> steps still unusable after their retries
         self.current_model = None  # Track current model
+        self.resolver = AnswerResolver([t.player_name for t in LLMType], cards)
+        self.cache = cache  # Optional on-disk response cache (also used for offline replay)
 
-    def _sanitize_hint(self, hint_text: str, secret_word: str = None) -> str:
-        """Ensure we get a single-word hint that isn't the secret word."""
-        try:
-            completion = self.openai_client.beta.chat.completions.parse(
+    def _batch_endpoints(self) -> dict:
+        """Providers with a batch API; calls to the others are sent as usual."""
+        return {
+            "openai": OpenAIBatchEndpoint(self.providers.get("openai")),
+            "anthropic": AnthropicBatchEndpoint(self.providers.get("anthropic")),
+            "local": LocalBatchEndpoint(self.local_provider),
+        }
+
+    def _provider(self, model: LLMType) -> str:
+        if self.local_only:
+            return "local"
+        return "openai_compatible" if self.endpoint else model.provider
+
+    def _base_url(self, model: LLMType) -> Optional[str]:
+        return self.endpoint or model.base_url
+
+    def _model_name(self, model: LLMType) -> str:
+        return "heuristic" if self.local_only else model.model_name
+
+    @staticmethod
+    def _estimate_tokens(*texts: str, output_tokens: int = 256) -> int:
+        """Rough token count for the tokens-per-minute budget (about 4 characters per token)."""
+        return sum(len(text) for text in texts) // 4 + output_tokens
+
+    def _generation_params(self, model: LLMType) -> dict:
+        """Provider request parameters that affect the response (part of the cache key)."""
+        if self._provider(model) in ("anthropic", "openai_compatible"):
+            return {"max_tokens": 500}  # Required by Anthropic; self-hosted servers may not stop on their own
+        return {}
+
+    async def _parse_structured(self, system: str, user: str, response_format):
+        """Structured gpt-4o-mini call used by the extractors, served from the cache when possible."""
+        if self.local_only:
+            raise RuntimeError("LLM extractor unavailable: running with local bots only")
+
+        async def fetch() -> Completion:
+            completion = await self.providers.get("openai").client.beta.chat.completions.parse(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": "Extract the player's one-word hint from the text. The hint cannot be the secret word itself."},
-                    {"role": "user", "content": f"Secret word: {secret_word}\n Hint text: {hint_text}"},
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
                 ],
-                response_format=Hint,
+                response_format=response_format,
             )
-            hint = completion.choices[0].message.parsed.hint
+            return OpenAIAdapter.with_usage(completion.choices[0].message.parsed.model_dump_json(), completion)
+
+        async def limited_fetch() -> str:
+            completion = await self._limited_call("openai", "gpt-4o-mini", "sanitize", None, fetch,
+                                                  self._estimate_tokens(system, user))
+            return completion.text
+
+        if self.cache is None:
+            return response_format.model_validate_json(await limited_fetch())
+        key = ResponseCache.make_key("openai", "gpt-4o-mini", system, user,
+                                     {"response_format": response_format.__name__})
+        text = await self.cache.get_or_fetch(key, limited_fetch, model="gpt-4o-mini")
+        return response_format.model_validate_json(text)
+
+    async def _sanitize_hint(self, hint_text: str, secret_word: str = None) -> str:
+        """Ensure we get a single-word hint that isn't the secret word."""
+        try:
+            parsed = await self._parse_structured(
+                "Extract the player's one-word hint from the text. The hint cannot be the secret word itself.",
+                f"Secret word: {secret_word}\n Hint text: {hint_text}",
+                Hint
+            )
+            hint = parsed.hint
             # Double check it's not the secret word
             if secret_word and hint.lower() == secret_word.lower():
                 return "invalid"  # Force them to try again
             return hint
+        except CacheMissError:
+            raise
         except Exception as e:
             print(f"Error in hint sanitization: {e}")
-            return hint_text.strip().split()[0]  # Fallback to simple extraction
+            return (hint_text.strip().split() or [""])[0]  # Fallback to simple extraction
 
-    def _sanitize_vote(self, vote_text: str) -> str:
-        """Ensure we get a single player name in the vote."""
+    async def _extract_answers(self, instruction: str, texts: List[str]) -> List[Optional[str]]:
+        """Pull one answer out of each reply with a single structured gpt-4o-mini call."""
+        numbered = "\n".join(f"{i + 1}. {text}" for i, text in enumerate(texts))
         try:
-            completion = self.openai_client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Extract the player name (Alice, Bob, Charlie, David, or Eve) from the text. Return only that name."},
-                    {"role": "user", "content": vote_text},
-                ],
-                response_format=Vote,
+            parsed = await self._parse_structured(
+                f"{instruction} Return one answer per numbered reply, in the same order.",
+                numbered,
+                ExtractedAnswers
             )
-            return completion.choices[0].message.parsed.player_name
+            answers = parsed.answers
+        except CacheMissError:
+            raise
         except Exception as e:
-            print(f"Error in vote sanitization: {e}")
-            return vote_text.strip().split()[0]  # Fallback to simple extraction
+            print(f"Error in answer extraction: {e}")
+            answers = []
+        return [answers[i] if i < len(answers) else None for i in range(len(texts))]
 
-    def _call_llm(self, model: LLMType, prompt: str) -> str:
-        """Central method for all LLM API calls."""
-        try:
-            if model.provider == "openai":
-                response = self.openai_client.chat.completions.create(
-                    model=model.model_name,
-                    messages=[
-                        {"role": "assistant", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                return response.choices[0].message.content.strip()
-                
-            elif model.provider == "anthropic":
-                response = self.anthropic_client.messages.create(
-                    model=model.model_name,
-                    max_tokens=500,  # Only needed for Anthropic
-                    system=SYSTEM_PROMPT,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text.strip()
-                
-            elif model.provider == "google":
-                gemini = genai.GenerativeModel(
-                    model_name=model.model_name,
-                    system_instruction=SYSTEM_PROMPT
-                )
-                response = gemini.generate_content(prompt)
-                return response.text.strip()
-            
+    async def _sanitize_votes(self, vote_texts: List[str], 
+                              candidates: List[LLMType], kind: str = "vote") -> List[Optional[LLMType]]:
+        """Resolve each vote to a candidate player, locally where possible.
+
+        Replies the local resolver can't settle are sent to the LLM extractor
+        together in one call. Unresolvable votes come back as None.
+        """
+        name_to_model = {t.player_name.lower(): t for t in candidates}
+        names = [
+            self.resolver.resolve_name(text, [t.player_name for t in candidates], kind)
+            for text in vote_texts
+        ]
+        unresolved = [i for i, name in enumerate(names) if name is None]
+        if unresolved:
+            names_list = ", ".join(t.player_name for t in candidates)
+            extracted = await self._extract_answers(
+                f"Extract the player name ({names_list}) each reply votes for. Return only that name.",
+                [vote_texts[i] for i in unresolved]
+            )
+            for i, name in zip(unresolved, extracted):
+                valid = bool(name) and name.strip().lower() in name_to_model
+                self.resolver.count(kind, "llm" if valid else "unresolved")
+                names[i] = name.strip() if valid else None
+        return [name_to_model[name.lower()] if name else None for name in names]
+
+    async def _call_llm(self, model: LLMType, prompt: Union[str, Prompt],
+                        phase: str = "hint", context: dict = None,
+                        conversation: Optional[Conversation] = None) -> str:
+        """Central method for all LLM API calls.
+
+        phase and context describe the game state behind the prompt; hosted
+        providers only see the prompt, local bots play from the context.
+        With a conversation the prompt is sent after its earlier turns, and
+        the reply is added to it.
+        Calls go through the provider's rate limits, retries and circuit
+        breaker; a call that still fails raises ProviderError.
+        """
+        provider = self._provider(model)
+        model_name = self._model_name(model)
+        history = conversation.messages if conversation else []
+        messages = history + [{"role": "user", "content": prompt}]
+
+        async def send(hedge: bool = False) -> Completion:
+            max_tokens = self._generation_params(model).get("max_tokens", 256)
+            prompt_tokens = self._estimate_tokens(SYSTEM_PROMPT, flatten(messages), output_tokens=0)
+            return await self._limited_call(
+                provider, model_name, phase, model.player_name,
+                lambda: self._call_provider(model, messages, phase, context),
+                prompt_tokens + max_tokens, hedge=hedge, prompt_tokens=prompt_tokens
+            )
+
+        async def direct() -> Completion:
+            if self.hedging is None:
+                return await send()
+            return await self.hedging.run(provider, model_name, phase, send)
+
+        async def fetch() -> str:
+            if self.batcher and self.batcher.handles(provider):
+                completion = await self._batched_call(provider, model, messages, phase, context, direct)
             else:
-                raise ValueError(f"Unsupported model provider: {model.provider}")
-                
+                completion = await direct()
+            self.prompt_tokens.record(phase, SYSTEM_PROMPT, messages, completion)
+            return completion.text
+
+        if self.cache is None:
+            reply = await fetch()
+        else:
+            key = ResponseCache.make_key(provider, model_name, SYSTEM_PROMPT,
+                                         flatten(messages), self._generation_params(model))
+            reply = await self.cache.get_or_fetch(key, fetch, model=model_name)
+        if conversation is not None:
+            conversation.add(prompt, reply)
+        return reply
+
+    async def _limited_call(self, provider: str, model_name: str, phase: str, player: Optional[str],
+                            call, estimated_tokens: int, hedge: bool = False,
+                            prompt_tokens: int = 0) -> Completion:
+        """Run call through the provider's rate limiter and record it in self.instrumentation."""
+        timer = self.instrumentation.start(provider, model_name, phase, player, hedge, prompt_tokens)
+        try:
+            completion = await self.rate_limiter.run(provider, timer.wrap(call), estimated_tokens)
+        except asyncio.CancelledError:
+            timer.finish(cancelled=True)
+            raise
         except Exception as e:
-            print(f"Error calling {model.player_name}: {e}")
-            return str(e)
+            timer.finish(error=e)
+            raise
+        timer.finish(completion)
+        # The limiter reserved the prompt plus max_tokens; give back what the reply didn't use
+        if completion.input_tokens is not None and completion.output_tokens is not None:
+            unused = estimated_tokens - completion.input_tokens - completion.output_tokens
+            if unused > 0:
+                self.rate_limiter.for_provider(provider).tokens.refund(unused)
+        return completion
+
+    async def _batched_call(self, provider: str, model: LLMType, messages: List[dict],
+                            phase: str, context: dict, direct) -> Completion:
+        """Queue the call for the provider's next batch job; failed items are sent directly."""
+        model_name = self._model_name(model)
+        timer = self.instrumentation.start(provider, model_name, phase, model.player_name)
+        request = BatchRequest(model, model_name, SYSTEM_PROMPT, messages,
+                               self._generation_params(model), phase, context)
+        try:
+            completion = await self.batcher.submit(provider, request)
+        except Exception as e:
+            timer.finish(error=e)
+            print(f"Batch request for {model.player_name} failed ({e}), sending it directly")
+            return await direct()
+        timer.finish(completion)
+        return completion
+
+    async def _call_provider(self, model: LLMType, messages: List[dict], 
+                             phase: str, context: dict) -> Completion:
+        adapter = self.providers.get(self._provider(model))
+        decide = self._decider(phase, context) if self.stream else None
+        if decide:
+            return await adapter.stream(
+                self._model_name(model), SYSTEM_PROMPT, messages, self._generation_params(model),
+                decide, cutoff=self.stream_cutoff, model=model, phase=phase, context=context,
+                base_url=self._base_url(model)
+            )
+        return await adapter.complete(
+            self._model_name(model), SYSTEM_PROMPT, messages, self._generation_params(model),
+            model=model, phase=phase, context=context, base_url=self._base_url(model)
+        )
+
+    def _decider(self, phase: str, context: dict) -> Optional[Decide]:
+        """Recognizes a complete answer in a streamed reply, or None for phases that aren't streamed.
+
+        The reply so far is checked up to its last sentence, clause or line
+        break; once that part resolves locally to a single hint, roster name or
+        card word, it is the answer and the rest of the stream isn't needed.
+        """
+        if phase == "hint":
+            def recognize(text: str) -> bool:
+                hint = self.resolver.match_hint(text)
+                return bool(hint) and hint.lower() not in HINT_FILLER_WORDS  # Not just "Sure!"
+        elif phase in ("vote", "tie_break"):
+            names = [player.player_name for player in context["candidates"]]
+            def recognize(text: str) -> bool:
+                return self.resolver.match_name(text, names) is not None
+        elif phase == "guess":
+            def recognize(text: str) -> bool:
+                return self.resolver.match_card(text, context["category"]) is not None
+        else:
+            return None
+
+        checked = 0  # Only text up to a break that wasn't there last time needs checking
 
-    def get_hint(self, model: LLMType, category: str, word: str, 
+        def decide(text: str) -> Optional[str]:
+            nonlocal checked
+            end = None
+            for end in ANSWER_END.finditer(text, checked):
+                pass
+            if end is None:
+                return None
+            checked = end.end()
+            answer = text[:end.start()]
+            if not answer.strip() or NEGATION.search(answer):
+                return None
+            return answer if recognize(answer) else None
+        return decide
+
+    def new_conversations(self, players: List[LLMType]) -> Optional[Dict[LLMType, Conversation]]:
+        """Fresh per-player conversations for a round, or None when conversation mode is off."""
+        if not self.conversations:
+            return None
+        return {player: Conversation(player) for player in players}
+
+    async def warm_up(self):
+        """Import SDKs, build clients and open connections for every model in the roster at once."""
+        if self.cache and self.cache.replay:
+            return  # Replays never reach the network
+        models = {}
+        for model in LLMType:
+            provider = self._provider(model)
+            name = self._base_url(model) if provider == "openai_compatible" else self._model_name(model)
+            models.setdefault(provider, []).append(name)
+        if not self.local_only and not self.endpoint:  # Self-hosted runs may have no OpenAI key
+            models.setdefault("openai", []).append("gpt-4o-mini")  # Used by the extractor
+        await self.providers.warm_up(models)
+
+    async def get_hint(self, model: LLMType, category: str, word: str, 
                  previous_hints: List[Tuple[LLMType, str]], is_chameleon: bool) -> str:
+        """The player's hint, asked again up to step_retries times while it is unusable or the call fails.
+
+        Raises InvalidStep if it never becomes usable.
+        """
         #print(f"\n{model.player_name} is thinking of a hint...")
         if is_chameleon:
             print(f"({model.player_name} is the Chameleon and doesn't know the word)")
             
-        prompt = self._create_hint_prompt(category, word, previous_hints, is_chameleon)
-        hint = self._call_llm(model, prompt)
-        #print(f"{model.player_name} gives hint: {hint}")
-        return hint
+        original = prompt = self._create_hint_prompt(category, word, previous_hints, is_chameleon)
+        context = {"category": category, "word": None if is_chameleon else word, "hints": previous_hints}
+        for attempt in range(self.step_retries + 1):
+            if attempt:
+                self.retried_steps["hint"] += 1
+            response = await self._attempt(model, prompt, "hint", context)
+            if isinstance(response, ProviderError):
+                error, problem = response, "the call failed"
+                continue
+            error = None
+            hint = self.resolver.resolve_hint(response, word)
+            if hint is None:
+                self.resolver.count("hint", "llm")
+                hint = await self._sanitize_hint(response, word)
+            problem = self._hint_problem(response, hint, word)
+            if problem is None:
+                #print(f"{model.player_name} gives hint: {hint}")
+                return hint
+            print(f"{model.player_name}'s hint {response!r} is unusable: {problem}")
+            prompt = retry_prompt(original, response, problem)
+        self.failed_steps["hint"] += 1
+        self._raise_outage(error)
+        raise InvalidStep(f"{model.player_name}'s hint: {problem}")
+
+    async def _attempt(self, model: LLMType, prompt: Union[str, Prompt], phase: str, context: dict,
+                       conversation: Optional[Conversation] = None) -> Union[str, ProviderError]:
+        """One try at a step: the reply, or the ProviderError if the call failed for good.
+
+        The provider's limiter has already retried the call itself; a
+        failure here uses up one of the step's own retries.
+        """
+        try:
+            return await self._call_llm(model, prompt, phase, context, conversation)
+        except ProviderError as e:
+            print(f"{model.player_name}'s {phase} call failed: {e}")
+            return e
+
+    def _raise_outage(self, error: Optional[ProviderError]):
+        """Re-raise a step's last call failure if its provider's circuit breaker is open.
+
+        That is an outage rather than one bad call, so the tournament stops
+        and can be continued with --resume instead of abandoning every round.
+        """
+        if error is not None and self.rate_limiter.for_provider(error.provider).breaker.is_open:
+            raise error
+
+    @staticmethod
+    def _hint_problem(response: str, hint: Optional[str], word: str) -> Optional[str]:
+        """Why a hint can't be used, or None if it can."""
+        if ERROR_REPLY.search(response):
+            return "it is an error message"
+        if not hint or not hint.strip():
+            return "it is empty"
+        if hint == "invalid" or normalize(hint) == normalize(word):  # resolve_hint's mark for the secret word
+            return "it is the secret word"
+        return None
+
     def _create_hint_prompt(self, category: str, word: str, 
                            previous_hints: List[Tuple[LLMType, str]], 
-                           is_chameleon: bool = False) -> str:
-        base_prompt = (f"The category is '{category}' and these are all possible words: "
-                      f"{self.cards[category]}. ")
-        
-        if not is_chameleon:
-            base_prompt += f"The secret word is '{word}'. "
-        else:
-            base_prompt += "You don't know the secret word. "
-        
-        if previous_hints:
-            base_prompt += "\nHere are the hints given so far:\n"
-            for player, hint in previous_hints:
-                base_prompt += f"{player.player_name}: {hint}\n"
-        
-        base_prompt += "\nRecall the instructions and give your ONE-WORD hint:"
-        return base_prompt
+                           is_chameleon: bool = False) -> Prompt:
+        return self.prompts.hint(category, word, previous_hints, is_chameleon)
             
-    def get_vote(self, model: LLMType, category: str, 
-                 all_hints: List[Tuple[LLMType, str]], word: str = None) -> LLMType:
-        #print(f"\n{model.player_name} is considering who might be the Chameleon...")
-        
-        is_chameleon = (word is None)  # Determine if this player is the Chameleon
-        prompt = self._create_vote_prompt(model, category, word, all_hints, is_chameleon)
-        response = self._call_llm(model, prompt)
-        
-        # Sanitize the vote to ensure it's a valid player name
-        sanitized_vote = self._sanitize_vote(response)
-        print(f"{model.player_name}'s vote: {sanitized_vote}")
-
-        # Convert name response back to LLMType
-        name_to_model = {t.player_name.lower(): t for t in LLMType}
-        if sanitized_vote.lower() in name_to_model:
-            voted_player = name_to_model[sanitized_vote.lower()]
-            #print(f"{model.player_name} votes for {voted_player.player_name}")
-            return voted_player
-        
-        random_vote = random.choice([p for p in LLMType if p != model])  # Don't vote for self
-        print(f"{model.player_name} gave unclear response, randomly voting for {random_vote.player_name}")
-        return random_vote
-    def _create_vote_prompt(self, model: LLMType, category: str, word: str, 
-                          all_hints: List[Tuple[LLMType, str]], is_chameleon: bool = False) -> str:
-        base_prompt = (f"You are playing as {model.player_name}. The category is '{category}' and these are all possible words: "
-                      f"{self.cards[category]}. ")
+    async def get_vote(self, model: LLMType, category: str, 
+                 all_hints: List[Tuple[LLMType, str]], word: str = None,
+                 rng: random.Random = None) -> LLMType:
+        chameleon = model if word is None else None
+        votes = await self.get_votes([model], category, all_hints, word, chameleon, rng)
+        return votes[model]
+
+    async def get_votes(self, voters: List[LLMType], category: str, 
+                        all_hints: List[Tuple[LLMType, str]], word: str,
+                        chameleon: Optional[LLMType], 
+                        rng: random.Random = None,
+                        conversations: Dict[LLMType, Conversation] = None,
+                        problems: List[str] = None) -> Dict[LLMType, LLMType]:
+        """Ask every voter at once, then resolve all replies as one phase.
+
+        Voters whose reply names no player are asked again, up to
+        step_retries times. A voter still unresolved after that gets a random
+        vote (from rng, the round's own generator, so seeded runs stay
+        reproducible), which is noted in problems. Votes open each voter's
+        conversation when conversations are given.
+        """
+        prompts = {
+            voter: self._create_vote_prompt(voter, category, word if voter != chameleon else None,
+                                            all_hints, is_chameleon=(voter == chameleon))
+            for voter in voters
+        }
+        contexts = {
+            voter: {"category": category, "word": word if voter != chameleon else None,
+                    "hints": all_hints, "candidates": list(LLMType)}
+            for voter in voters
+        }
+        votes = await self._collect_votes(voters, prompts, "vote", contexts, list(LLMType), conversations)
         
-        if not is_chameleon:  # Changed from if word
-            base_prompt += f"The secret word is '{word}'. "
+        rng = rng or random
+        for voter in voters:
+            if votes[voter] is None:
+                votes[voter] = rng.choice([p for p in LLMType if p != voter])  # Don't vote for self
+                print(f"{voter.player_name} gave unclear responses, randomly voting for {votes[voter].player_name}")
+                if problems is not None:
+                    problems.append(f"{voter.player_name}'s vote named no player")
+            else:
+                print(f"{voter.player_name}'s vote: {votes[voter].player_name}")
+        return votes
+
+    async def _collect_votes(self, voters: List[LLMType], prompts: Dict[LLMType, Union[str, Prompt]],
+                             phase: str, contexts: Dict[LLMType, dict], candidates: List[LLMType],
+                             conversations: Dict[LLMType, Conversation] = None) -> Dict[LLMType, Optional[LLMType]]:
+        """Ask the voters at once and resolve the replies, asking unresolved voters again.
+
+        Votes come back in the order of voters; None for a voter still
+        unresolved after step_retries retries. Calls that fail count as
+        attempts too; if a voter's last call failed, the step raises
+        InvalidStep rather than guessing a vote. A voter in conversation mode
+        already has the question and the unusable reply in their history, so
+        they only get a short correction turn; otherwise the prompt is sent
+        again with a note.
+        """
+        conversations = conversations or {}
+        originals = dict(prompts)
+        votes = dict.fromkeys(voters)
+        pending = list(voters)
+        for attempt in range(self.step_retries + 1):
+            if attempt:
+                self.retried_steps[phase] += len(pending)
+            responses = await asyncio.gather(*(
+                self._attempt(voter, prompts[voter], phase, contexts[voter], conversations.get(voter))
+                for voter in pending
+            ))
+            errors = {voter: r for voter, r in zip(pending, responses) if isinstance(r, ProviderError)}
+            replied = [(voter, r) for voter, r in zip(pending, responses) if voter not in errors]
+            # Sanitize the votes to ensure they're valid player names
+            resolved = await self._sanitize_votes([r for _, r in replied], candidates, kind=phase) if replied else []
+            unresolved = list(errors)
+            for (voter, response), voted_player in zip(replied, resolved):
+                if voted_player is not None:
+                    votes[voter] = voted_player
+                    continue
+                unresolved.append(voter)
+                problem = "it doesn't name one of " + ", ".join(p.player_name for p in candidates)
+                prompts[voter] = (correction(response, problem) if voter in conversations
+                                  else retry_prompt(originals[voter], response, problem))
+            pending = [voter for voter in pending if voter in unresolved]
+            if not pending:
+                break
         else:
-            base_prompt += "You are the Chameleon and need to vote to avoid suspicion. "
-        
-        base_prompt += "\nAll hints given:\n"
-        for player, hint in all_hints:
-            base_prompt += f"{player.player_name}: {hint}\n"
-        
-        base_prompt += "\nWho do you think is the Chameleon? Answer with just their name (Alice, Bob, Charlie, David, or Eve)."
-        return base_prompt
+            self.failed_steps[phase] += len(pending)
+            failed = [voter for voter in pending if voter in errors]
+            if failed:
+                self._raise_outage(errors[failed[0]])
+                label = "tie-break vote" if phase == "tie_break" else "vote"
+                raise InvalidStep(f"{failed[0].player_name}'s {label}: the call failed")
+        return votes
+
+    def _create_vote_prompt(self, model: LLMType, category: str, word: str, 
+                          all_hints: List[Tuple[LLMType, str]], is_chameleon: bool = False) -> Prompt:
+        return self.prompts.vote(model, category, word, all_hints, is_chameleon)
     
-    def get_tie_break_vote(self, model: LLMType, category: str, 
+    async def get_tie_break_vote(self, model: LLMType, category: str, 
                           all_hints: List[Tuple[LLMType, str]], 
                           word: str, tied_players: List[LLMType],
-                          is_chameleon: bool = False) -> LLMType:
-        print(f"\n{model.player_name} is voting in the tie-break...")
-        
-        prompt = self._create_tiebreak_prompt(model, category, word, all_hints, tied_players, is_chameleon)
-        response = self._call_llm(model, prompt)
+                          is_chameleon: bool = False, rng: random.Random = None) -> LLMType:
+        chameleon = model if is_chameleon else None
+        votes = await self.get_tie_break_votes([model], category, all_hints, word, 
+                                               tied_players, chameleon, rng)
+        return votes[model]
+
+    async def get_tie_break_votes(self, voters: List[LLMType], category: str, 
+                                  all_hints: List[Tuple[LLMType, str]], 
+                                  word: str, tied_players: List[LLMType],
+                                  chameleon: Optional[LLMType],
+                                  rng: random.Random = None,
+                                  conversations: Dict[LLMType, Conversation] = None,
+                                  problems: List[str] = None) -> Dict[LLMType, LLMType]:
+        """Ask every voter to break the tie at once, then resolve all replies as one phase.
+
+        Unresolved voters are asked again and then vote randomly, as in get_votes.
+        """
+        conversations = conversations or {}
+        print(f"\n{', '.join(v.player_name for v in voters)} voting in the tie-break...")
         
-        sanitized_vote = self._sanitize_vote(response)
-        print(f"{model.player_name}'s tie-break vote: {sanitized_vote}")
-
-        # Convert name response back to LLMType
-        name_to_model = {t.player_name.lower(): t for t in tied_players}
-        if sanitized_vote.lower() in name_to_model:
-            voted_player = name_to_model[sanitized_vote.lower()]
-            return voted_player
+        prompts = {
+            voter: self._create_tiebreak_prompt(voter, category, word, all_hints, tied_players,
+                                                is_chameleon=(voter == chameleon),
+                                                conversation=conversations.get(voter))
+            for voter in voters
+        }
+        contexts = {
+            voter: {"category": category, "word": word if voter != chameleon else None,
+                    "hints": all_hints, "candidates": tied_players}
+            for voter in voters
+        }
+        votes = await self._collect_votes(voters, prompts, "tie_break", contexts, tied_players, conversations)
         
-        return random.choice(tied_players)  # Fallback to random choice among tied players
+        rng = rng or random
+        for voter in voters:
+            if votes[voter] is None:
+                votes[voter] = rng.choice(tied_players)  # Fallback to random choice among tied players
+                if problems is not None:
+                    problems.append(f"{voter.player_name}'s tie-break vote named no tied player")
+            print(f"{voter.player_name}'s tie-break vote: {votes[voter].player_name}")
+        return votes
+
     def _create_tiebreak_prompt(self, model: LLMType, category: str, word: str, 
                                all_hints: List[Tuple[LLMType, str]], 
                                tied_players: List[LLMType],
-                               is_chameleon: bool = False) -> str:
-        prompt = (f"You are playing as {model.player_name}. The category is '{category}' and "
-                 f"these are all possible words: {self.cards[category]}. ")
-        
-        if not is_chameleon:  # Use is_chameleon parameter instead of current_model
-            prompt += f"The secret word is '{word}'. "
-        else:
-            prompt += "You are the Chameleon and need to vote to avoid suspicion. "
-        
-        prompt += "Given these hints:\n"
-        for player, hint in all_hints:
-            prompt += f"{player.player_name}: {hint}\n"
-        
-        prompt += "\nThere was a tie between these players: "
-        prompt += ", ".join(p.player_name for p in tied_players)
-        prompt += "\nWho do you think is the Chameleon? Choose only from the tied players listed above."
-        
-        return prompt
+                               is_chameleon: bool = False,
+                               conversation: Optional[Conversation] = None) -> Union[str, Prompt]:
+        if conversation and conversation.messages:
+            return self.prompts.tie_break_followup(tied_players).lstrip()  # The hints are already in the conversation
+        return self.prompts.tie_break(model, category, word, all_hints, tied_players, is_chameleon)
+
+    async def get_chameleon_guess(self, model: LLMType, category: str, 
+                           all_hints: List[Tuple[LLMType, str]],
+                           conversation: Optional[Conversation] = None,
+                           problems: List[str] = None) -> Optional[str]:
+        """The card word the Chameleon guesses, asking again while the reply names no single card.
 
-    def get_chameleon_guess(self, model: LLMType, category: str, 
-                           all_hints: List[Tuple[LLMType, str]]) -> str:
+        None once step_retries retries are used up, which is noted in problems;
+        InvalidStep if the last try's call failed. In conversation mode a retry is a short correction turn after the
+        stored exchange, as for votes.
+        """
         #print(f"\n{model.player_name} (Chameleon) is trying to guess the word...")
         self.current_model = model  # Set current model before creating prompt
-        prompt = self._create_chameleon_guess_prompt(model, category, all_hints)
-        guess = self._call_llm(model, prompt)
+        original = prompt = self._create_chameleon_guess_prompt(model, category, all_hints, conversation)
         self.current_model = None  # Reset current model
-        print(f"{model.player_name} guesses: {guess}")
-        return guess
+        
+        for attempt in range(self.step_retries + 1):
+            if attempt:
+                self.retried_steps["guess"] += 1
+            response = await self._attempt(model, prompt, "guess", {"category": category, "hints": all_hints},
+                                           conversation)
+            if isinstance(response, ProviderError):
+                error = response
+                continue
+            error = None
+            # Resolved locally against the card index: a card word, or None if the reply names no single card
+            guess = self.resolver.resolve_guess(response, category)
+            print(f"{model.player_name} guesses: {guess or 'none'} ({response!r})")
+            if guess is not None:
+                return guess
+            problem = "it doesn't name exactly one word from the list"
+            prompt = (correction(response, problem) if conversation is not None
+                      else retry_prompt(original, response, problem))
+        self.failed_steps["guess"] += 1
+        if error is not None:
+            self._raise_outage(error)
+            raise InvalidStep(f"{model.player_name}'s guess: the call failed")
+        if problems is not None:
+            problems.append(f"{model.player_name}'s guess named no card")
+        return None
+
+    def step_report(self) -> Dict[str, dict]:
+        """Replies asked again and steps that stayed unusable, per phase."""
+        phases = sorted(set(self.retried_steps) | set(self.failed_steps))
+        return {phase: {"retried": self.retried_steps[phase], "failed": self.failed_steps[phase]}
+                for phase in phases}
+
     def _create_chameleon_guess_prompt(self, model: LLMType, category: str, 
-                                        all_hints: List[Tuple[LLMType, str]]) -> str:
-            prompt = (f"You are playing as {model.player_name} and you are the Chameleon. "
-                    f"The category is '{category}' and these are all possible words: "
-                    f"{self.cards[category]}. Given these hints from all players:\n")
-            
-            for player, hint in all_hints:
-                prompt += f"{player.player_name}: {hint}\n"
-            
-            prompt += ("\nBased on these hints, "
-                    "which word from the list do you think is the secret word?"
-                    "If you choose the secret word from the list correctly based on the hints, you win the game."
-                    "Choose and answer with exactly one of the words/phrases from the list above.")
-            return prompt
\ No newline at end of file
+                                        all_hints: List[Tuple[LLMType, str]],
+                                        conversation: Optional[Conversation] = None) -> Union[str, Prompt]:
+        if conversation and conversation.messages:
+            return self.prompts.guess_followup().lstrip()
+        return self.prompts.guess(model, category, all_hints)
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import random
+from typing import Dict, List, Optional
+
+from game_models import LLMType
+
+class LocalBotError(Exception):
+    """Simulated provider failure raised by local bots at the configured error rate."""
+
+def _letters(text: str) -> str:
+    return "".join(c for c in text.lower() if c.isalpha())
+
+class HeuristicBot:
+    """Plays the game with simple string heuristics over the card lists.
+
+    Players who know the word hint with a few letters taken from it, preferring
+    letters that also appear in other cards so the Chameleon can't just read the
+    word off the hints, and never the whole word; a word too short to take
+    letters from borrows them from another card. The Chameleon picks the card
+    word most consistent with the hints so far and hints from that instead.
+    Voters who know the word suspect whoever's hint doesn't fit it, and the
+    Chameleon guesses the card word that fits the most hints.
+    """
+
+    def reply(self, phase: str, context: dict, rng: random.Random) -> str:
+        return getattr(self, f"_{phase}")(context, rng)
+
+    @staticmethod
+    def _pieces(letters: str) -> set:
+        return {letters[i:i + size] for size in (2, 3) for i in range(len(letters) - size + 1)}
+
+    def _clue(self, word: str, cards: List[str], rng: random.Random) -> str:
+        letters = _letters(word)
+        # Never the word itself, which the only three-letter piece of a three-letter word is
+        pieces = sorted(self._pieces(letters) - {letters})
+        if not pieces:
+            # Two letters or fewer leave nothing to hint from: borrow a fragment of the other cards
+            pieces = sorted(set().union(*(self._pieces(_letters(card)) for card in cards)) - {letters})
+        # Vague but not useless: fits the word and a few other cards, never all of them
+        shared = {piece: sum(self._fits(piece, card) for card in cards) for piece in pieces}
+        vague = [piece for piece, count in shared.items() if 2 <= count <= max(2, len(cards) // 3)]
+        return rng.choice(vague or pieces)
+
+    @staticmethod
+    def _fits(hint: str, word: str) -> bool:
+        return bool(_letters(hint)) and _letters(hint) in _letters(word)
+
+    def _best_word(self, words: List[str], hints: List[str], rng: random.Random) -> str:
+        scores = {word: sum(self._fits(hint, word) for hint in hints) for word in words}
+        best = max(scores.values())
+        return rng.choice([word for word, score in scores.items() if score == best])
+
+    def _hint(self, context: dict, rng: random.Random) -> str:
+        word = context["word"]
+        if word is None:  # Chameleon: blend in with the most plausible word
+            hints = [hint for _, hint in context["hints"]]
+            word = self._best_word(context["cards"], hints, rng)
+        return self._clue(word, context["cards"], rng)
+
+    def _vote(self, context: dict, rng: random.Random) -> str:
+        me = context["player"]
+        candidates = [p for p in context["candidates"] if p != me] or context["candidates"]
+        word = context["word"]
+        if word is None:
+            # The Chameleon guesses the word too and votes against the worst fit
+            hints = [hint for _, hint in context["hints"]]
+            word = self._best_word(context["cards"], hints, rng)
+        hints = dict(context["hints"])
+        suspects = [p for p in candidates if not self._fits(hints.get(p, ""), word)]
+        return rng.choice(suspects or candidates).player_name
+
+    _tie_break = _vote
+
+    def _guess(self, context: dict, rng: random.Random) -> str:
+        hints = [hint for player, hint in context["hints"] if player != context["player"]]
+        return self._best_word(context["cards"], hints, rng)
+
+class ScriptedBot:
+    """Replies from a fixed script: {phase: [reply, ...]}, cycling through each list.
+
+    Phases missing from the script are played by the heuristic bot.
+    """
+
+    def __init__(self, script: Dict[str, List[str]]):
+        self.script = script
+        self.positions = {phase: 0 for phase in script}
+        self.fallback = HeuristicBot()
+
+    def reply(self, phase: str, context: dict, rng: random.Random) -> str:
+        replies = self.script.get(phase)
+        if not replies:
+            return self.fallback.reply(phase, context, rng)
+        reply = replies[self.positions[phase] % len(replies)]
+        self.positions[phase] += 1
+        return reply
+
+class LocalProvider:
+    """Offline stand-in for the hosted providers, used for `ModelConfig("local", ...)`.
+
+    The model name picks the bot ("heuristic" or any name registered with
+    register_bot). Each reply is seeded from the bot name and prompt, so
+    identical calls get identical replies, which keeps cached runs consistent.
+    Artificial latency and an error rate can be set to load-test the rest of
+    the engine; both are drawn when the call starts, so a seeded run fails the
+    same calls however the concurrent calls finish.
+    """
+
+    def __init__(self, cards: Dict[str, List[str]], latency: float = 0.0,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.cards = cards
+        self.latency = latency  # Mean seconds per call
+        self.latency_jitter = latency_jitter  # +/- seconds, uniform
+        self.error_rate = error_rate
+        self.failure_rng = random.Random(seed)
+        self.bots = {"heuristic": HeuristicBot()}
+        self.calls = 0
+        self.errors = 0
+
+    def register_bot(self, name: str, bot):
+        self.bots[name] = bot
+
+    async def complete(self, model: LLMType, model_name: str, prompt: str,
+                       phase: str, context: dict) -> str:
+        self.calls += 1
+        delay = self.latency + self.failure_rng.uniform(-self.latency_jitter, self.latency_jitter)
+        fails = self.failure_rng.random() < self.error_rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if fails:
+            self.errors += 1
+            raise LocalBotError(f"Simulated failure in local bot for {model.player_name}")
+
+        bot = self.bots.get(model_name)
+        if bot is None:
+            raise ValueError(f"Unknown local bot: {model_name}")
+        # Like a real model, the reply depends only on the model and the prompt
+        digest = hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+        return bot.reply(phase, {**context, "player": model, "cards": self.cards[context["category"]]}, rng)
@@ -0,0 +1,115 @@
+import json
+import os
+import queue
+import sys
+import textwrap
+import threading
+from typing import Iterator
+
+class JsonlLogSink:
+    """Appends one compact JSON line per round on a background writer thread.
+
+    The game loop only puts records on a queue, so disk I/O never blocks it.
+    The writer flushes every `flush_every` records and fsyncs every
+    `fsync_every` records (and always on close).
+    """
+
+    def __init__(self, path: str, flush_every: int = 1, fsync_every: int = 50):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.fsync_every = max(1, fsync_every)
+        self.records_written = 0
+        self._queue = queue.Queue()
+        self._error = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="jsonl-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict):
+        if self._error:
+            raise self._error
+        self._queue.put(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+    def call_when_written(self, callback):
+        """Run callback on the writer thread once every record queued so far is fsynced.
+
+        Used for checkpoints, so a checkpoint never claims rounds the log lacks.
+        """
+        if self._error:
+            raise self._error
+        self._queue.put(callback)
+
+    def close(self):
+        """Write everything still queued, fsync and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _run(self):
+        try:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                if callable(line):
+                    self._sync()
+                    line()
+                    continue
+                self._file.write(line + "\n")
+                self.records_written += 1
+                if self.records_written % self.fsync_every == 0:
+                    self._sync()
+                elif self.records_written % self.flush_every == 0:
+                    self._file.flush()
+            self._sync()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._file.close()
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    """Yield each record of a JSONL log, skipping a torn last line from a crash."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
+
+def jsonl_to_json(src: str, dst: str):
+    """Convert a JSONL log into the pretty JSON array written by earlier versions."""
+    count = 0
+    with open(dst, "w", encoding="utf-8") as out:
+        out.write("[")
+        for record in read_jsonl(src):
+            out.write(",\n" if count else "\n")
+            out.write(textwrap.indent(json.dumps(record, indent=2), "  "))
+            count += 1
+        out.write("\n]" if count else "]")
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python log_sink.py <detailed_log.jsonl> [output.json]")
+        sys.exit(1)
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) == 3 else os.path.splitext(source)[0] + ".json"
+    jsonl_to_json(source, target)
+    print(f"Wrote {target}")
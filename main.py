@@ -1,29 +1,221 @@
-import config
+try:
+    import config  # Sets the API keys; not needed for --local runs
+except ImportError:
+    config = None
 from game_controller import ChameleonGame
 from game_data import cards
+from llm_handler import LLMHandler
+from local_bots import LocalProvider
+from response_cache import ResponseCache
+from checkpoint import load_checkpoint, latest_checkpoint
+from scheduler import AdaptiveScheduler
+from provider_limits import ProviderError
+from hedging import HedgePolicy
+from providers import EndpointLimits
+import argparse
+import contextlib
 import json
+import sys
 from datetime import datetime
 import os
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a Chameleon tournament between LLM players.")
+    parser.add_argument("--rounds-per-category", type=int, default=4,
+                        help="Number of rounds to play in each category (default: 4)")
+    parser.add_argument("--max-concurrent-rounds", type=int, default=4,
+                        help="Maximum number of rounds in flight at once (default: 4)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for word, Chameleon and player order selection")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Cache LLM responses in this directory (off by default)")
+    parser.add_argument("--cache-max-mb", type=int, default=500,
+                        help="Evict least recently used cache entries above this size (default: 500)")
+    parser.add_argument("--cache-max-age-days", type=float, default=30,
+                        help="Evict cache entries older than this (default: 30)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Only serve responses from --cache-dir; fail on any cache miss. "
+                             "Use with the same --seed to replay a recorded tournament offline")
+    parser.add_argument("--local", action="store_true",
+                        help="Play every player with the offline heuristic bot (no API keys or network)")
+    parser.add_argument("--local-latency-ms", type=float, default=0.0,
+                        help="Artificial mean latency per local bot call")
+    parser.add_argument("--local-latency-jitter-ms", type=float, default=0.0,
+                        help="Uniform +/- jitter on the local bot latency")
+    parser.add_argument("--local-error-rate", type=float, default=0.0,
+                        help="Fraction of local bot calls that fail")
+    parser.add_argument("--endpoint", default=None, metavar="BASE_URL",
+                        help="Play every player on this OpenAI-compatible server, e.g. llama.cpp, vLLM "
+                             "or openai_stub_server.py at http://127.0.0.1:8080/v1")
+    parser.add_argument("--endpoint-max-connections", type=int, default=None,
+                        help="Keep-alive connections pooled for the --endpoint server (default: its batch capacity)")
+    parser.add_argument("--endpoint-batch-capacity", type=int, default=None,
+                        help="Requests sent to the --endpoint server at once (default: the slots it reports, or 8)")
+    parser.add_argument("--conversations", action="store_true",
+                        help="Continue each player's vote, tie-break and guess as one conversation per round "
+                             "so providers can serve the earlier turns from their prompt cache")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream hints, votes and guesses and stop reading once the answer is recognized")
+    parser.add_argument("--no-stream-cutoff", action="store_true",
+                        help="With --stream, read every reply to the end and only record when the answer "
+                             "was recognized (to measure time to decision against full completion)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate of any call slower than its model's rolling tail latency "
+                             "and keep whichever reply comes first")
+    parser.add_argument("--hedge-percentile", type=float, default=95,
+                        help="Rolling latency percentile after which a call is hedged")
+    parser.add_argument("--hedge-budget", nargs="+", default=[], metavar="PROVIDER=FRACTION",
+                        help="Largest share of a provider's calls that may be hedged (default 0.05 each), "
+                             "e.g. openai=0.1 google=0")
+    parser.add_argument("--step-retries", type=int, default=2,
+                        help="Times to re-ask a player whose hint, vote or guess can't be used "
+                             "before the round is marked invalid")
+    parser.add_argument("--batch", action="store_true",
+                        help="Play rounds in lockstep waves and send each step as one OpenAI/Anthropic batch job "
+                             "(cheaper, but each job can take minutes to hours)")
+    parser.add_argument("--wave-size", type=int, default=100,
+                        help="Rounds per wave with --batch")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Pick each round's Chameleon and category from the results so far and stop once "
+                             "every model's Chameleon win rate is pinned down (not resumable)")
+    parser.add_argument("--target-width", type=float, default=0.2,
+                        help="With --adaptive, stop once every model's win-rate interval is this wide (default: 0.2)")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="With --adaptive, confidence level of the intervals (default: 0.95)")
+    parser.add_argument("--min-rounds", type=int, default=10,
+                        help="With --adaptive, rounds each model plays as the Chameleon before it can settle")
+    parser.add_argument("--max-rounds", type=int, default=None,
+                        help="With --adaptive, round budget (default: the fixed schedule's size)")
+    parser.add_argument("--max-cost", type=float, default=None,
+                        help="With --adaptive, stop starting rounds once the estimated spend reaches this many USD")
+    parser.add_argument("--log-fsync-every", type=int, default=50,
+                        help="fsync the detailed JSONL log every N rounds (default: 50)")
+    parser.add_argument("--checkpoint-every", type=int, default=1,
+                        help="Write a resume checkpoint every N committed rounds (default: 1)")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None, metavar="CHECKPOINT",
+                        help="Resume an interrupted tournament from a checkpoint "
+                             "(default: the latest one in results/). Other options are taken from the checkpoint")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Don't print round-by-round progress")
+    args = parser.parse_args()
+    if args.replay and not args.cache_dir:
+        parser.error("--replay requires --cache-dir")
+    budgets = {}
+    for item in args.hedge_budget:
+        provider, _, fraction = item.partition("=")
+        try:
+            budgets[provider] = float(fraction)
+        except ValueError:
+            parser.error(f"--hedge-budget expects PROVIDER=FRACTION, got {item!r}")
+    args.hedge_budget = budgets
+    if args.local and args.endpoint:
+        parser.error("--local and --endpoint are alternatives")
+    if args.adaptive and (args.resume or args.batch):
+        parser.error("--adaptive can't be combined with --resume or --batch")
+    return args
+
 def main():
-    # Create unique filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    args = parse_args()
+    
+    checkpoint = None
+    if args.resume:
+        checkpoint_file = latest_checkpoint() if args.resume == "latest" else args.resume
+        if not checkpoint_file:
+            sys.exit("No checkpoint found in results/ to resume from")
+        checkpoint = load_checkpoint(checkpoint_file)
+        if checkpoint["complete"]:
+            sys.exit(f"The tournament in {checkpoint_file} already finished")
+        # Re-run with the interrupted tournament's own options
+        saved_args = checkpoint["metadata"]["args"]
+        args = argparse.Namespace(**{**vars(args), **saved_args, "resume": args.resume, "quiet": args.quiet})
+        timestamp = checkpoint["metadata"]["timestamp"]
+        print(f"Resuming from {checkpoint_file}: {checkpoint['rounds_completed']} of "
+              f"{checkpoint['total_rounds']} rounds done, next up {checkpoint['next_category']} "
+              f"round {checkpoint['next_round_in_category'] + 1}")
+    else:
+        # Create unique filename with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        checkpoint_file = os.path.join("results", f"chameleon_checkpoint_{timestamp}.json")
+    
+    if config is None and not (args.local or args.endpoint):
+        sys.exit("config.py not found - copy config.template.py and add your API keys, or use --local")
+    
     stats_file = os.path.join("results", f"chameleon_stats_{timestamp}.json")
+    calls_file = os.path.join("results", f"chameleon_calls_{timestamp}.json")
+    log_file = checkpoint["log_file"] if checkpoint else f"chameleon_detailed_log_{timestamp}.jsonl"
+    
+    cache = None
+    if args.cache_dir:
+        cache = ResponseCache(
+            args.cache_dir,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+            max_age_seconds=args.cache_max_age_days * 24 * 3600,
+            replay=args.replay
+        )
     
-    game = ChameleonGame(cards)
-    game.play_tournament(rounds_per_category=4)
+    local_provider = LocalProvider(
+        cards,
+        latency=args.local_latency_ms / 1000,
+        latency_jitter=args.local_latency_jitter_ms / 1000,
+        error_rate=args.local_error_rate,
+        seed=args.seed
+    )
+    llm_handler = LLMHandler(cards, cache=cache, local_only=args.local, local_provider=local_provider,
+                             conversations=args.conversations, batch=args.batch,
+                             stream=args.stream, stream_cutoff=not args.no_stream_cutoff,
+                             hedging=HedgePolicy(args.hedge_budget, args.hedge_percentile) if args.hedge else None,
+                             step_retries=args.step_retries, endpoint=args.endpoint,
+                             endpoint_limits=EndpointLimits(args.endpoint_max_connections,
+                                                            args.endpoint_batch_capacity))
+    
+    game = ChameleonGame(cards, max_concurrent_rounds=args.max_concurrent_rounds,
+                         seed=args.seed, llm_handler=llm_handler)
+    if checkpoint:
+        game.restore_checkpoint(checkpoint)
+    
+    metadata = {
+        "timestamp": timestamp,
+        "args": {key: value for key, value in vars(args).items() if key not in ("resume", "quiet")}
+    }
+    scheduler = None
+    if args.adaptive:
+        fixed_rounds = args.rounds_per_category * len(cards)
+        scheduler = AdaptiveScheduler(
+            cards, game.players, game.rng,
+            target_width=args.target_width,
+            confidence=args.confidence,
+            min_rounds=args.min_rounds,
+            max_rounds=args.max_rounds or fixed_rounds,
+            max_cost=args.max_cost,
+            cost=lambda: llm_handler.instrumentation.total_cost,
+            fixed_rounds=fixed_rounds
+        )
+    llm_handler.instrumentation.stream_to(calls_file + "l")  # Appended to on --resume
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")) if args.quiet else contextlib.nullcontext():
+            if scheduler:
+                game.play_adaptive(scheduler, log_file=log_file, log_fsync_every=args.log_fsync_every)
+            else:
+                game.play_tournament(rounds_per_category=args.rounds_per_category,
+                                     log_file=log_file,
+                                     log_fsync_every=args.log_fsync_every,
+                                     checkpoint_file=checkpoint_file,
+                                     checkpoint_every=args.checkpoint_every,
+                                     metadata=metadata,
+                                     wave_size=args.wave_size if args.batch else None)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted after {game.rounds_logged} rounds."
+              + ("" if scheduler or not os.path.exists(checkpoint_file) else f" Continue with: python main.py --resume {checkpoint_file}"))
+        sys.exit(130)
+    except ProviderError as e:
+        print(f"\nStopped after {game.rounds_logged} rounds: {e}"
+              + ("" if scheduler or not os.path.exists(checkpoint_file) else f"\nContinue with: python main.py --resume {checkpoint_file}"))
+        sys.exit(1)
+    finally:
+        llm_handler.instrumentation.close()
     
     # Save statistics to file
-    stats = game.get_final_stats()
-    stats_output = {}
-    for model, stat in stats.items():
-        stats_output[model.model_name] = {
-            "times_as_chameleon": stat.times_as_chameleon,
-            "times_identified": stat.times_identified,
-            "correct_guesses": stat.correct_guesses,
-            "correct_votes": stat.correct_votes,
-            "times_falsely_accused": stat.times_falsely_accused
-        }
+    stats_output = game.stats_summary(game.get_final_stats())
     
     # Ensure results directory exists
     os.makedirs("results", exist_ok=True)
@@ -31,7 +223,80 @@ def main():
     with open(stats_file, 'w') as f:
         json.dump(stats_output, f, indent=4)
     
+    if scheduler:
+        adaptive_file = os.path.join("results", f"chameleon_adaptive_{timestamp}.json")
+        adaptive_report = scheduler.report()
+        with open(adaptive_file, "w") as f:
+            json.dump(adaptive_report, f, indent=4)
+    
+    game.llm_handler.instrumentation.write_summary(calls_file)
+    
     print(f"\n\nGame complete! Statistics have been saved to {stats_file}")
+    print(f"Per-model, per-phase call latency, tokens and cost saved to {calls_file} (every call in {calls_file}l)")
+    print(f"Estimated API cost: ${game.llm_handler.instrumentation.total_cost:.4f}")
+    valid_rounds = game.rounds_logged - game.invalid_rounds
+    total_cost = game.llm_handler.instrumentation.total_cost
+    print(f"Valid rounds: {valid_rounds} of {game.rounds_logged}"
+          + (f" ({valid_rounds / total_cost:.1f} per dollar)" if total_cost > 0 else ""))
+    
+    if scheduler:
+        print(f"\nAdaptive schedule stopped ({adaptive_report['stop_reason']}) after "
+              f"{adaptive_report['rounds_played']} of {adaptive_report['fixed_schedule_rounds']} fixed-schedule rounds "
+              f"({adaptive_report['invalid_rounds']} invalid): "
+              f"{adaptive_report['rounds_saved']} saved ({adaptive_report['rounds_saved_pct']}%). "
+              f"Ratings saved to {adaptive_file}")
+        for name, rating in adaptive_report["models"].items():
+            print(f"  {name}: win rate {rating['chameleon_win_rate']:.3f} "
+                  f"+/- {rating['interval_width'] / 2:.3f} over {rating['rounds_as_chameleon']} rounds"
+                  f"{'' if rating['settled'] else ' (not settled)'}")
+    
+    overall = game.llm_handler.instrumentation.overall
+    decision, full = overall.latencies["decision"], overall.latencies["full_completion"]
+    if decision.seen:
+        print(f"\nStreaming: answer recognized in {decision.seen} calls, "
+              f"{overall.cut_off} cut off early; "
+              f"time to decision p50 {decision.percentile(50) * 1000:.0f} ms"
+              + (f", full completion p50 {full.percentile(50) * 1000:.0f} ms" if full.seen else ""))
+    
+    if game.llm_handler.hedging:
+        instrumentation = game.llm_handler.instrumentation
+        print(f"\nHedged calls (extra spend ${instrumentation.hedge_cost:.4f} of "
+              f"${instrumentation.total_cost:.4f}):")
+        for provider, counts in game.llm_handler.hedging.report().items():
+            print(f"  {provider}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+    
+    step_report = game.llm_handler.step_report()
+    if step_report:
+        print("\nSteps asked again (retried) and left unusable (failed):")
+        for phase, counts in step_report.items():
+            print(f"  {phase}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+    
+    if cache:
+        print(f"\nResponse cache: {cache.hits} hits, {cache.misses} misses, "
+              f"{cache.merged} merged in-flight duplicates")
+    
+    print("\nProvider startup and per-call client overhead:")
+    for provider, timings in game.llm_handler.providers.report().items():
+        print(f"  {provider}: " + ", ".join(f"{key}={value}" for key, value in timings.items()))
+    
+    if game.llm_handler.batcher:
+        print("\nBatch jobs:")
+        for provider, counts in game.llm_handler.batcher.report().items():
+            print(f"  {provider}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+    
+    limiter_report = game.llm_handler.rate_limiter.report()
+    if any(any(counts.values()) for counts in limiter_report.values()):
+        print("\nProvider retries and failures:")
+        for provider, counts in limiter_report.items():
+            print(f"  {provider}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+    
+    print("\nInput tokens per phase (cacheable = stable prefix and history, cached = reported by provider):")
+    for phase, tokens in game.llm_handler.prompt_tokens.report().items():
+        print(f"  {phase}: " + ", ".join(f"{key}={value}" for key, value in tokens.items()))
+    
+    print("\nAnswer resolution (local matches vs. LLM extractor calls):")
+    for kind, paths in game.llm_handler.resolver.report().items():
+        print(f"  {kind}: " + ", ".join(f"{path}={count}" for path, count in paths.items()))
     
 if __name__ == "__main__":
     main() 
\ No newline at end of file
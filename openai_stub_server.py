@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from game_models import LLMType
+from local_bots import HeuristicBot
+
+PLAYERS = {player.player_name: player for player in LLMType}
+HINT_LINE = re.compile(r"^(" + "|".join(PLAYERS) + r"): (.+)$", re.MULTILINE)
+
+def game_context(messages: list) -> Optional[tuple]:
+    """The phase and local-bot context behind a game prompt, read back from its text.
+
+    Conversations repeat the category, word and hints only in earlier turns,
+    so they are read from the whole conversation and the phase from the last
+    user turn. None for prompts that aren't from the game.
+    """
+    text = "\n".join(str(m.get("content") or "") for m in messages)
+    last = next((str(m.get("content") or "") for m in reversed(messages) if m.get("role") == "user"), "")
+    category = re.search(r"The category is '(.+?)' and these are all possible words: (.*)\.\n", text)
+    if category is None:
+        return None
+    if "ONE-WORD hint" in last:
+        phase = "hint"
+    elif "There was a tie between these players:" in last:
+        phase = "tie_break"
+    elif "Who do you think is the Chameleon?" in last:
+        phase = "vote"
+    elif "which word from the list" in last:
+        phase = "guess"
+    else:
+        return None
+    word = re.search(r"The secret word is '(.+?)'\. ", text)
+    player = re.search(r"You are playing as (\w+)\.", text)
+    hints = {}
+    for name, hint in HINT_LINE.findall(text):
+        hints[PLAYERS[name]] = hint.strip()
+    candidates = list(LLMType)
+    if phase == "tie_break":
+        tied = re.findall(r"There was a tie between these players: (.+)", last)[-1]
+        candidates = [PLAYERS[name] for name in tied.split(", ") if name in PLAYERS]
+    return phase, {
+        "category": category.group(1),
+        "cards": category.group(2).split(", "),
+        "word": word.group(1) if word and phase != "guess" else None,
+        "player": PLAYERS.get(player.group(1)) if player else None,
+        "hints": list(hints.items()),
+        "candidates": candidates,
+    }
+
+class StubServer(ThreadingHTTPServer):
+    """An OpenAI-compatible chat server for testing, playing the game with the local heuristic bot.
+
+    Like llama.cpp it decodes at most `slots` requests at once (reported at
+    /props) and queues the rest; each takes about `latency` seconds. With
+    `chatter` every answer is followed by a few sentences of explanation, as
+    chat models tend to add, which streamed calls can cut off. /stats counts
+    the connections opened, so keep-alive reuse can be checked.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, slots: int = 4, latency: float = 0.0, chatter: bool = False):
+        super().__init__(address, StubHandler)
+        self.slots = slots
+        self.latency = latency
+        self.chatter = chatter
+        self.free_slots = threading.Semaphore(slots)
+        self.bot = HeuristicBot()
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "requests": 0, "streams_closed_early": 0,
+                      "busy_slots": 0, "peak_busy_slots": 0, "queued": 0, "peak_queued": 0}
+
+    def count(self, key: str, delta: int = 1):
+        with self.lock:
+            self.stats[key] += delta
+            peak = "peak_" + key
+            if peak in self.stats:
+                self.stats[peak] = max(self.stats[peak], self.stats[key])
+
+    def reply(self, body: dict) -> str:
+        messages = body.get("messages", [])
+        found = game_context(messages)
+        if found is None:
+            return "OK"
+        phase, context = found
+        # Like the local bots, the reply depends only on the model and the prompt
+        digest = hashlib.sha256(json.dumps([body.get("model"), messages]).encode("utf-8")).digest()
+        answer = self.bot.reply(phase, context, random.Random(int.from_bytes(digest[:8], "big")))
+        if self.chatter:
+            answer += ".\n" + "That is my answer, based on the category and the hints given so far. " * 3
+        return answer
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections open between requests
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._json({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+        elif self.path == "/props":
+            self._json({"total_slots": self.server.slots})
+        elif self.path == "/stats":
+            self._json(self.server.stats)
+        else:
+            self._json({"error": {"message": f"Not found: {self.path}"}}, 404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != "/v1/chat/completions":
+            self._json({"error": {"message": f"Not found: {self.path}"}}, 404)
+            return
+        server = self.server
+        server.count("requests")
+        if not server.free_slots.acquire(blocking=False):
+            server.count("queued")
+            server.free_slots.acquire()
+            server.count("queued", -1)
+        server.count("busy_slots")
+        try:
+            text = server.reply(body)
+            usage = {"prompt_tokens": len(json.dumps(body.get("messages"))) // 4,
+                     "completion_tokens": len(text) // 4 + 1}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            if body.get("stream"):
+                self._stream(body, text, usage)
+            else:
+                time.sleep(server.latency)
+                self._json({
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+        finally:
+            server.count("busy_slots", -1)
+            server.free_slots.release()
+
+    def _stream(self, body: dict, text: str, usage: dict):
+        """Send the reply a few characters per server-sent event, spread over the latency."""
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+        chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": body.get("model")}
+        events = [{**chunk, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                  for piece in pieces]
+        events.append({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append({**chunk, "choices": [], "usage": usage})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in events:
+                time.sleep(self.server.latency / len(events))
+                self._chunk(f"data: {json.dumps(event)}\n\n")
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count("streams_closed_early")  # The client had its answer and hung up
+            self.close_connection = True
+
+    def _chunk(self, data: str):
+        encoded = data.encode("utf-8")
+        self.wfile.write(f"{len(encoded):x}\r\n".encode("ascii") + encoded + b"\r\n")
+        self.wfile.flush()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local OpenAI-compatible stub server for testing the openai_compatible provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--slots", type=int, default=4,
+                        help="Requests decoded at once; the rest queue (reported at /props like llama.cpp)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Time each request takes once it has a slot")
+    parser.add_argument("--chatter", action="store_true",
+                        help="Follow each answer with a few sentences, for testing --stream's early cutoff")
+    args = parser.parse_args()
+    server = StubServer((args.host, args.port), slots=args.slots, latency=args.latency_ms / 1000,
+                        chatter=args.chatter)
+    print(f"Serving the stub at http://{args.host}:{server.server_port}/v1 with {args.slots} slots")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Union
+
+from game_models import LLMType
+
+@dataclass
+class Prompt:
+    """A user turn split into the part that repeats across calls and the part that doesn't.
+
+    `prefix` is identical for every call in the same category and phase, so it
+    goes first where providers can cache it; `suffix` holds the player, the
+    secret word and the hints.
+    """
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+def message_text(content) -> str:
+    return content.text if isinstance(content, Prompt) else content
+
+def flatten(messages: List[dict]) -> str:
+    """One string for a conversation, used for cache keys and by the local bots.
+
+    A single user turn flattens to just its text.
+    """
+    if len(messages) == 1:
+        return message_text(messages[0]["content"])
+    return "\n\n".join(f"{m['role']}: {message_text(m['content'])}" for m in messages)
+
+def _hint_lines(hints: List[Tuple[LLMType, str]]) -> str:
+    return "".join(f"{player.player_name}: {hint}\n" for player, hint in hints)
+
+class PromptBuilder:
+    """Prompt templates, with each category's card list formatted once up front."""
+
+    def __init__(self, cards: Dict[str, List[str]], players: List[LLMType]):
+        names = [p.player_name for p in players]
+        self.roster = ", ".join(names[:-1]) + f", or {names[-1]}" if len(names) > 1 else names[0]
+        self.categories = {
+            category: f"The category is '{category}' and these are all possible words: {', '.join(words)}.\n"
+            for category, words in cards.items()
+        }
+        # Stable instructions per phase, placed right after the card list
+        self.phase_rules = {
+            "hint": "Recall the instructions and give your ONE-WORD hint when asked.\n",
+            "vote": f"After the hints, name the player you think is the Chameleon ({self.roster}).\n",
+            "tie_break": "After the hints, break a tie by choosing one of the tied players as the Chameleon.\n",
+            # The win condition is stated once, in guess_followup, which conversations also send alone
+            "guess": "You are the Chameleon. After the hints, guess the secret word from the list above.\n",
+        }
+        self._prefixes = {}
+
+    def prefix(self, category: str, phase: str) -> str:
+        key = (category, phase)
+        if key not in self._prefixes:
+            self._prefixes[key] = self.categories[category] + self.phase_rules[phase]
+        return self._prefixes[key]
+
+    @staticmethod
+    def _role(word: str, is_chameleon: bool) -> str:
+        if is_chameleon:
+            return "You are the Chameleon and need to vote to avoid suspicion. "
+        return f"The secret word is '{word}'. "
+
+    def hint(self, category: str, word: str, previous_hints: List[Tuple[LLMType, str]],
+             is_chameleon: bool = False) -> Prompt:
+        suffix = "You don't know the secret word. " if is_chameleon else f"The secret word is '{word}'. "
+        if previous_hints:
+            suffix += "\nHere are the hints given so far:\n" + _hint_lines(previous_hints)
+        suffix += "\nRecall the instructions and give your ONE-WORD hint:"
+        return Prompt(self.prefix(category, "hint"), suffix)
+
+    def vote(self, model: LLMType, category: str, word: str,
+             all_hints: List[Tuple[LLMType, str]], is_chameleon: bool = False) -> Prompt:
+        suffix = (f"You are playing as {model.player_name}. " + self._role(word, is_chameleon)
+                  + "\nAll hints given:\n" + _hint_lines(all_hints)
+                  + f"\nWho do you think is the Chameleon? Answer with just their name ({self.roster}).")
+        return Prompt(self.prefix(category, "vote"), suffix)
+
+    def tie_break(self, model: LLMType, category: str, word: str,
+                  all_hints: List[Tuple[LLMType, str]], tied_players: List[LLMType],
+                  is_chameleon: bool = False) -> Prompt:
+        suffix = (f"You are playing as {model.player_name}. " + self._role(word, is_chameleon)
+                  + "Given these hints:\n" + _hint_lines(all_hints)
+                  + self.tie_break_followup(tied_players))
+        return Prompt(self.prefix(category, "tie_break"), suffix)
+
+    @staticmethod
+    def tie_break_followup(tied_players: List[LLMType]) -> str:
+        """The tie-break question on its own, for a conversation that already has the hints."""
+        return ("\nThere was a tie between these players: " + ", ".join(p.player_name for p in tied_players)
+                + "\nWho do you think is the Chameleon? Choose only from the tied players listed above.")
+
+    def guess(self, model: LLMType, category: str, all_hints: List[Tuple[LLMType, str]]) -> Prompt:
+        suffix = (f"You are playing as {model.player_name}. Given these hints from all players:\n"
+                  + _hint_lines(all_hints) + self.guess_followup())
+        return Prompt(self.prefix(category, "guess"), suffix)
+
+    @staticmethod
+    def guess_followup() -> str:
+        return ("\nBased on these hints, which word from the list do you think is the secret word? "
+                "If you choose the secret word from the list correctly based on the hints, you win the game. "
+                "Choose and answer with exactly one of the words/phrases from the list above.")
+
+def correction(reply: str, problem: str) -> str:
+    """A short turn asking again after an unusable reply, for a conversation that already holds the question."""
+    shown = reply if len(reply) <= 200 else reply[:200] + "..."
+    return f"Your previous answer ({shown!r}) couldn't be used: {problem}. Please answer again."
+
+def retry_prompt(prompt: Union[str, Prompt], reply: str, problem: str) -> Union[str, Prompt]:
+    """The same prompt again, with a note on why the previous reply couldn't be used."""
+    note = "\n\n" + correction(reply, problem)
+    if isinstance(prompt, Prompt):
+        return Prompt(prompt.prefix, prompt.suffix + note)
+    return prompt + note
+
+class Conversation:
+    """One player's vote, tie-break and guess turns in a round, sent as a growing conversation.
+
+    Every turn re-sends the earlier ones unchanged, so they form a cacheable
+    prefix for the next.
+    """
+
+    def __init__(self, player: LLMType):
+        self.player = player
+        self.messages: List[dict] = []
+
+    def add(self, prompt, reply: str):
+        self.messages.append({"role": "user", "content": prompt})
+        self.messages.append({"role": "assistant", "content": reply})
+
+@dataclass
+class PhaseTokens:
+    calls: int = 0
+    input_tokens: int = 0  # As reported by the provider, or estimated at 4 characters per token
+    cacheable_tokens: int = 0  # Estimated system prompt, stable prefix and conversation history
+    cached_tokens: int = 0  # Reported by the provider as read from its prompt cache
+
+class PromptTokenReport:
+    """Per-phase input tokens, and how many of them a provider's prompt cache can serve."""
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseTokens] = defaultdict(PhaseTokens)
+
+    def record(self, phase: str, system: str, messages: List[dict], usage=None):
+        total = len(system) + sum(len(message_text(m["content"])) for m in messages)
+        last = messages[-1]["content"]
+        stable = total - (len(last.suffix) if isinstance(last, Prompt) else len(last))
+        tokens = self.phases[phase]
+        tokens.calls += 1
+        tokens.cacheable_tokens += stable // 4
+        if usage is not None and usage.input_tokens is not None:
+            tokens.input_tokens += usage.input_tokens
+            tokens.cached_tokens += usage.cached_tokens or 0
+        else:
+            tokens.input_tokens += total // 4
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            phase: {
+                "calls": t.calls,
+                "input_tokens": t.input_tokens,
+                "cacheable_tokens": t.cacheable_tokens,
+                "cached_tokens": t.cached_tokens,
+                "cacheable_pct": round(100 * t.cacheable_tokens / t.input_tokens, 1) if t.input_tokens else 0.0,
+                "cached_pct": round(100 * t.cached_tokens / t.input_tokens, 1) if t.input_tokens else 0.0,
+            }
+            for phase, t in sorted(self.phases.items())
+        }
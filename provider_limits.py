@@ -0,0 +1,242 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+@dataclass
+class ProviderLimits:
+    requests_per_minute: float
+    tokens_per_minute: float
+    max_concurrency: int
+    max_retries: int = 6
+    base_delay: float = 1.0  # Seconds before the first retry, doubled on each attempt
+    max_delay: float = 60.0
+    failure_threshold: int = 5  # Consecutive failures that open the circuit
+    cooldown: float = 30.0  # Seconds the circuit stays open before a trial call
+
+# Adjust to your account tiers. The local bots are effectively unlimited, and
+# self-hosted servers are capped by their batch capacity (providers.ENDPOINT_LIMITS).
+DEFAULT_LIMITS = {
+    "openai": ProviderLimits(requests_per_minute=500, tokens_per_minute=200_000, max_concurrency=32),
+    "anthropic": ProviderLimits(requests_per_minute=50, tokens_per_minute=40_000, max_concurrency=8),
+    "google": ProviderLimits(requests_per_minute=1000, tokens_per_minute=1_000_000, max_concurrency=32),
+    "openai_compatible": ProviderLimits(requests_per_minute=float("inf"), tokens_per_minute=float("inf"),
+                                        max_concurrency=10_000, base_delay=0.5, cooldown=5.0),
+    "local": ProviderLimits(requests_per_minute=float("inf"), tokens_per_minute=float("inf"),
+                            max_concurrency=10_000, base_delay=0.0, cooldown=0.1),
+}
+
+def shared_limits(processes: int, limits: Dict[str, ProviderLimits] = None) -> Dict[str, ProviderLimits]:
+    """One process's slice of `limits`, for `processes` processes calling the same providers at once."""
+    return {
+        name: replace(limit, requests_per_minute=limit.requests_per_minute / processes,
+                      tokens_per_minute=limit.tokens_per_minute / processes,
+                      max_concurrency=max(1, limit.max_concurrency // processes))
+        for name, limit in (limits or DEFAULT_LIMITS).items()
+    }
+
+class ProviderError(Exception):
+    """A provider call that failed for good: not retryable, or out of retries."""
+
+    def __init__(self, provider: str, attempts: int, cause: Exception):
+        super().__init__(f"{provider} call failed after {attempts} attempt(s): {cause}")
+        self.provider = provider
+        self.attempts = attempts
+        self.cause = cause
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_NAMES = ("RateLimit", "Timeout", "Connection", "Overloaded", "ServiceUnavailable",
+                   "ResourceExhausted", "InternalServer", "DeadlineExceeded", "LocalBotError")
+
+def _status_code(exc: Exception) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+def is_retryable(exc: Exception) -> bool:
+    """Rate limits, overloads, timeouts and dropped connections are worth retrying."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return any(name in type(exc).__name__ for name in RETRYABLE_NAMES) or isinstance(exc, (TimeoutError, ConnectionError))
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms headers), if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` units per second, up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.available = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        if self.capacity == float("inf"):
+            return
+        amount = min(amount, self.capacity)  # A single huge request must still get through
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+
+    def refund(self, amount: float):
+        """Give back an over-estimate once the real usage is known."""
+        if self.capacity != float("inf"):
+            self.available = min(self.capacity, self.available + amount)
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive retryable failures and holds all calls for `cooldown`.
+
+    After the cooldown one trial call goes through; success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    async def wait(self):
+        """Block while the circuit is open; let exactly one trial call through after the cooldown."""
+        while self.opened_at is not None:
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+            if not self._trial.locked():
+                await self._trial.acquire()
+                return  # This caller is the trial call
+            await asyncio.sleep(min(1.0, self.cooldown))
+
+    def release_trial(self):
+        """Let another caller make the trial call, when this one ended without showing whether the provider is back."""
+        if self._trial.locked():
+            self._trial.release()
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        if self._trial.locked():
+            self._trial.release()
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial.locked():
+            self._trial.release()
+            self.opened_at = time.monotonic()  # Trial failed - back to open
+        elif self.failures >= self.failure_threshold and self.opened_at is None:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            print(f"Circuit opened after {self.failures} consecutive failures; pausing for {self.cooldown:.1f}s")
+
+class ProviderLimiter:
+    """Rate limits, concurrency cap, retries and circuit breaker for one provider."""
+
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self.requests = TokenBucket(limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute)
+        self.semaphore = asyncio.Semaphore(limits.max_concurrency)
+        self.breaker = CircuitBreaker(limits.failure_threshold, limits.cooldown)
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        requested = retry_after(exc)
+        if requested is not None:
+            return min(requested, self.limits.max_delay) + random.uniform(0, 0.25)
+        delay = min(self.limits.max_delay, self.limits.base_delay * 2 ** attempt)
+        return random.uniform(0, delay)  # Full jitter
+
+    async def run(self, call: Callable[[], Awaitable], estimated_tokens: int = 0):
+        attempt = 0
+        while True:
+            await self.breaker.wait()
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+            try:
+                async with self.semaphore:
+                    result = await call()
+            except asyncio.CancelledError:
+                if self.breaker.is_open:
+                    self.breaker.release_trial()
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # A bad request or a rejected key is the caller's problem, not an outage
+                    self.breaker.release_trial()
+                if not retryable or attempt >= self.limits.max_retries:
+                    self.failures += 1
+                    raise ProviderError(self.name, attempt + 1, e) from e
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self.retries += 1
+                print(f"{self.name} call failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+class RateLimiter:
+    """One ProviderLimiter per provider, created on first use."""
+
+    def __init__(self, limits: Dict[str, ProviderLimits] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.providers: Dict[str, ProviderLimiter] = {}
+
+    def for_provider(self, provider: str) -> ProviderLimiter:
+        if provider not in self.providers:
+            limits = self.limits.get(provider) or self.limits["openai"]
+            self.providers[provider] = ProviderLimiter(provider, limits)
+        return self.providers[provider]
+
+    async def run(self, provider: str, call: Callable[[], Awaitable], estimated_tokens: int = 0):
+        return await self.for_provider(provider).run(call, estimated_tokens)
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            name: {"retries": p.retries, "failures": p.failures, "circuit_opened": p.breaker.times_opened}
+            for name, p in self.providers.items()
+        }
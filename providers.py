@@ -0,0 +1,556 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from prompts import Prompt, flatten, message_text
+
+@dataclass
+class Completion:
+    """A reply plus the token usage the provider reported (None where it doesn't)."""
+    text: str
+    input_tokens: Optional[int] = None  # Including tokens read from the prompt cache
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    batched: bool = False  # Served by a provider batch job (billed at the batch discount)
+    first_token_seconds: Optional[float] = None  # Streamed calls: request start to the first text
+    decision_seconds: Optional[float] = None  # Streamed calls: request start to a recognized answer
+    cut_off: bool = False  # The stream was cancelled as soon as the answer was recognized
+
+# Given the reply so far, the part holding a complete answer, or None to keep reading
+Decide = Callable[[str], Optional[str]]
+
+class StreamState:
+    """Accumulates a streamed reply and notes when the first text and the answer arrived."""
+
+    def __init__(self, decide: Decide):
+        self.decide = decide
+        self.started = time.perf_counter()
+        self.text = ""
+        self.answer = None
+        self.first_token_seconds = None
+        self.decision_seconds = None
+
+    def add(self, delta: str) -> bool:
+        """Add a chunk of text; True once the answer is complete."""
+        if not delta:
+            return False
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.started
+        self.text += delta
+        if self.answer is None:
+            self.answer = self.decide(self.text)
+            if self.answer is not None:
+                self.decision_seconds = time.perf_counter() - self.started
+        return self.answer is not None
+
+    def completion(self, cut_off: bool, **usage) -> Completion:
+        return Completion((self.answer if cut_off else self.text).strip(), **usage,
+                          first_token_seconds=self.first_token_seconds,
+                          decision_seconds=self.decision_seconds, cut_off=cut_off)
+
+def _estimated_usage(system: str, messages: List[dict], text: str) -> dict:
+    """Token counts at about 4 characters per token, for streams cut off before the provider sent usage."""
+    return {"input_tokens": (len(system) + len(flatten(messages))) // 4, "output_tokens": len(text) // 4 + 1,
+            "cached_tokens": 0}
+
+class ProviderAdapter:
+    """Talks to one provider's SDK, which is imported only when the adapter is first used.
+
+    Clients (and per-model objects where the SDK needs them) are built once and
+    reused. `timings` records the one-off startup costs and the time spent
+    preparing each call outside the network request.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.timings = {"import": 0.0, "client": 0.0, "warm_up": 0.0}
+        self.calls = 0
+        self.prepare_seconds = 0.0  # Client-side overhead per call, excluding the request itself
+        self._client = None
+
+    def _import_sdk(self):
+        raise NotImplementedError
+
+    def _create_client(self, sdk):
+        raise NotImplementedError
+
+    @property
+    def client(self):
+        if self._client is None:
+            start = time.perf_counter()
+            sdk = self._import_sdk()
+            imported = time.perf_counter()
+            self._client = self._create_client(sdk)
+            self.timings["import"] = imported - start
+            self.timings["client"] = time.perf_counter() - imported
+        return self._client
+
+    async def complete(self, model_name: str, system: str, messages: List[dict],
+                       params: dict, **game) -> Completion:
+        """Send a conversation of {"role", "content"} messages, ending with a user turn.
+
+        Content is a plain string or a Prompt whose prefix the adapter may mark cacheable.
+        """
+        raise NotImplementedError
+
+    async def stream(self, model_name: str, system: str, messages: List[dict], params: dict,
+                     decide: Decide, cutoff: bool = True, **game) -> Completion:
+        """Like complete, but read the reply as it streams and stop once decide() finds the answer.
+
+        With cutoff=False the stream is read to the end and the decision time
+        is only recorded. Adapters without streaming make a normal call and
+        check the whole reply.
+        """
+        state = StreamState(decide)
+        completion = await self.complete(model_name, system, messages, params, **game)
+        state.add(completion.text)
+        completion.first_token_seconds = state.first_token_seconds
+        completion.decision_seconds = state.decision_seconds
+        return completion
+
+    async def _warm_up(self, model_name: str):
+        """Open a connection to the provider with a cheap request."""
+
+    async def warm_up(self, model_names: Iterable[str], timeout: float = 10.0):
+        start = time.perf_counter()
+        self.client  # Import and build outside the timed game loop
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(self._warm_up(name) for name in model_names)), timeout
+            )
+        except Exception as e:
+            print(f"Warm-up for {self.name} failed (continuing): {e}")
+        self.timings["warm_up"] = time.perf_counter() - start
+
+    def report(self) -> dict:
+        return {
+            **{f"{key}_ms": round(value * 1000, 1) for key, value in self.timings.items()},
+            "calls": self.calls,
+            "prepare_us_per_call": round(self.prepare_seconds / self.calls * 1e6, 1) if self.calls else 0.0,
+        }
+
+class OpenAIAdapter(ProviderAdapter):
+    name = "openai"
+
+    def _import_sdk(self):
+        import openai
+        return openai
+
+    def _create_client(self, openai):
+        return openai.AsyncOpenAI(max_retries=0)  # Retries are handled by provider_limits
+
+    async def _warm_up(self, model_name: str):
+        await self.client.models.retrieve(model_name)
+
+    @staticmethod
+    def request_body(model_name: str, system: str, messages: List[dict], params: dict) -> dict:
+        """Chat completions request, also used for the lines of a batch file."""
+        # OpenAI caches repeated prefixes automatically; the stable parts already come first
+        return {
+            "model": model_name,
+            "messages": [{"role": "assistant", "content": system}] + [
+                {"role": m["role"], "content": message_text(m["content"])} for m in messages
+            ],
+            **params
+        }
+
+    def _chat_client(self, game: dict):
+        """The client for a call, given its game keyword arguments."""
+        return self.client
+
+    async def complete(self, model_name: str, system: str, messages: List[dict],
+                       params: dict, **game) -> Completion:
+        start = time.perf_counter()
+        client = self._chat_client(game)
+        body = self.request_body(model_name, system, messages, params)
+        self.calls += 1
+        self.prepare_seconds += time.perf_counter() - start
+        response = await client.chat.completions.create(**body)
+        return self.with_usage(response.choices[0].message.content.strip(), response)
+
+    async def stream(self, model_name: str, system: str, messages: List[dict], params: dict,
+                     decide: Decide, cutoff: bool = True, **game) -> Completion:
+        start = time.perf_counter()
+        client = self._chat_client(game)
+        body = self.request_body(model_name, system, messages, params)
+        self.calls += 1
+        self.prepare_seconds += time.perf_counter() - start
+        state = StreamState(decide)
+        usage = None
+        stream = await client.chat.completions.create(**body, stream=True, stream_options={"include_usage": True})
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk
+                if chunk.choices and state.add(chunk.choices[0].delta.content) and cutoff:
+                    # Usage only arrives in the last chunk, so a cut-off call is estimated
+                    return state.completion(True, **_estimated_usage(system, messages, state.text))
+        finally:
+            await stream.close()
+        if usage is None:
+            return state.completion(False, **_estimated_usage(system, messages, state.text))
+        completion = self.with_usage(state.text.strip(), usage)
+        completion.first_token_seconds = state.first_token_seconds
+        completion.decision_seconds = state.decision_seconds
+        return completion
+
+    @staticmethod
+    def with_usage(text: str, response) -> Completion:
+        """A Completion carrying the usage of a chat completions response."""
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        return Completion(
+            text,
+            input_tokens=getattr(usage, "prompt_tokens", None),
+            output_tokens=getattr(usage, "completion_tokens", None),
+            cached_tokens=getattr(details, "cached_tokens", None) or 0,
+        )
+
+@dataclass
+class EndpointLimits:
+    """Connection pool and concurrency for one OpenAI-compatible server."""
+    max_connections: Optional[int] = None  # Pooled keep-alive connections; None for one per batch slot
+    batch_capacity: Optional[int] = None  # Requests the server decodes at once; None to ask the server
+    share: int = 1  # Processes sending to the server at once, which split its capacity and connections
+
+DEFAULT_BATCH_CAPACITY = 8  # For servers that don't report their slots (llama.cpp does, at /props)
+
+# Adjust to your servers (llama.cpp --parallel, vLLM --max-num-seqs), keyed by base URL.
+# Limits passed to the adapter (main.py's --endpoint-* flags) take precedence.
+ENDPOINT_LIMITS: Dict[str, EndpointLimits] = {}
+
+class Server:
+    """One OpenAI-compatible server: its pooled client and a slot per request it can decode at once."""
+
+    def __init__(self, client, capacity: int, max_connections: int):
+        self.client = client
+        self.capacity = capacity
+        self.max_connections = max_connections
+        self.slots = asyncio.Semaphore(capacity)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def __aenter__(self):
+        await self.slots.acquire()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self.slots.release()
+
+class OpenAICompatibleAdapter(OpenAIAdapter):
+    """Self-hosted models behind an OpenAI-compatible server (llama.cpp, vLLM, ...).
+
+    Each server, keyed by the model's base_url, gets its own client with a
+    pool of keep-alive connections, so calls skip the connection setup. At
+    most `batch_capacity` requests go to a server at once, as many as it
+    decodes together; the rest wait for a slot here rather than in the
+    server's queue, where they would eat into their own timeouts.
+    """
+
+    name = "openai_compatible"
+
+    def __init__(self, endpoints: Dict[str, EndpointLimits] = None):
+        super().__init__()
+        self.endpoints = {**ENDPOINT_LIMITS, **(endpoints or {})}
+        self.servers: Dict[str, Server] = {}
+        self._connecting = asyncio.Lock()
+
+    def _create_client(self, openai):
+        # The SDK's own HTTP client, whatever HTTP package this version of it is built on
+        if not hasattr(openai, "DefaultAsyncHttpxClient"):
+            raise RuntimeError("openai_compatible needs a newer openai package (pip install -U openai)")
+        return openai  # Clients are per server, see _server
+
+    async def _server(self, base_url: Optional[str]) -> Server:
+        if base_url is None:
+            raise ValueError("openai_compatible models need a base_url")
+        if base_url not in self.servers:
+            async with self._connecting:
+                if base_url not in self.servers:
+                    self.servers[base_url] = await self._connect(base_url)
+        return self.servers[base_url]
+
+    async def _connect(self, base_url: str) -> Server:
+        openai = self.client
+        limits = self.endpoints.get(base_url) or EndpointLimits()
+        capacity = limits.batch_capacity or await self._reported_slots(base_url) or DEFAULT_BATCH_CAPACITY
+        connections = limits.max_connections or capacity
+        capacity, connections = max(1, capacity // limits.share), max(1, connections // limits.share)
+        start = time.perf_counter()
+        pool_limits = type(openai.DEFAULT_CONNECTION_LIMITS)  # Limits from the SDK's HTTP package
+        http_client = openai.DefaultAsyncHttpxClient(
+            limits=pool_limits(max_connections=connections, max_keepalive_connections=connections)
+        )
+        client = openai.AsyncOpenAI(base_url=base_url, max_retries=0, http_client=http_client,
+                                    api_key=os.environ.get("OPENAI_COMPATIBLE_API_KEY", "none"))
+        self.timings["client"] += time.perf_counter() - start
+        return Server(client, capacity, connections)
+
+    async def _reported_slots(self, base_url: str) -> Optional[int]:
+        """The parallel slots a llama.cpp server reports at /props, or None."""
+        root = base_url.rstrip("/")
+        if root.endswith("/v1"):
+            root = root[:-len("/v1")]
+        try:
+            async with self.client.DefaultAsyncHttpxClient(timeout=5.0) as http:
+                response = await http.get(root + "/props")
+                response.raise_for_status()
+                return int(response.json()["total_slots"]) or None
+        except Exception:
+            return None  # Not llama.cpp, or an older one
+
+    async def _warm_up(self, base_url: str):
+        server = await self._server(base_url)
+        await server.client.models.list()
+
+    @staticmethod
+    def request_body(model_name: str, system: str, messages: List[dict], params: dict) -> dict:
+        body = OpenAIAdapter.request_body(model_name, system, messages, params)
+        body["messages"][0]["role"] = "system"  # Open models' chat templates expect it first
+        return body
+
+    def _chat_client(self, game: dict):
+        return self.servers[game["base_url"]].client
+
+    async def complete(self, model_name: str, system: str, messages: List[dict],
+                       params: dict, **game) -> Completion:
+        server = await self._server(game.get("base_url"))
+        async with server:
+            return await super().complete(model_name, system, messages, params, **game)
+
+    async def stream(self, model_name: str, system: str, messages: List[dict], params: dict,
+                     decide: Decide, cutoff: bool = True, **game) -> Completion:
+        server = await self._server(game.get("base_url"))
+        async with server:  # A cut-off stream closes its connection, which frees the server's slot
+            return await super().stream(model_name, system, messages, params, decide, cutoff, **game)
+
+    def report(self) -> dict:
+        return {
+            **super().report(),
+            **{url: f"{server.peak_in_flight}/{server.capacity} slots busy at peak, "
+                    f"{server.max_connections} connections"
+               for url, server in self.servers.items()},
+        }
+
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+
+    def _import_sdk(self):
+        import anthropic
+        return anthropic
+
+    def _create_client(self, anthropic):
+        return anthropic.AsyncAnthropic(max_retries=0)
+
+    async def _warm_up(self, model_name: str):
+        await self.client.models.retrieve(model_name)
+
+    @staticmethod
+    def _messages(messages: List[dict]) -> List[dict]:
+        """Content blocks with cache breakpoints after the first stable prefix and the history.
+
+        Together with the one on the system prompt that is three of the four
+        breakpoints Anthropic allows. Prefixes shorter than the model's minimum
+        cacheable length are simply not cached.
+        """
+        converted = []
+        for i, m in enumerate(messages):
+            content = m["content"]
+            if isinstance(content, Prompt):
+                blocks = [{"type": "text", "text": content.prefix}, {"type": "text", "text": content.suffix}]
+                if i == 0:
+                    blocks[0]["cache_control"] = {"type": "ephemeral"}
+            else:
+                blocks = [{"type": "text", "text": content}]
+            converted.append({"role": m["role"], "content": blocks})
+        if len(converted) > 1:
+            converted[-2]["content"][-1]["cache_control"] = {"type": "ephemeral"}
+        return converted
+
+    @classmethod
+    def request_body(cls, model_name: str, system: str, messages: List[dict], params: dict) -> dict:
+        """Messages API request, also used as the params of a batch request."""
+        return {
+            "model": model_name,
+            "system": [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}],
+            "messages": cls._messages(messages),
+            **params
+        }
+
+    async def complete(self, model_name: str, system: str, messages: List[dict],
+                       params: dict, **game) -> Completion:
+        start = time.perf_counter()
+        client = self.client
+        body = self.request_body(model_name, system, messages, params)
+        self.calls += 1
+        self.prepare_seconds += time.perf_counter() - start
+        response = await client.messages.create(**body)
+        return self.with_usage(response)
+
+    async def stream(self, model_name: str, system: str, messages: List[dict], params: dict,
+                     decide: Decide, cutoff: bool = True, **game) -> Completion:
+        start = time.perf_counter()
+        client = self.client
+        body = self.request_body(model_name, system, messages, params)
+        self.calls += 1
+        self.prepare_seconds += time.perf_counter() - start
+        state = StreamState(decide)
+        async with client.messages.stream(**body) as stream:
+            async for text in stream.text_stream:
+                if state.add(text) and cutoff:
+                    # Input usage came with message_start; output is counted up to the cut
+                    completion = self.with_usage(stream.current_message_snapshot, state.answer)
+                    break
+            else:
+                completion = self.with_usage(await stream.get_final_message())
+        completion.first_token_seconds = state.first_token_seconds
+        completion.decision_seconds = state.decision_seconds
+        completion.cut_off = state.answer is not None and cutoff
+        return completion
+
+    @staticmethod
+    def with_usage(message, text: Optional[str] = None) -> Completion:
+        """A Completion for a Messages API reply; input tokens include cache reads and writes."""
+        usage = message.usage
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return Completion(
+            (message.content[0].text if text is None else text).strip(),
+            input_tokens=usage.input_tokens + cache_read + cache_write,
+            output_tokens=usage.output_tokens,
+            cached_tokens=cache_read,
+        )
+
+class GoogleAdapter(ProviderAdapter):
+    name = "google"
+
+    def __init__(self):
+        super().__init__()
+        self._models = {}  # (model_name, system prompt) -> GenerativeModel
+
+    def _import_sdk(self):
+        import google.generativeai as genai
+        return genai
+
+    def _create_client(self, genai):
+        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+        return genai
+
+    def _model(self, model_name: str, system: str):
+        key = (model_name, system)
+        if key not in self._models:
+            self._models[key] = self.client.GenerativeModel(model_name=model_name, system_instruction=system)
+        return self._models[key]
+
+    async def _warm_up(self, model_name: str):
+        await self.client.GenerativeModel(model_name).count_tokens_async("warm-up")
+
+    async def complete(self, model_name: str, system: str, messages: List[dict],
+                       params: dict, **game) -> Completion:
+        start = time.perf_counter()
+        gemini = self._model(model_name, system)
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [message_text(m["content"])]}
+            for m in messages
+        ]
+        self.calls += 1
+        self.prepare_seconds += time.perf_counter() - start
+        response = await gemini.generate_content_async(contents, **params)
+        return Completion(response.text.strip(), **self._usage(response))
+
+    @staticmethod
+    def _usage(response) -> dict:
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "input_tokens": getattr(usage, "prompt_token_count", None),
+            "output_tokens": getattr(usage, "candidates_token_count", None),
+            "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+        }
+
+    async def stream(self, model_name: str, system: str, messages: List[dict], params: dict,
+                     decide: Decide, cutoff: bool = True, **game) -> Completion:
+        start = time.perf_counter()
+        gemini = self._model(model_name, system)
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [message_text(m["content"])]}
+            for m in messages
+        ]
+        self.calls += 1
+        self.prepare_seconds += time.perf_counter() - start
+        state = StreamState(decide)
+        usage = {}
+        response = await gemini.generate_content_async(contents, stream=True, **params)
+        chunks = response.__aiter__()
+        try:
+            async for chunk in chunks:
+                usage = self._usage(chunk)  # Running totals, complete in the last chunk
+                text = "".join(part.text for candidate in chunk.candidates for part in candidate.content.parts)
+                if state.add(text) and cutoff:
+                    return state.completion(True, **(usage if usage["input_tokens"] else
+                                                     _estimated_usage(system, messages, state.text)))
+        finally:
+            close = getattr(chunks, "aclose", None)
+            if close:
+                await close()  # Ends the underlying streaming call
+        return state.completion(False, **usage)
+
+class LocalAdapter(ProviderAdapter):
+    """Routes calls to the offline bots in local_bots.py; needs the game context, not an SDK."""
+
+    name = "local"
+
+    def __init__(self, local_provider):
+        super().__init__()
+        self._client = local_provider
+
+    async def complete(self, model_name: str, system: str, messages: List[dict],
+                       params: dict, **game) -> Completion:
+        self.calls += 1
+        response = await self._client.complete(game["model"], model_name, flatten(messages),
+                                               game["phase"], game["context"])
+        return Completion(response.strip())
+
+ADAPTERS = {
+    "openai": OpenAIAdapter,
+    "anthropic": AnthropicAdapter,
+    "google": GoogleAdapter,
+    "openai_compatible": OpenAICompatibleAdapter,
+}
+
+def register_provider(name: str, adapter_class):
+    """Make a new provider name usable in ModelConfig."""
+    ADAPTERS[name] = adapter_class
+
+class ProviderRegistry:
+    """Creates each provider's adapter the first time a model needs it."""
+
+    def __init__(self, local_provider=None, endpoints: Dict[str, EndpointLimits] = None):
+        self.adapters: Dict[str, ProviderAdapter] = {}
+        if local_provider is not None:
+            self.adapters["local"] = LocalAdapter(local_provider)
+        if endpoints:
+            self.adapters["openai_compatible"] = OpenAICompatibleAdapter(endpoints)
+
+    def get(self, provider: str) -> ProviderAdapter:
+        if provider not in self.adapters:
+            if provider not in ADAPTERS:
+                raise ValueError(f"Unsupported model provider: {provider}")
+            self.adapters[provider] = ADAPTERS[provider]()
+        return self.adapters[provider]
+
+    async def warm_up(self, models: Dict[str, Iterable[str]]):
+        """Build clients and open connections for {provider: model names} concurrently.
+
+        For openai_compatible the names are the servers' base URLs.
+        """
+        await asyncio.gather(*(
+            self.get(provider).warm_up(set(names)) for provider, names in models.items()
+        ))
+
+    def report(self) -> Dict[str, dict]:
+        return {name: adapter.report() for name, adapter in self.adapters.items()}
@@ -0,0 +1,133 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a call has no recorded response."""
+
+class ResponseCache:
+    """Content-addressed on-disk store of LLM responses.
+
+    Each response is a small JSON file named by the hash of everything that
+    determines it (provider, model, system prompt, prompt, generation params).
+    Old entries are evicted by age, and the least recently used ones by total
+    size. In replay mode a miss raises CacheMissError instead of calling out,
+    so a recorded tournament can be re-run offline.
+
+    Identical requests that are in flight at the same moment share one
+    upstream call.
+    """
+
+    def __init__(self, directory: str = "cache", max_bytes: int = 500 * 1024 * 1024,
+                 max_age_seconds: float = 30 * 24 * 3600, replay: bool = False,
+                 evict_every: int = 200):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.replay = replay
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0  # Calls that piggybacked on an identical in-flight request
+        self._writes_since_evict = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def make_key(provider: str, model_name: str, system: str, prompt: str, params: dict) -> str:
+        payload = json.dumps([provider, model_name, system, prompt, params],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self.replay and time.time() - entry["created"] > self.max_age_seconds:
+            return None
+        os.utime(path)  # Mark as recently used for size-based eviction
+        return entry["response"]
+
+    def put(self, key: str, response: str, **metadata):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"key": key, "created": time.time(), "response": response, **metadata}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self._writes_since_evict += 1
+        if self._writes_since_evict >= self.evict_every:
+            self.evict()
+
+    def evict(self):
+        """Drop entries older than max_age_seconds, then the least recently used until under max_bytes."""
+        self._writes_since_evict = 0
+        if self.replay:
+            return  # Never throw away a recording we are replaying
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age_seconds:
+                    with contextlib.suppress(FileNotFoundError):  # Another process sharing the cache got there first
+                        os.remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[str]], **metadata) -> str:
+        """Return the cached response for key, calling fetch() at most once for concurrent callers."""
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        if key in self._in_flight:
+            self.merged += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        if self.replay:
+            raise CacheMissError(f"No recorded response for {metadata or key}")
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._in_flight[key]
+        future.set_result(response)
+        self.put(key, response, **metadata)
+        return response
@@ -0,0 +1,181 @@
+import mmap
+import struct
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from game_models import GameRound, GameTurn, LLMType
+
+NONE = 255  # Player slot with no player (no vote, no winner)
+GUESSED_CORRECTLY = 1  # Bits in RoundCodes.flags
+INVALID = 2
+
+class RoundCodes:
+    """One stored round as int codes: players index the store's player list,
+    words, hints and guesses index its string table, and per-player tuples
+    are indexed by player code."""
+
+    __slots__ = ("category", "word", "chameleon", "order", "hints", "votes",
+                 "tie_break_votes", "guess", "winner", "flags", "invalid")
+
+    def __init__(self, values: tuple, players: int):
+        p = players
+        self.category, self.word, self.chameleon = values[0], values[1], values[2]
+        self.order = values[3:3 + p]  # Seat -> player
+        self.hints = values[3 + p:3 + 2 * p]  # Seat -> hint string
+        self.votes = values[3 + 2 * p:3 + 3 * p]  # Voter -> suspect, NONE if no vote
+        self.tie_break_votes = values[3 + 3 * p:3 + 4 * p]
+        self.guess, self.winner, self.flags, self.invalid = values[3 + 4 * p:]  # invalid: the reason's string
+
+    @property
+    def guessed_correctly(self) -> bool:
+        return bool(self.flags & GUESSED_CORRECTLY)
+
+    @property
+    def is_invalid(self) -> bool:
+        return bool(self.flags & INVALID)
+
+class RoundStore:
+    """Append-only store of played rounds as fixed-width binary records.
+
+    Each record takes 17 + 7 * players bytes (52 for five players).
+    Hints, words, guesses and the reasons rounds are invalid are interned
+    once in `strings`. Records fill an in-memory chunk of `chunk_rounds`
+    rounds; full chunks are appended to a spill file (a temporary file unless `spill_path` is given) and read back
+    through a memory map, so memory stays flat however many rounds are played.
+    """
+
+    def __init__(self, players: List[LLMType], categories: List[str], chunk_rounds: int = 4096,
+                 spill_path: Optional[str] = None):
+        if len(players) >= NONE:
+            raise ValueError(f"RoundStore supports at most {NONE - 1} players")
+        self.players = list(players)
+        self.categories = list(categories)
+        self._player_codes = {player: i for i, player in enumerate(self.players)}
+        self._category_codes = {category: i for i, category in enumerate(self.categories)}
+        self.strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        p = len(self.players)
+        self._record = struct.Struct(f"<HIB{p}B{p}I{p}B{p}BIBBI")
+        self.chunk_rounds = chunk_rounds
+        self._chunk = bytearray()
+        self._chunk_count = 0
+        self._spilled = 0  # Rounds in the spill file
+        self._spill_path = spill_path
+        self._file = None
+        self._map = None
+
+    @property
+    def record_size(self) -> int:
+        return self._record.size
+
+    def __len__(self) -> int:
+        return self._spilled + self._chunk_count
+
+    def intern(self, text: str) -> int:
+        code = self._string_codes.get(text)
+        if code is None:
+            code = self._string_codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+    def _player(self, player: Optional[LLMType]) -> int:
+        return NONE if player is None else self._player_codes[player]
+
+    def append(self, round: GameRound) -> int:
+        """Encode and store a round, returning its index."""
+        padding = len(self.players) - len(round.turns)
+        order = [self._player(turn.player) for turn in round.turns] + [NONE] * padding
+        hints = [self.intern(turn.hint) for turn in round.turns] + [0] * padding
+        votes = [NONE] * len(self.players)
+        for voter, vote in round.votes.items():
+            votes[self._player_codes[voter]] = self._player_codes[vote]
+        tie_break_votes = [NONE] * len(self.players)
+        for voter, vote in (round.tie_break_votes or {}).items():
+            tie_break_votes[self._player_codes[voter]] = self._player_codes[vote]
+        guessed = round.chameleon_guess == round.word
+        self._chunk += self._record.pack(
+            self._category_codes[round.category],
+            self.intern(round.word),
+            self._player_codes[round.chameleon],
+            *order,
+            *hints,
+            *votes,
+            *tie_break_votes,
+            self.intern(round.chameleon_guess or ""),
+            self._player(round.winner),
+            (GUESSED_CORRECTLY if guessed else 0) | (INVALID if round.invalid else 0),
+            self.intern(round.invalid or ""),
+        )
+        self._chunk_count += 1
+        if self._chunk_count == self.chunk_rounds:
+            self._spill()
+        return len(self) - 1
+
+    def _spill(self):
+        if self._file is None:
+            self._file = open(self._spill_path, "w+b") if self._spill_path else tempfile.TemporaryFile()
+        self._file.seek(0, 2)
+        self._file.write(self._chunk)
+        self._file.flush()
+        self._spilled += self._chunk_count
+        self._chunk = bytearray()
+        self._chunk_count = 0
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def codes(self, index: int) -> RoundCodes:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index < self._spilled:
+            values = self._record.unpack_from(self._map, index * self._record.size)
+        else:
+            values = self._record.unpack_from(self._chunk, (index - self._spilled) * self._record.size)
+        return RoundCodes(values, len(self.players))
+
+    def iter_codes(self) -> Iterator[RoundCodes]:
+        for index in range(len(self)):
+            yield self.codes(index)
+
+    def round(self, index: int) -> GameRound:
+        """Decode a stored round back into a GameRound."""
+        c = self.codes(index)
+        chameleon = self.players[c.chameleon]
+
+        def by_player(values: Tuple[int, ...]) -> Optional[Dict[LLMType, LLMType]]:
+            decoded = {self.players[i]: self.players[v] for i, v in enumerate(values) if v != NONE}
+            return decoded or None
+
+        turns = [
+            GameTurn(player=self.players[player], turn_number=seat,
+                     hint=self.strings[hint], is_chameleon=self.players[player] == chameleon)
+            for seat, (player, hint) in enumerate(zip(c.order, c.hints)) if player != NONE
+        ]
+        return GameRound(
+            category=self.categories[c.category],
+            word=self.strings[c.word],
+            chameleon=chameleon,
+            turns=turns,
+            votes=by_player(c.votes) or {},
+            winner=None if c.winner == NONE else self.players[c.winner],
+            chameleon_guess=self.strings[c.guess] or None,
+            tie_break_votes=by_player(c.tie_break_votes),
+            invalid=self.strings[c.invalid] if c.is_invalid else None,
+        )
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[GameRound, List[GameRound]]:
+        if isinstance(index, slice):
+            return [self.round(i) for i in range(*index.indices(len(self)))]
+        return self.round(index if index >= 0 else len(self) + index)
+
+    def __iter__(self) -> Iterator[GameRound]:
+        for index in range(len(self)):
+            yield self.round(index)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,224 @@
+import math
+import random
+from collections import defaultdict
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_models import LLMType
+
+def _beta_variance(a: float, b: float) -> float:
+    n = a + b
+    return a * b / (n * n * (n + 1))
+
+def williams_rows(n: int) -> List[List[int]]:
+    """Seat orders (as indices 0..n-1) of a Williams design.
+
+    Across the rows everyone sits in every seat equally often and directly
+    follows every other player equally often, so neither seat position nor
+    whose hints came just before favours anyone. That takes n rows for an
+    even n and 2n (the square plus its mirror image) for an odd n.
+    """
+    base = [0]
+    for i in range(1, n):
+        base.append((i + 1) // 2 if i % 2 else n - i // 2)
+    rows = [[(b + r) % n for b in base] for r in range(n)]
+    if n % 2:
+        rows += [row[::-1] for row in rows]
+    return rows
+
+class SeatDesign:
+    """Player orders from a Williams design, looked up by who sits where."""
+
+    def __init__(self, players: List[LLMType]):
+        self.players = list(players)
+        self.rows = williams_rows(len(self.players))
+        self._rows_by_seat = defaultdict(list)  # (player index, seat) -> rows with that player there
+        for r, row in enumerate(self.rows):
+            for seat, player in enumerate(row):
+                self._rows_by_seat[(player, seat)].append(r)
+
+    def order(self, player: LLMType, seat: int, block: int = 0) -> List[LLMType]:
+        """An order with player in seat; successive blocks alternate between the rows that fit."""
+        rows = self._rows_by_seat[(self.players.index(player), seat)]
+        return [self.players[i] for i in self.rows[rows[block % len(rows)]]]
+
+def balanced_schedule(cards: Dict[str, List[str]], players: List[LLMType], rounds_per_category: int,
+                      rng: random.Random) -> List[Tuple[str, int, str, LLMType, List[LLMType], int]]:
+    """Every round of a fixed tournament, in play order, with Chameleons and seats balanced.
+
+    Rounds are numbered k = 0, 1, ... across categories. Round k's Chameleon is
+    model k mod n and sits in seat (k // n) mod n, so every n*n rounds pair
+    each model with each Chameleon seat once. Within a category the Chameleon
+    role goes round the models in turn, and the player orders come from a
+    Williams design (see williams_rows). Which model gets which position in
+    the design, the words and the per-round seeds are drawn from rng.
+    """
+    n = len(players)
+    labels = list(players)
+    rng.shuffle(labels)
+    design = SeatDesign(labels)
+    schedule = []
+    for category, words in cards.items():
+        for round_num in range(rounds_per_category):
+            k = len(schedule)
+            chameleon = labels[k % n]
+            player_order = design.order(chameleon, (k // n) % n, k // (n * n))
+            word = rng.choice(words)
+            round_seed = rng.getrandbits(32)
+            schedule.append((category, round_num, word, chameleon, player_order, round_seed))
+    return schedule
+
+class ModelRating:
+    """Beta posterior for one model's Chameleon win rate."""
+
+    def __init__(self, prior: Tuple[float, float] = (1.0, 1.0)):
+        self.prior = prior
+        self.wins = 0
+        self.rounds = 0
+        self.pending = 0  # Rounds in flight with this model as the Chameleon
+
+    @property
+    def alpha(self) -> float:
+        return self.prior[0] + self.wins
+
+    @property
+    def beta(self) -> float:
+        return self.prior[1] + self.rounds - self.wins
+
+    @property
+    def mean(self) -> float:
+        return self.alpha / (self.alpha + self.beta)
+
+    def width(self, z: float) -> float:
+        """Width of the normal-approximation interval around the posterior mean."""
+        return 2 * z * math.sqrt(_beta_variance(self.alpha, self.beta))
+
+    def variance_reduction(self) -> float:
+        """Expected drop in posterior variance from one more round, counting rounds in flight.
+
+        Rounds in flight are assumed to come out at the current mean, so
+        concurrent picks spread across models instead of piling on one.
+        """
+        p = self.mean
+        a = self.alpha + p * self.pending
+        b = self.beta + (1 - p) * self.pending
+        expected = p * _beta_variance(a + 1, b) + (1 - p) * _beta_variance(a, b + 1)
+        return _beta_variance(a, b) - expected
+
+class AdaptiveScheduler:
+    """Picks each next round from the results so far and stops once the ratings are tight enough.
+
+    Each model's Chameleon win rate has a Beta posterior. The next Chameleon
+    is the unsettled model whose interval one more round is expected to
+    shrink the most; the category is the one that model has played least as
+    the Chameleon, so every model sees a spread of categories. Each model's
+    seat as the Chameleon cycles through the table, with the other seats
+    taken from a Williams design as in balanced_schedule.
+
+    No more rounds are handed out once every model's interval is at most
+    `target_width` wide (after `min_rounds` rounds as the Chameleon each),
+    once `max_rounds` rounds have been started, or once `cost()` reaches
+    `max_cost`.
+    """
+
+    def __init__(self, cards: Dict[str, List[str]], players: List[LLMType], rng: random.Random,
+                 target_width: float = 0.2, confidence: float = 0.95, min_rounds: int = 10,
+                 max_rounds: Optional[int] = None, max_cost: Optional[float] = None,
+                 cost: Callable[[], float] = lambda: 0.0, fixed_rounds: Optional[int] = None):
+        self.cards = cards
+        self.players = list(players)
+        self.rng = rng
+        self.target_width = target_width
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.confidence = confidence
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.max_cost = max_cost
+        self.cost = cost
+        self.fixed_rounds = fixed_rounds  # Size of the fixed schedule being replaced, for the report
+        self.seats = SeatDesign(self.players)
+        self.ratings = {player: ModelRating() for player in self.players}
+        self.category_counts = {player: defaultdict(int) for player in self.players}
+        self.category_rounds = defaultdict(int)
+        self.started = 0
+        self.invalid = 0  # Rounds committed but not scored, which still cost a round
+        self.stop_reason: Optional[str] = None
+
+    def settled(self, player: LLMType) -> bool:
+        rating = self.ratings[player]
+        return rating.rounds >= self.min_rounds and rating.width(self.z) <= self.target_width
+
+    def _check_stop(self) -> Optional[str]:
+        if all(self.settled(player) for player in self.players):
+            return "converged"
+        if self.max_rounds is not None and self.started >= self.max_rounds:
+            return "max_rounds"
+        if self.max_cost is not None and self.cost() >= self.max_cost:
+            return "max_cost"
+        return None
+
+    def next_round(self) -> Optional[Tuple[str, int, str, LLMType, List[LLMType], int]]:
+        """The next round as a schedule entry, or None once the tournament should stop."""
+        self.stop_reason = self._check_stop()
+        if self.stop_reason:
+            return None
+        # Models still short of min_rounds come first, then the biggest expected gain
+        open_players = [p for p in self.players if not self.settled(p)]
+        chameleon = max(open_players, key=lambda p: (
+            self.ratings[p].rounds + self.ratings[p].pending < self.min_rounds,
+            self.ratings[p].variance_reduction(),
+            -self.players.index(p),
+        ))
+        played = self.category_counts[chameleon]
+        fewest = min(played[c] for c in self.cards)
+        category = self.rng.choice([c for c in self.cards if played[c] == fewest])
+        word = self.rng.choice(self.cards[category])
+        # The Chameleon's seat goes round the table from one of its rounds to the next
+        turns = sum(played.values())
+        n = len(self.players)
+        player_order = self.seats.order(chameleon, turns % n, turns // n)
+        round_seed = self.rng.getrandbits(32)
+
+        round_num = self.category_rounds[category]
+        self.category_rounds[category] += 1
+        played[category] += 1
+        self.ratings[chameleon].pending += 1
+        self.started += 1
+        return (category, round_num, word, chameleon, player_order, round_seed)
+
+    def observe(self, chameleon: LLMType, chameleon_won: bool):
+        """Record a committed round."""
+        rating = self.ratings[chameleon]
+        rating.pending -= 1
+        rating.rounds += 1
+        rating.wins += chameleon_won
+
+    def discard(self, chameleon: LLMType):
+        """Forget a round that was committed but couldn't be scored."""
+        self.ratings[chameleon].pending -= 1
+        self.invalid += 1
+
+    def report(self) -> dict:
+        played = sum(r.rounds for r in self.ratings.values()) + self.invalid
+        report = {
+            "stop_reason": self.stop_reason,
+            "rounds_played": played,
+            "invalid_rounds": self.invalid,
+            "target_width": self.target_width,
+            "confidence": self.confidence,
+            "models": {
+                player.player_name: {
+                    "rounds_as_chameleon": rating.rounds,
+                    "chameleon_win_rate": round(rating.mean, 4),
+                    "interval_width": round(rating.width(self.z), 4),
+                    "settled": self.settled(player),
+                }
+                for player, rating in self.ratings.items()
+            },
+        }
+        if self.fixed_rounds is not None:
+            report["fixed_schedule_rounds"] = self.fixed_rounds
+            report["rounds_saved"] = self.fixed_rounds - played
+            report["rounds_saved_pct"] = round(100 * (self.fixed_rounds - played) / self.fixed_rounds, 1) \
+                if self.fixed_rounds else 0.0
+        return report
@@ -0,0 +1,299 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from checkpoint import load_checkpoint
+from game_controller import ChameleonGame
+from game_data import cards
+from game_models import LLMType, PlayerStats
+
+PLAN_FILE = "plan.json"
+
+@dataclass
+class ShardSpec:
+    index: int
+    first: int  # First round of the shard in the full schedule
+    end: int  # One past its last round
+    seed: int
+    rounds_per_category: int
+    directory: str
+    # LLMHandler / LocalProvider / ChameleonGame options, the same for every shard. concurrent_shards
+    # shards run at once, and each gets that share of the provider and --endpoint limits.
+    options: dict
+
+    def path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"shard_{self.index:03d}{suffix}")
+
+    @property
+    def log_file(self) -> str:
+        return self.path(".jsonl")
+
+    @property
+    def stats_file(self) -> str:
+        """Written only once the shard has finished, so its presence marks a complete shard."""
+        return self.path("_stats.json")
+
+    @property
+    def checkpoint_file(self) -> str:
+        return self.path("_checkpoint.json")
+
+def plan_shards(cards: Dict[str, List[str]], rounds_per_category: int, shards: int,
+                by: str = "category") -> List[Tuple[int, int]]:
+    """Split the schedule into at most `shards` contiguous (first, end) round ranges.
+
+    The schedule plays categories in order, so by="category" cuts only at
+    category boundaries; by="rounds" cuts it into ranges of near-equal size.
+    """
+    total = rounds_per_category * len(cards)
+    if by == "category":
+        units, size = len(cards), rounds_per_category
+    elif by == "rounds":
+        units, size = total, 1
+    else:
+        raise ValueError(f"Unknown shard split: {by!r}")
+    shards = max(1, min(shards, units))
+    bounds = [units * i // shards * size for i in range(shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+HANDLER_OPTIONS = ("local", "local_latency_ms", "local_latency_jitter_ms", "local_error_rate",
+                   "endpoint", "endpoint_max_connections", "endpoint_batch_capacity",
+                   "conversations", "stream", "no_stream_cutoff", "hedge", "hedge_percentile", "hedge_budget",
+                   "step_retries", "cache_dir", "cache_max_mb", "cache_max_age_days", "replay")
+
+def add_handler_arguments(parser: argparse.ArgumentParser):
+    """main.py's LLMHandler options, for runners that build a handler in each process (see build_handler)."""
+    parser.add_argument("--local", action="store_true", help="Play with the offline heuristic bots")
+    parser.add_argument("--local-latency-ms", type=float, default=0.0)
+    parser.add_argument("--local-latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--local-error-rate", type=float, default=0.0)
+    parser.add_argument("--endpoint", default=None, metavar="BASE_URL",
+                        help="Play every player on this OpenAI-compatible server")
+    parser.add_argument("--endpoint-max-connections", type=int, default=None,
+                        help="Keep-alive connections pooled for the --endpoint server")
+    parser.add_argument("--endpoint-batch-capacity", type=int, default=None,
+                        help="Requests sent to the --endpoint server at once")
+    parser.add_argument("--conversations", action="store_true")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--no-stream-cutoff", action="store_true")
+    parser.add_argument("--hedge", action="store_true")
+    parser.add_argument("--hedge-percentile", type=float, default=95)
+    parser.add_argument("--hedge-budget", nargs="+", default=[], metavar="PROVIDER=FRACTION")
+    parser.add_argument("--step-retries", type=int, default=2)
+    parser.add_argument("--cache-dir", default=None, help="Response cache, shared by every process")
+    parser.add_argument("--cache-max-mb", type=int, default=500)
+    parser.add_argument("--cache-max-age-days", type=float, default=30)
+    parser.add_argument("--replay", action="store_true")
+
+def handler_options(parser: argparse.ArgumentParser, args: argparse.Namespace) -> dict:
+    """The options from add_handler_arguments, checked, as a JSON-ready dict."""
+    if args.replay and not args.cache_dir:
+        parser.error("--replay requires --cache-dir")
+    if args.local and args.endpoint:
+        parser.error("--local and --endpoint are alternatives")
+    budgets = {}
+    for item in args.hedge_budget:
+        provider, _, fraction = item.partition("=")
+        try:
+            budgets[provider] = float(fraction)
+        except ValueError:
+            parser.error(f"--hedge-budget expects PROVIDER=FRACTION, got {item!r}")
+    return {**{key: getattr(args, key) for key in HANDLER_OPTIONS}, "hedge_budget": budgets}
+
+def build_handler(options: dict, seed: int, share: int = 1):
+    """An LLMHandler with its local bots, response cache and limits, from handler_options.
+
+    `share` processes call the same providers at once, and each gets that
+    share of the provider and --endpoint limits.
+    """
+    # Imported here so worker processes only pay for the SDKs they use
+    from hedging import HedgePolicy
+    from llm_handler import LLMHandler
+    from local_bots import LocalProvider
+    from provider_limits import RateLimiter, shared_limits
+    from providers import EndpointLimits
+    from response_cache import ResponseCache
+
+    cache = None
+    if options.get("cache_dir"):
+        # Processes share the directory; entries are written atomically, so they can reuse each other's responses
+        cache = ResponseCache(
+            options["cache_dir"],
+            max_bytes=options.get("cache_max_mb", 500) * 1024 * 1024,
+            max_age_seconds=options.get("cache_max_age_days", 30) * 24 * 3600,
+            replay=options.get("replay", False)
+        )
+    local_provider = LocalProvider(
+        cards,
+        latency=options.get("local_latency_ms", 0.0) / 1000,
+        latency_jitter=options.get("local_latency_jitter_ms", 0.0) / 1000,
+        error_rate=options.get("local_error_rate", 0.0),
+        seed=seed
+    )
+    hedging = HedgePolicy(options.get("hedge_budget", {}), options.get("hedge_percentile", 95)) \
+        if options.get("hedge") else None
+    return LLMHandler(cards, cache=cache, local_only=options.get("local", False),
+                      local_provider=local_provider, conversations=options.get("conversations", False),
+                      stream=options.get("stream", False), stream_cutoff=not options.get("no_stream_cutoff", False),
+                      rate_limiter=RateLimiter(shared_limits(share)), hedging=hedging,
+                      step_retries=options.get("step_retries", 2), endpoint=options.get("endpoint"),
+                      endpoint_limits=EndpointLimits(options.get("endpoint_max_connections"),
+                                                     options.get("endpoint_batch_capacity"), share))
+
+def run_shard(spec: ShardSpec) -> dict:
+    """Play one shard (resuming from its checkpoint if an earlier attempt died) and write its stats.
+
+    Runs in a worker process; progress goes to the shard's .out file.
+    """
+    if os.path.exists(spec.stats_file):
+        with open(spec.stats_file) as f:
+            return json.load(f)  # Finished by an earlier run
+    options = spec.options
+    llm_handler = build_handler(options, spec.seed, share=options.get("concurrent_shards", 1))
+    game = ChameleonGame(cards, max_concurrent_rounds=options.get("max_concurrent_rounds", 4),
+                         seed=spec.seed, llm_handler=llm_handler)
+    if os.path.exists(spec.checkpoint_file):
+        checkpoint = load_checkpoint(spec.checkpoint_file)
+        game.restore_checkpoint(checkpoint)
+    with open(spec.path(".out"), "a", encoding="utf-8") as out, contextlib.redirect_stdout(out):
+        game.play_tournament(rounds_per_category=spec.rounds_per_category,
+                             log_file=spec.log_file,
+                             checkpoint_file=spec.checkpoint_file,
+                             checkpoint_every=options.get("checkpoint_every", 10),
+                             metadata={"shard": asdict(spec)},
+                             shard=(spec.first, spec.end))
+    result = {
+        "shard": spec.index,
+        "first": spec.first,
+        "end": spec.end,
+        "rounds": game.rounds_logged,
+        "invalid_rounds": game.invalid_rounds,
+        "cost_usd": round(llm_handler.instrumentation.total_cost, 6),
+        "stats": {model.player_name: asdict(stat) for model, stat in game.stats.items()},
+    }
+    tmp_path = f"{spec.stats_file}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f, indent=4)
+    os.replace(tmp_path, spec.stats_file)
+    return result
+
+def load_plan(directory: str) -> List[ShardSpec]:
+    with open(os.path.join(directory, PLAN_FILE)) as f:
+        plan = json.load(f)
+    return [ShardSpec(directory=directory, **{k: v for k, v in shard.items() if k != "directory"})
+            for shard in plan["shards"]]
+
+def write_plan(directory: str, specs: List[ShardSpec], by: str):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, PLAN_FILE), "w") as f:
+        json.dump({"created_at": datetime.now().isoformat(), "by": by,
+                   "shards": [asdict(spec) for spec in specs]}, f, indent=4)
+
+def run_shards(specs: List[ShardSpec], workers: int, only: Optional[List[int]] = None) -> List[int]:
+    """Run the shards in a process pool; returns the indices of shards that failed."""
+    selected = [spec for spec in specs if only is None or spec.index in only]
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_shard, spec): spec for spec in selected}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append(spec.index)
+                print(f"Shard {spec.index} (rounds {spec.first}-{spec.end - 1}) failed: {e}")
+            else:
+                print(f"Shard {spec.index} done: {result['rounds']} rounds")
+    return sorted(failed)
+
+def merge_shards(specs: List[ShardSpec], stats_file: str, log_file: str) -> Dict[str, dict]:
+    """Sum the shards' PlayerStats and concatenate their logs in schedule order.
+
+    The result is the same stats file and log (apart from log timestamps)
+    as a serial run with the same seed would write.
+    """
+    missing = [spec.index for spec in specs if not os.path.exists(spec.stats_file)]
+    if missing:
+        raise RuntimeError(f"Shards {missing} haven't finished; re-run them with --only")
+    by_name = {model.player_name: model for model in LLMType}
+    stats = {model: PlayerStats() for model in LLMType}
+    with open(log_file, "w", encoding="utf-8") as log:
+        for spec in sorted(specs, key=lambda s: s.first):
+            with open(spec.stats_file) as f:
+                result = json.load(f)
+            for name, values in result["stats"].items():
+                total = stats[by_name[name]]
+                for field, value in values.items():
+                    setattr(total, field, getattr(total, field) + value)
+            with open(spec.log_file, encoding="utf-8") as f:
+                lines = f.readlines()
+            if len(lines) != spec.end - spec.first:
+                raise RuntimeError(f"Shard {spec.index} log has {len(lines)} rounds, "
+                                   f"expected {spec.end - spec.first}")
+            log.writelines(lines)
+    summary = ChameleonGame.stats_summary(stats)
+    with open(stats_file, "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a tournament as shards in a process pool and merge them")
+    parser.add_argument("--directory", default=None,
+                        help="Shard directory (default: a new results/shards_<timestamp>); "
+                             "an existing one is resumed from its plan")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 4, help="Number of shards")
+    parser.add_argument("--by", choices=("category", "rounds"), default="category",
+                        help="Cut shards at category boundaries or into equal round ranges")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per shard)")
+    parser.add_argument("--only", type=int, nargs="+", default=None, help="Run only these shard indices")
+    parser.add_argument("--rounds-per-category", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Tournament seed (default: random; shards always share one)")
+    parser.add_argument("--max-concurrent-rounds", type=int, default=4, help="Concurrent rounds per shard")
+    add_handler_arguments(parser)
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="Checkpoint each shard every N rounds, so a failed shard resumes where it died")
+    args = parser.parse_args()
+    options = handler_options(parser, args)
+
+    if args.directory and os.path.exists(os.path.join(args.directory, PLAN_FILE)):
+        directory = args.directory
+        specs = load_plan(directory)
+        print(f"Resuming {len(specs)} shards from {directory}")
+    else:
+        if not (args.local or args.endpoint):
+            try:
+                import config  # Sets the API keys in the parent; workers inherit them
+            except ImportError:
+                sys.exit("config.py not found - copy config.template.py and add your API keys, or use --local")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directory = args.directory or os.path.join("results", f"shards_{timestamp}")
+        seed = args.seed if args.seed is not None else int.from_bytes(os.urandom(4), "big")
+        options.update(max_concurrent_rounds=args.max_concurrent_rounds, checkpoint_every=args.checkpoint_every)
+        ranges = plan_shards(cards, args.rounds_per_category, args.shards, args.by)
+        options["concurrent_shards"] = min(args.workers or len(ranges), len(ranges))
+        specs = [ShardSpec(i, first, end, seed, args.rounds_per_category, directory, options)
+                 for i, (first, end) in enumerate(ranges)]
+        write_plan(directory, specs, args.by)
+        print(f"Planned {len(specs)} shards in {directory} (seed {seed})")
+
+    # No more shards at once than the limits were split between
+    workers = min(args.workers or len(specs), specs[0].options.get("concurrent_shards", len(specs)))
+    failed = run_shards(specs, workers, args.only)
+    if failed:
+        sys.exit(f"Shards {failed} failed. Re-run them with: "
+                 f"python sharding.py --directory {directory} --only {' '.join(map(str, failed))}")
+    try:
+        merge_shards(specs, os.path.join(directory, "chameleon_stats.json"),
+                     os.path.join(directory, "chameleon_detailed_log.jsonl"))
+    except RuntimeError as e:
+        sys.exit(str(e))
+    print(f"Merged stats and log written to {directory}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from game_models import LLMType
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,  -- Timestamp shared by a run's stats file and log, else the file stem
+    log_path TEXT,
+    stats_path TEXT,
+    rounds INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,  -- log or stats
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,  -- JSONL logs: bytes already ingested
+    tail TEXT  -- JSONL logs: hash of the bytes just before offset (see log_tail)
+);
+CREATE TABLE IF NOT EXISTS run_stats (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    player TEXT NOT NULL,
+    times_as_chameleon INTEGER NOT NULL,
+    times_identified INTEGER NOT NULL,
+    correct_guesses INTEGER NOT NULL,
+    correct_votes INTEGER NOT NULL,
+    times_falsely_accused INTEGER NOT NULL,
+    PRIMARY KEY (run_id, player)
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    idx INTEGER NOT NULL,  -- Position in the run's log
+    timestamp TEXT,
+    category TEXT NOT NULL,
+    word TEXT NOT NULL,
+    chameleon TEXT NOT NULL,
+    seat INTEGER NOT NULL,  -- The Chameleon's position in the hint order, from 1
+    final_suspect TEXT,
+    winner TEXT,
+    chameleon_guess TEXT,
+    caught INTEGER NOT NULL,
+    guessed INTEGER NOT NULL,
+    chameleon_won INTEGER NOT NULL,
+    invalid TEXT  -- Why the round isn't scored; such rounds are left out of the summaries
+);
+CREATE INDEX IF NOT EXISTS rounds_by_run ON rounds (run_id, idx);
+CREATE INDEX IF NOT EXISTS rounds_by_chameleon ON rounds (chameleon, category, seat);
+CREATE INDEX IF NOT EXISTS rounds_by_category ON rounds (category, word);
+CREATE TABLE IF NOT EXISTS hints (
+    round_id INTEGER NOT NULL REFERENCES rounds (id),
+    seat INTEGER NOT NULL,  -- From 1
+    player TEXT NOT NULL,
+    hint TEXT NOT NULL,
+    PRIMARY KEY (round_id, seat)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hints_by_player ON hints (player, hint);
+CREATE TABLE IF NOT EXISTS votes (
+    round_id INTEGER NOT NULL REFERENCES rounds (id),
+    voter TEXT NOT NULL,
+    suspect TEXT NOT NULL,
+    correct INTEGER NOT NULL,  -- Voted for the Chameleon
+    PRIMARY KEY (round_id, voter)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS votes_by_voter ON votes (voter, suspect);
+CREATE TABLE IF NOT EXISTS tie_break_votes (
+    round_id INTEGER NOT NULL REFERENCES rounds (id),
+    voter TEXT NOT NULL,
+    suspect TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (round_id, voter)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS chameleon_summary (
+    chameleon TEXT NOT NULL,
+    category TEXT NOT NULL,
+    seat INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    caught INTEGER NOT NULL,
+    guessed INTEGER NOT NULL,
+    chameleon_won INTEGER NOT NULL,
+    PRIMARY KEY (chameleon, category, seat)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vote_summary (
+    voter TEXT NOT NULL,
+    category TEXT NOT NULL,
+    seat INTEGER NOT NULL,  -- The Chameleon's seat
+    votes INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (voter, category, seat)
+) WITHOUT ROWID;
+"""
+
+STATS_FIELDS = ("times_as_chameleon", "times_identified", "correct_guesses", "correct_votes",
+                "times_falsely_accused")
+TIMESTAMP = re.compile(r"\d{8}_\d{6}")
+GROUPS = {"model": "{player}", "category": "category", "seat": "seat"}
+TAIL_BYTES = 4096
+
+def log_tail(path: str, offset: int) -> Optional[str]:
+    """Hash of the (up to TAIL_BYTES) bytes before offset.
+
+    If it still matches, the log only grew past offset; a log truncated on
+    --resume and written again can pass its old size with different bytes there.
+    """
+    start = max(0, offset - TAIL_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(offset - start)
+    return hashlib.sha256(data).hexdigest() if len(data) == offset - start else None
+
+def run_key(path: str) -> str:
+    """Key that pairs a run's stats file with its log.
+
+    main.py writes both with the same timestamp (in different directories);
+    otherwise the pair share a stem, such as sweep_stats.json and
+    sweep_detailed_log.jsonl from work_queue.py.
+    """
+    name = os.path.basename(path)
+    match = TIMESTAMP.search(name)
+    if match:
+        return match.group()
+    stem = re.sub(r"_?(detailed_log|stats)", "", name.split(".")[0])
+    return os.path.join(os.path.dirname(os.path.abspath(path)), stem)
+
+def file_kind(path: str) -> Optional[str]:
+    name = os.path.basename(path)
+    if name.startswith("shard_"):
+        return None  # Per-shard files are counted in the shard directory's merged files
+    if "detailed_log" in name and name.endswith((".json", ".jsonl")):
+        return "log"
+    if "stats" in name and name.endswith(".json"):
+        return "stats"
+    return None
+
+def find_player(name: str) -> str:
+    """The player name for a player name, model name, LLMType name or words of one ("claude haiku")."""
+    wanted = name.lower()
+    for model in LLMType:
+        if wanted in (model.player_name.lower(), model.model_name.lower(), model.name.lower()):
+            return model.player_name
+    words = wanted.replace("-", " ").replace("_", " ").split()
+    matches = [model.player_name for model in LLMType
+               if all(word in f"{model.name} {model.model_name}".lower() for word in words)]
+    if len(matches) != 1:
+        raise ValueError(f"{name!r} matches {len(matches)} models")
+    return matches[0]
+
+def _add(counts: List[int], *values):
+    for i, value in enumerate(values):
+        counts[i] += value
+
+def _rate(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+class ResultsWarehouse:
+    """Every run's stats and detailed log in one indexed SQLite file.
+
+    `ingest` adds files it hasn't seen and the new tail of JSONL logs that
+    have grown since; a file that shrank or was rewritten replaces what it
+    added before. Rounds, hints, votes and tie-break votes get a row each.
+    Per-model, per-category and per-seat counts are kept up to date in two
+    small summary tables as rounds come in, so the aggregate queries never
+    scan the rounds themselves.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        if "tail" not in {row[1] for row in self.db.execute("PRAGMA table_info(files)")}:
+            self.db.execute("ALTER TABLE files ADD COLUMN tail TEXT")  # Older warehouses re-read their logs once
+        self._reader = None
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+        self.db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _run(self, db, key: str) -> int:
+        db.execute("INSERT OR IGNORE INTO runs (key) VALUES (?)", (key,))
+        return db.execute("SELECT id FROM runs WHERE key = ?", (key,)).fetchone()[0]
+
+    def ingest(self, paths: Iterable[str]) -> Dict[str, int]:
+        """Ingest stats files and detailed logs; returns counts of files and rounds added."""
+        counts = Counter()
+        for path in map(os.path.abspath, paths):
+            kind = file_kind(path)
+            if kind is None:
+                continue
+            stat = os.stat(path)
+            known = self.db.execute("SELECT size, mtime, offset, tail FROM files WHERE path = ?",
+                                    (path,)).fetchone()
+            if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+                counts["unchanged"] += 1
+                continue
+            with self._transaction() as db:
+                run_id = self._run(db, run_key(path))
+                if kind == "stats":
+                    self._ingest_stats(db, run_id, path)
+                    offset, tail = stat.st_size, None
+                else:
+                    if (known and path.endswith(".jsonl") and stat.st_size >= known[2]
+                            and known[3] == log_tail(path, known[2])):
+                        offset = known[2]  # Grown since last time: only the new lines
+                    else:
+                        offset = 0
+                        self._remove_rounds(db, run_id)
+                    offset, added = self._ingest_log(db, run_id, path, offset)
+                    tail = log_tail(path, offset)
+                    counts["rounds"] += added
+                db.execute("INSERT OR REPLACE INTO files (path, kind, run_id, size, mtime, offset, tail) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (path, kind, run_id, stat.st_size, stat.st_mtime, offset, tail))
+                db.execute(f"UPDATE runs SET {kind}_path = ? WHERE id = ?", (path, run_id))
+            counts[kind] += 1
+        return dict(counts)
+
+    def _ingest_stats(self, db, run_id: int, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        data = data.get("stats", data)  # Shard stats files nest them
+        db.execute("DELETE FROM run_stats WHERE run_id = ?", (run_id,))
+        for name, stats in data.items():
+            if not isinstance(stats, dict) or not set(STATS_FIELDS) <= set(stats):
+                continue
+            db.execute("INSERT INTO run_stats VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (run_id, find_player(name), *(stats[field] for field in STATS_FIELDS)))
+
+    def _entries(self, path: str, offset: int) -> Iterable[Tuple[int, dict]]:
+        """(offset after the entry, entry) for each complete log entry from offset on."""
+        if not path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+            end = os.path.getsize(path)
+            for entry in entries:
+                yield end, entry
+            return
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return  # A line still being written; picked up next time
+                offset += len(line)
+                if line.strip():
+                    yield offset, json.loads(line)
+
+    def _ingest_log(self, db, run_id: int, path: str, offset: int) -> Tuple[int, int]:
+        idx = db.execute("SELECT rounds FROM runs WHERE id = ?", (run_id,)).fetchone()[0]
+        next_id = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM rounds").fetchone()[0]
+        rounds, hints, votes, tie_breaks = [], [], [], []
+        chameleons = defaultdict(lambda: [0, 0, 0, 0])  # (chameleon, category, seat) -> summary counts
+        voters = defaultdict(lambda: [0, 0])  # (voter, category, seat) -> votes, correct
+        for offset, entry in self._entries(path, offset):
+            chameleon = entry["chameleon"]
+            order = [next(iter(hint)) for hint in entry["player_hints"]]
+            seat = order.index(chameleon) + 1 if chameleon in order else 0
+            caught = bool(entry.get("was_chameleon_caught"))
+            guessed = bool(entry.get("did_chameleon_guess_correctly"))
+            won = entry.get("winner") == chameleon
+            rounds.append((next_id, run_id, idx, entry.get("timestamp"), entry["category"], entry["word"],
+                           chameleon, seat, entry.get("final_suspect"), entry.get("winner"),
+                           entry.get("chameleon_guess"), caught, guessed, won, entry.get("invalid")))
+            for position, hint in enumerate(entry["player_hints"], 1):
+                (player, text), = hint.items()
+                hints.append((next_id, position, player, text))
+            for voter, suspect in (entry.get("initial_votes") or {}).items():
+                votes.append((next_id, voter, suspect, suspect == chameleon))
+                if not entry.get("invalid"):
+                    _add(voters[(voter, entry["category"], seat)], 1, suspect == chameleon)
+            for voter, suspect in (entry.get("tie_break_votes") or {}).items():
+                tie_breaks.append((next_id, voter, suspect, suspect == chameleon))
+            if not entry.get("invalid"):
+                _add(chameleons[(chameleon, entry["category"], seat)], 1, caught, guessed, won)
+            next_id += 1
+            idx += 1
+        db.executemany("INSERT INTO rounds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rounds)
+        db.executemany("INSERT INTO hints VALUES (?, ?, ?, ?)", hints)
+        db.executemany("INSERT INTO votes VALUES (?, ?, ?, ?)", votes)
+        db.executemany("INSERT INTO tie_break_votes VALUES (?, ?, ?, ?)", tie_breaks)
+        self._add_summaries(db, chameleons, voters)
+        db.execute("UPDATE runs SET rounds = ? WHERE id = ?", (idx, run_id))
+        return offset, len(rounds)
+
+    @staticmethod
+    def _add_summaries(db, chameleons: dict, voters: dict, sign: int = 1):
+        db.executemany(
+            "INSERT INTO chameleon_summary VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+            "rounds = rounds + excluded.rounds, caught = caught + excluded.caught, "
+            "guessed = guessed + excluded.guessed, chameleon_won = chameleon_won + excluded.chameleon_won",
+            [(*key, *(sign * value for value in values)) for key, values in chameleons.items()]
+        )
+        db.executemany(
+            "INSERT INTO vote_summary VALUES (?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+            "votes = votes + excluded.votes, correct = correct + excluded.correct",
+            [(*key, *(sign * value for value in values)) for key, values in voters.items()]
+        )
+
+    def _remove_rounds(self, db, run_id: int):
+        """Drop a run's rounds (and their share of the summaries) before re-reading its log."""
+        chameleons = {
+            (chameleon, category, seat): (rounds, caught, guessed, won)
+            for chameleon, category, seat, rounds, caught, guessed, won in db.execute(
+                "SELECT chameleon, category, seat, COUNT(*), SUM(caught), SUM(guessed), SUM(chameleon_won) "
+                "FROM rounds WHERE run_id = ? AND invalid IS NULL GROUP BY 1, 2, 3", (run_id,))
+        }
+        voters = {
+            (voter, category, seat): (votes, correct)
+            for voter, category, seat, votes, correct in db.execute(
+                "SELECT v.voter, r.category, r.seat, COUNT(*), SUM(v.correct) FROM votes v "
+                "JOIN rounds r ON r.id = v.round_id WHERE r.run_id = ? AND r.invalid IS NULL GROUP BY 1, 2, 3",
+                (run_id,))
+        }
+        self._add_summaries(db, chameleons, voters, sign=-1)
+        for table in ("hints", "votes", "tie_break_votes"):
+            db.execute(f"DELETE FROM {table} WHERE round_id IN (SELECT id FROM rounds WHERE run_id = ?)",
+                       (run_id,))
+        db.execute("DELETE FROM rounds WHERE run_id = ?", (run_id,))
+        db.execute("UPDATE runs SET rounds = 0 WHERE id = ?", (run_id,))
+
+    def _aggregate(self, table: str, player: str, sums: Sequence[str], by: Sequence[str],
+                   model: Optional[str], category: Optional[str], seat: Optional[int]) -> List[dict]:
+        columns = [GROUPS[key].format(player=player) for key in by]
+        where, params = [], []
+        for column, value in ((player, model and find_player(model)), ("category", category), ("seat", seat)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        query = (f"SELECT {', '.join(columns + [f'SUM({s})' for s in sums])} FROM {table}"
+                 + (f" WHERE {' AND '.join(where)}" if where else "")
+                 + (f" GROUP BY {', '.join(columns)} ORDER BY {', '.join(columns)}" if columns else ""))
+        return [dict(zip(list(by) + list(sums), row)) for row in self.db.execute(query, params)
+                if row[len(by)]]  # Groups emptied by a re-ingested log drop out
+
+    def chameleon_stats(self, by: Sequence[str] = ("model",), model: str = None, category: str = None,
+                        seat: int = None) -> List[dict]:
+        """Rounds, catch, guess and win rates as the Chameleon, grouped by any of model, category and seat."""
+        rows = self._aggregate("chameleon_summary", "chameleon", ("rounds", "caught", "guessed", "chameleon_won"),
+                               by, model, category, seat)
+        for row in rows:
+            for name in ("caught", "guessed", "chameleon_won"):
+                row[f"{name}_rate"] = _rate(row[name], row["rounds"])
+        return rows
+
+    def vote_stats(self, by: Sequence[str] = ("model",), model: str = None, category: str = None,
+                   seat: int = None) -> List[dict]:
+        """First-round votes and how many named the Chameleon, by voter, category and Chameleon seat."""
+        rows = self._aggregate("vote_summary", "voter", ("votes", "correct"), by, model, category, seat)
+        for row in rows:
+            row["accuracy"] = _rate(row["correct"], row["votes"])
+        return rows
+
+    def run_stats(self) -> List[dict]:
+        """PlayerStats summed over every ingested stats file."""
+        query = (f"SELECT player, COUNT(*), {', '.join(f'SUM({field})' for field in STATS_FIELDS)} "
+                 "FROM run_stats GROUP BY player ORDER BY player")
+        return [dict(zip(("model", "runs") + STATS_FIELDS, row)) for row in self.db.execute(query)]
+
+    def query(self, sql: str, params: Sequence = ()) -> List[dict]:
+        """Any read-only SQL over the tables, as dicts; anything that writes is refused."""
+        if self._reader is None:
+            self._reader = sqlite3.connect(self.path)
+            self._reader.execute("PRAGMA query_only = ON")
+        cursor = self._reader.execute(sql, params)
+        names = [column[0] for column in cursor.description or ()]
+        return [dict(zip(names, row)) for row in cursor]
+
+def default_paths() -> List[str]:
+    """Stats files and logs where main.py, sharding.py and work_queue.py put them."""
+    patterns = ["results/*stats*.json", "results/**/*stats*.json", "results/**/*detailed_log*.json*",
+                "chameleon_detailed_log_*.json*"]
+    return sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)})
+
+def print_rows(rows: List[dict]):
+    if not rows:
+        print("No rounds match")
+        return
+    columns = list(rows[0])
+    cells = [[("-" if row[c] is None else str(row[c])) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(line[i]) for line in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(w) for cell, w in zip(line, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest stats files and detailed logs into one SQLite "
+                                                 "warehouse and query it")
+    parser.add_argument("--db", default=os.path.join("results", "warehouse.sqlite"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Add new and grown files (default: everything in results/)")
+    ingest.add_argument("paths", nargs="*")
+    for name, help in (("chameleon", "Catch, guess and win rates as the Chameleon"),
+                       ("votes", "Vote accuracy")):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("--by", nargs="*", choices=list(GROUPS), default=["model"],
+                             help="Group by these (none for a single total)")
+        command.add_argument("--model", default=None,
+                             help="Player name, model name or words of one, e.g. 'claude haiku'")
+        command.add_argument("--category", default=None)
+        command.add_argument("--seat", type=int, default=None, help="The Chameleon's seat, from 1")
+        command.add_argument("--json", action="store_true")
+    stats = commands.add_parser("stats", help="PlayerStats summed over the ingested stats files")
+    stats.add_argument("--json", action="store_true")
+    sql = commands.add_parser("sql", help="Run a SQL query")
+    sql.add_argument("query")
+    sql.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    warehouse = ResultsWarehouse(args.db)
+    started = time.perf_counter()
+    if args.command == "ingest":
+        counts = warehouse.ingest(args.paths or default_paths())
+        print(f"Ingested {counts.get('log', 0)} logs ({counts.get('rounds', 0)} rounds) and "
+              f"{counts.get('stats', 0)} stats files; {counts.get('unchanged', 0)} unchanged")
+        return
+    try:
+        if args.command == "chameleon":
+            rows = warehouse.chameleon_stats(args.by, args.model, args.category, args.seat)
+        elif args.command == "votes":
+            rows = warehouse.vote_stats(args.by, args.model, args.category, args.seat)
+        elif args.command == "stats":
+            rows = warehouse.run_stats()
+        else:
+            rows = warehouse.query(args.query)
+    except (ValueError, sqlite3.Error) as e:
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_rows(rows)
+        print(f"({len(rows)} rows in {elapsed * 1000:.1f} ms)")
+    warehouse.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from game_controller import ChameleonGame, RoundTally
+from game_data import cards
+from game_models import GameRound, GameTurn, LLMType
+from scheduler import balanced_schedule
+from sharding import add_handler_arguments, build_handler, handler_options
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,  -- Index in the tournament schedule
+    category TEXT NOT NULL,
+    round_num INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    chameleon TEXT NOT NULL,  -- player_name
+    player_order TEXT NOT NULL,  -- JSON list of player_names
+    round_seed INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',  -- queued, leased, done or failed
+    worker TEXT,
+    lease TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, id);
+CREATE TABLE IF NOT EXISTS results (
+    job_id INTEGER PRIMARY KEY REFERENCES jobs (id),
+    worker TEXT NOT NULL,
+    committed_at TEXT NOT NULL,
+    log TEXT NOT NULL  -- The round's detailed log entry
+);
+"""
+
+PLAYERS = {model.player_name: model for model in LLMType}
+
+@dataclass
+class RoundJob:
+    id: int
+    category: str
+    round_num: int
+    word: str
+    chameleon: LLMType
+    player_order: List[LLMType]
+    round_seed: int
+    lease: str
+    attempts: int
+
+def round_from_log(entry: dict) -> GameRound:
+    """Rebuild a GameRound from its detailed log entry (see ChameleonGame._create_detailed_log)."""
+    chameleon = PLAYERS[entry["chameleon"]]
+    turns = []
+    for seat, hint in enumerate(entry["player_hints"]):
+        (name, text), = hint.items()
+        turns.append(GameTurn(player=PLAYERS[name], turn_number=seat, hint=text,
+                              is_chameleon=PLAYERS[name] == chameleon))
+
+    def by_player(votes: Optional[Dict[str, str]]) -> Optional[Dict[LLMType, LLMType]]:
+        return None if votes is None else {PLAYERS[voter]: PLAYERS[vote] for voter, vote in votes.items()}
+
+    return GameRound(
+        category=entry["category"],
+        word=entry["word"],
+        chameleon=chameleon,
+        turns=turns,
+        votes=by_player(entry["initial_votes"]),
+        winner=PLAYERS[entry["winner"]] if entry["winner"] else None,
+        chameleon_guess=entry["chameleon_guess"],
+        tie_break_votes=by_player(entry["tie_break_votes"]),
+        invalid=entry.get("invalid"),
+    )
+
+class WorkQueue:
+    """Durable queue of tournament rounds in one SQLite file, shared by a coordinator and workers.
+
+    A worker leases a job for `lease_seconds` and keeps it with heartbeats.
+    A lease that expires (the worker died or lost its connection) puts the
+    job back in the queue the next time anyone leases. A result is committed
+    only while the committing worker still holds the job's lease, and at most
+    once per job, so every round counts exactly once however often it was
+    attempted. A job that fails or loses its lease `max_attempts` times is
+    marked failed.
+
+    Every process opens its own WorkQueue. Hosts must see the file on storage
+    with working file locks; lease expiry compares the hosts' wall clocks.
+    Methods may be called from any thread (run_worker calls them off the
+    event loop); they take turns on the one connection.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None,  # Transactions are explicit
+                                  check_same_thread=False)
+        self._lock = threading.RLock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")  # Take the write lock up front, so leases never race
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def meta(self) -> dict:
+        return {key: json.loads(value) for key, value in self.db.execute("SELECT key, value FROM meta")}
+
+    def enqueue(self, schedule: List[Tuple[str, int, str, LLMType, List[LLMType], int]], meta: dict):
+        """Queue a whole tournament schedule; a queue holds one tournament."""
+        with self._transaction() as db:
+            if db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]:
+                raise RuntimeError(f"{self.path} already holds a tournament")
+            db.executemany("INSERT INTO meta VALUES (?, ?)",
+                           [(key, json.dumps(value)) for key, value in meta.items()])
+            db.executemany(
+                "INSERT INTO jobs (id, category, round_num, word, chameleon, player_order, round_seed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(index, category, round_num, word, chameleon.player_name,
+                  json.dumps([player.player_name for player in player_order]), round_seed)
+                 for index, (category, round_num, word, chameleon, player_order, round_seed)
+                 in enumerate(schedule)]
+            )
+
+    def _expire(self, db, now: float) -> int:
+        """Put jobs whose lease ran out back in the queue (or fail them); returns how many."""
+        expired = db.execute("UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                             "worker = NULL, lease = NULL, lease_expires = NULL, error = 'lease expired' "
+                             "WHERE state = 'leased' AND lease_expires < ?", (self.max_attempts, now))
+        return expired.rowcount
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[RoundJob]:
+        """Lease the next queued job (after requeueing expired leases), or None if there is none."""
+        now = time.time()
+        with self._transaction() as db:
+            self._expire(db, now)
+            row = db.execute("SELECT id, category, round_num, word, chameleon, player_order, round_seed, attempts "
+                             "FROM jobs WHERE state = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            lease = uuid.uuid4().hex
+            db.execute("UPDATE jobs SET state = 'leased', worker = ?, lease = ?, lease_expires = ?, "
+                       "attempts = attempts + 1 WHERE id = ?", (worker, lease, now + lease_seconds, row[0]))
+        index, category, round_num, word, chameleon, player_order, round_seed, attempts = row
+        return RoundJob(index, category, round_num, word, PLAYERS[chameleon],
+                        [PLAYERS[name] for name in json.loads(player_order)], round_seed, lease, attempts + 1)
+
+    def heartbeat(self, job: RoundJob, lease_seconds: float) -> bool:
+        """Extend a lease; False if it was lost (expired and requeued, or taken by another worker)."""
+        with self._transaction() as db:
+            extended = db.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease = ? AND state = 'leased'",
+                                  (time.time() + lease_seconds, job.id, job.lease))
+        return extended.rowcount == 1
+
+    def commit(self, job: RoundJob, worker: str, log: dict) -> bool:
+        """Store a job's result if the lease is still held; False if it isn't (the result is dropped)."""
+        with self._transaction() as db:
+            done = db.execute("UPDATE jobs SET state = 'done', lease = NULL, lease_expires = NULL, error = NULL "
+                              "WHERE id = ? AND lease = ? AND state = 'leased'", (job.id, job.lease))
+            if done.rowcount != 1:
+                return False
+            db.execute("INSERT INTO results VALUES (?, ?, ?, ?)",
+                       (job.id, worker, datetime.now().isoformat(), json.dumps(log)))
+        return True
+
+    def release(self, job: RoundJob, error: str):
+        """Give up a job that failed, queueing it for another attempt while any are left."""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                       "worker = NULL, lease = NULL, lease_expires = NULL, error = ? "
+                       "WHERE id = ? AND lease = ? AND state = 'leased'",
+                       (self.max_attempts, error, job.id, job.lease))
+
+    def requeue_failed(self) -> int:
+        with self._transaction() as db:
+            return db.execute("UPDATE jobs SET state = 'queued', attempts = 0 WHERE state = 'failed'").rowcount
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        with self._lock:
+            counts.update(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return counts
+
+    def unfinished(self) -> int:
+        """Jobs still queued or leased."""
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('queued', 'leased')").fetchone()[0]
+
+    def status(self) -> dict:
+        """Job counts, attempts beyond the first, and results per worker."""
+        retried = self.db.execute("SELECT COALESCE(SUM(attempts - 1), 0) FROM jobs WHERE attempts > 1").fetchone()[0]
+        workers = dict(self.db.execute("SELECT worker, COUNT(*) FROM results GROUP BY worker ORDER BY worker"))
+        failed = [{"job": index, "error": error} for index, error in
+                  self.db.execute("SELECT id, error FROM jobs WHERE state = 'failed' ORDER BY id")]
+        return {**self.counts(), "extra_attempts": retried, "results_by_worker": workers, "failed_jobs": failed}
+
+    def results(self) -> Iterator[Tuple[int, dict]]:
+        """Committed (job id, detailed log entry) pairs in schedule order."""
+        for job_id, log in self.db.execute("SELECT job_id, log FROM results ORDER BY job_id"):
+            yield job_id, json.loads(log)
+
+def create_queue(path: str, rounds_per_category: int, seed: int) -> WorkQueue:
+    """Coordinator: split a seeded tournament into round jobs, one per schedule entry.
+
+    The schedule is the one main.py would play with the same seed.
+    """
+    schedule = balanced_schedule(cards, list(LLMType), rounds_per_category, random.Random(seed))
+    queue = WorkQueue(path)
+    queue.enqueue(schedule, {"created_at": datetime.now().isoformat(), "seed": seed,
+                             "rounds_per_category": rounds_per_category})
+    return queue
+
+async def run_worker(queue: WorkQueue, game: ChameleonGame, worker: str, concurrency: int = 4,
+                     lease_seconds: float = 120.0, poll_seconds: float = 5.0) -> int:
+    """Lease, play and commit jobs until none are left unfinished; returns the rounds committed.
+
+    Up to `concurrency` rounds are in flight. Leases are renewed every third
+    of `lease_seconds`; a round whose lease is lost is cancelled, since its
+    result could no longer be committed. Queue calls run in threads, so
+    waiting for another worker's write lock never holds up the rounds in
+    flight.
+    """
+    held: Dict[str, Tuple[RoundJob, asyncio.Task]] = {}
+    lost = set()
+    committed = 0
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            for lease, (job, task) in list(held.items()):
+                if not await asyncio.to_thread(queue.heartbeat, job, lease_seconds):
+                    print(f"Lost the lease on job {job.id}; abandoning it")
+                    lost.add(lease)
+                    task.cancel()
+
+    async def slot():
+        nonlocal committed
+        while True:
+            job = await asyncio.to_thread(queue.lease, worker, lease_seconds)
+            if job is None:
+                if not await asyncio.to_thread(queue.unfinished):
+                    return
+                await asyncio.sleep(poll_seconds)  # Others hold the rest; wait in case a lease expires
+                continue
+            print(f"\n{job.category} - Round {job.round_num + 1} (job {job.id}, attempt {job.attempts})")
+            task = asyncio.ensure_future(game.play_round(job.category, job.word, job.chameleon,
+                                                         job.player_order, random.Random(job.round_seed)))
+            held[job.lease] = (job, task)
+            try:
+                round = await task
+            except asyncio.CancelledError:
+                if job.lease in lost:
+                    continue
+                await asyncio.to_thread(queue.release, job, "worker stopped")
+                raise
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                await asyncio.to_thread(queue.release, job, f"{type(e).__name__}: {e}")
+                continue
+            finally:
+                held.pop(job.lease, None)
+            log = game._create_detailed_log(round).to_dict()
+            if await asyncio.to_thread(queue.commit, job, worker, log):
+                committed += 1
+            else:
+                print(f"Job {job.id} was requeued before it finished; result dropped")
+
+    await game.llm_handler.warm_up()
+    beat = asyncio.ensure_future(heartbeat())
+    try:
+        await asyncio.gather(*(slot() for _ in range(max(1, concurrency))))
+    finally:
+        beat.cancel()
+    return committed
+
+def aggregate(queue: WorkQueue, stats_file: str, log_file: str) -> Dict[str, dict]:
+    """Build the stats file and detailed log from the committed results, in schedule order.
+
+    Stats are counted exactly as a serial run would count them, so a seeded
+    queue gives the same stats file (and log, apart from timestamps) as
+    main.py with that seed.
+    """
+    counts = queue.counts()
+    if counts["done"] != sum(counts.values()):
+        raise RuntimeError(f"Not every job is done yet: {counts}")
+    tally = RoundTally(cards)
+    with open(log_file, "w", encoding="utf-8") as log:
+        for _, entry in queue.results():
+            tally._record_round(round_from_log(entry))
+            log.write(json.dumps(entry) + "\n")
+    summary = RoundTally.stats_summary(tally.stats)
+    with open(stats_file, "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Spread a tournament over workers on several hosts "
+                                                 "through a lease-based SQLite job queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Queue every round of a seeded tournament")
+    create.add_argument("queue", help="SQLite queue file to create")
+    create.add_argument("--rounds-per-category", type=int, default=4)
+    create.add_argument("--seed", type=int, default=None, help="Tournament seed (default: random)")
+
+    work = commands.add_parser("work", help="Play queued rounds until none are left")
+    work.add_argument("queue")
+    work.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    work.add_argument("--concurrency", type=int, default=4, help="Rounds in flight in this worker")
+    work.add_argument("--lease-seconds", type=float, default=120.0,
+                      help="How long a job stays leased without a heartbeat")
+    work.add_argument("--poll-seconds", type=float, default=5.0)
+    add_handler_arguments(work)
+    work.add_argument("--quiet", action="store_true", help="Don't print round-by-round progress")
+
+    status = commands.add_parser("status", help="Show job counts per state and results per worker")
+    status.add_argument("queue")
+
+    requeue = commands.add_parser("requeue", help="Put failed jobs back in the queue")
+    requeue.add_argument("queue")
+
+    merge = commands.add_parser("aggregate", help="Write stats and the detailed log from the committed results")
+    merge.add_argument("queue")
+    merge.add_argument("--stats-file", default=None)
+    merge.add_argument("--log-file", default=None)
+    args = parser.parse_args()
+
+    if args.command == "create":
+        if os.path.exists(args.queue):
+            sys.exit(f"{args.queue} already exists")
+        seed = args.seed if args.seed is not None else int.from_bytes(os.urandom(4), "big")
+        queue = create_queue(args.queue, args.rounds_per_category, seed)
+        print(f"Queued {queue.counts()['queued']} rounds in {args.queue} (seed {seed})")
+        return
+
+    if not os.path.exists(args.queue):
+        sys.exit(f"No queue at {args.queue}")
+    queue = WorkQueue(args.queue)
+    if args.command == "status":
+        print(json.dumps(queue.status(), indent=4))
+    elif args.command == "requeue":
+        print(f"Requeued {queue.requeue_failed()} failed jobs")
+    elif args.command == "aggregate":
+        base = os.path.splitext(args.queue)[0]
+        stats_file = args.stats_file or f"{base}_stats.json"
+        log_file = args.log_file or f"{base}_detailed_log.jsonl"
+        try:
+            aggregate(queue, stats_file, log_file)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        print(f"Stats written to {stats_file}, detailed log to {log_file}")
+    elif args.command == "work":
+        options = handler_options(work, args)
+        if not (args.local or args.endpoint):
+            try:
+                import config  # noqa: F401 - sets the API keys
+            except ImportError:
+                sys.exit("config.py not found - copy config.template.py and add your API keys, or use --local")
+        game = ChameleonGame(cards, llm_handler=build_handler(options, queue.meta["seed"]))
+        with contextlib.redirect_stdout(open(os.devnull, "w")) if args.quiet else contextlib.nullcontext():
+            committed = asyncio.run(run_worker(queue, game, args.worker_id, args.concurrency,
+                                               args.lease_seconds, args.poll_seconds))
+        print(f"Worker {args.worker_id} committed {committed} rounds; queue: {queue.counts()}")
+    queue.close()
+
+if __name__ == "__main__":
+    main()